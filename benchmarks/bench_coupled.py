@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""Scaling benchmark of the coupled multi-node core.
+
+Times a step of a chain of nodes coupled to their neighbours by neutrons and
+heat, for a range of node counts, and compares the cost per node with a step
+of a single-node PointKineticsSolver running the pure Python method.
+
+    python benchmarks/bench_coupled.py --nodes 1 10 50 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from openpointkinetics.CoupledCore import CoupledCore, neighbour_coupling
+from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+from openpointkinetics.numericalmethods import SparseLinear
+
+
+def step_time(nodes, method, h, duration):
+    """Return the wall time per step of a chain of nodes."""
+
+    edges = [(i, i+1) for i in range(nodes-1)]
+
+    core = CoupledCore(nodes, neighbour_coupling(nodes, edges, 5.0),
+                       neighbour_coupling(nodes, edges, 1E7), method, h)
+    core.set_example_thermal_params()
+
+    start = time.perf_counter()
+    core.solve(duration, 0.0, log=False)
+
+    return (time.perf_counter() - start) / core.method.stats.steps
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--nodes', type=int, nargs='*',
+                        default=[1, 10, 50, 200])
+    args = parser.parse_args(argv)
+
+    solver = PointKineticsSolver(method='RK4', h=1E-3, compiled=False)
+    solver.set_example_thermal_params()
+
+    start = time.perf_counter()
+    solver.advance(1.0)
+    single = (time.perf_counter() - start) / solver.stats['steps']
+
+    print()
+    print('Single-node solver RK4 step: ' + format(single*1E6, '.1f') + ' us')
+    print('Sparse LU from SciPy: ' + str(SparseLinear.AVAILABLE))
+    print()
+    print('{:<8}{:>8}{:>16}{:>16}{:>16}'.format(
+        'method', 'nodes', 'step (us)', 'per node (us)', 'vs single'))
+
+    for method, h, duration in [('RK4', 1E-3, 1.0), ('ROS2', 5E-2, 5.0)]:
+        for nodes in args.nodes:
+            step = step_time(nodes, method, h, duration)
+
+            print('{:<8}{:>8}{:>16.1f}{:>16.2f}{:>16.2f}'.format(
+                method, nodes, step*1E6, step/nodes*1E6,
+                step/nodes/single))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
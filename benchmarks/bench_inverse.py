@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""Accuracy and throughput of the streaming inverse kinetics.
+
+Reconstructs the reactivity of a power trace logged by the closed-form solver
+through a sequence of reactivity steps, uniformly and at randomly thinned
+sample times, and the throughput on a long non-uniformly sampled trace.
+
+    python benchmarks/bench_inverse.py --samples 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from openpointkinetics.InverseKinetics import reactivity
+from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+
+
+def steady(t, steps):
+    """Mask of the samples whose derivative stencil, the sample and the two
+    before it, does not straddle a reactivity step, where the derivative of
+    the power jumps."""
+
+    first = np.concatenate([t[:1], t[:1], t[:-2]])
+    mask = np.ones(len(t), dtype=bool)
+
+    for t_step in steps:
+        mask &= (first >= t_step) | (t < t_step)
+
+    return mask
+
+
+def accuracy(log_freq):
+    """Return the largest reactivity error of a reconstructed trace, away
+    from the reactivity steps, for uniform and thinned sampling."""
+
+    solver = PointKineticsSolver(exact_linear=True)
+    solver.set_power(1.0)
+    solver.equilibrate()
+
+    for rho, duration in [(0.0, 1.0), (2E-3, 5.0), (-3E-3, 5.0), (5E-4, 20.0)]:
+        solver.set_rho(rho)
+        solver.solve(duration, log_freq)
+
+    t = solver.logger1.column('t')
+    power = solver.logger1.column('power')
+    rho = solver.logger1.column('rho')
+
+    steps = t[1:][np.diff(rho) != 0]
+
+    errors = []
+    keep = np.sort(np.random.default_rng(0).choice(len(t), len(t)//3,
+                                                   replace=False))
+    keep[0] = 0
+
+    for sample in [slice(None), keep]:
+        error = np.abs(reactivity(t[sample], power[sample]) - rho[sample])
+        errors.append(error[steady(t[sample], steps)].max())
+
+    return errors
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--samples', type=int, default=10000000)
+    args = parser.parse_args(argv)
+
+    print()
+    print('{:>12}{:>18}{:>18}'.format('dt (s)', 'uniform error',
+                                      'thinned error'))
+
+    for log_freq in [1E-1, 1E-2, 1E-3]:
+        uniform, thinned = accuracy(log_freq)
+        print('{:>12}{:>18.2e}{:>18.2e}'.format(log_freq, uniform, thinned))
+
+    rng = np.random.default_rng(1)
+    t = np.cumsum(rng.uniform(0.5E-3, 1.5E-3, args.samples))
+    power = 1.0 + 0.1*np.sin(t)
+
+    start = time.perf_counter()
+    reactivity(t, power)
+    wall = time.perf_counter() - start
+
+    print()
+    print('Throughput: ' + format(args.samples/wall/1E6, '.2f') +
+          ' million samples/s')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+"""Benchmark and work-precision suite for the numerical methods.
+
+Runs the lesson scenarios, a stiff case and a long load-follow case with
+every numerical method over a range of step sizes or tolerances. For each
+run it records the gradient (RHS) evaluations, the wall time, the simulated
+seconds per wall second, the steps per second of integration, optionally
+the peak memory, and the error in power against a high precision reference
+solution of the same scenario. The results are printed as one work-precision
+table per scenario.
+
+Throughput can be saved as a baseline and later runs compared against it,
+failing with a non-zero exit status when any run slows down by more than the
+allowed fraction:
+
+    python benchmarks/bench_methods.py --save baseline.json
+    python benchmarks/bench_methods.py --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from openpointkinetics.PointKineticsConstants import PointKineticsConstants
+from openpointkinetics.ScenarioRunner import Scenario
+from openpointkinetics import Schedule
+
+
+def scenarios(scale):
+    """Return the benchmark scenarios as (name, duration, Scenario kwargs).
+
+    Durations of the timed phases are multiplied by scale."""
+
+    load_follow = Schedule.PiecewiseLinear(
+        [0.0, 600.0*scale, 1200.0*scale, 2400.0*scale, 3000.0*scale],
+        [0.0, -1000.0E6, -1000.0E6, 0.0, 0.0])
+
+    return [
+        ('lesson_1', 240*scale, dict(
+            actions=[('set_power', 1E8),
+                     ('solve', 60*scale),
+                     ('set_rho', 1E-3), ('solve', 60*scale),
+                     ('set_rho', -1E-3), ('solve', 60*scale),
+                     ('set_rho', 0.0), ('solve', 60*scale)])),
+        ('lesson_2', 330*scale, dict(
+            thermal_params='example',
+            actions=[('settle', 300, 1E-6, 1.0, True),
+                     ('solve', 30*scale),
+                     ('add_rho', 1E-3), ('solve', 300*scale)])),
+        ('lesson_3', 330*scale, dict(
+            thermal_params='example',
+            actions=[('settle', 300, 1E-6, 1.0, True),
+                     ('solve', 30*scale),
+                     ('set_demand', 4000.0E6), ('solve', 300*scale)])),
+        ('stiff', 10*scale, dict(
+            constants=PointKineticsConstants(n_gen_time=1E-6),
+            thermal_params='example',
+            actions=[('settle', 300, 1E-6, 1.0, True),
+                     ('add_rho', 5E-4), ('solve', 10*scale)])),
+        ('long', 3600*scale, dict(
+            thermal_params='example', log_freq=10.0*scale,
+            actions=[('settle', 300, 1E-6, 1.0, True),
+                     ('set_demand_schedule', load_follow),
+                     ('solve', 3600*scale)])),
+    ]
+
+
+CONFIGURATIONS = [('F_Euler', {'h': 1E-2}),
+                  ('F_Euler', {'h': 1E-3}),
+                  ('F_Euler_PC', {'h': 1E-2}),
+                  ('F_Euler_PC', {'h': 1E-3}),
+                  ('RK4', {'h': 1E-2}),
+                  ('RK4', {'h': 1E-3}),
+                  ('DOPRI45', {'rtol': 1E-4}),
+                  ('DOPRI45', {'rtol': 1E-6}),
+                  ('DOPRI45', {'rtol': 1E-8}),
+                  ('ROS2', {'h': 1E-1}),
+                  ('ROS2', {'h': 1E-2})]
+
+REFERENCE = ('DOPRI45', {'rtol': 1E-12, 'atol': 1E-15})
+
+
+def run(scenario_kwargs, method, options, memory=False):
+    """Run one scenario with one method configuration.
+
+    Returns:
+        power - logged power.
+        stats - the solver's stats after the run.
+        wall - wall time in seconds.
+        peak - peak traced memory in bytes, or None."""
+
+    scenario = Scenario(method=method, solver_options=dict(options),
+                        **scenario_kwargs)
+
+    if memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+
+    with np.errstate(all='ignore'):
+        solver = scenario.run()
+
+    wall = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return solver.logger1.column('power').copy(), solver.stats, wall, peak
+
+
+def warm_up(methods, extra):
+    """Run each method once on a short scenario, so compiling the kernels
+    is not included in the timings."""
+
+    for method in methods:
+        run(dict(actions=[('set_power', 1E8), ('set_rho', 1E-4),
+                          ('solve', 0.1)]), method, dict(extra))
+
+
+def label(method, options):
+    return method + ' ' + ' '.join(key + '=' + format(value, 'g')
+                                   for key, value in sorted(options.items())
+                                   if key != 'compiled')
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply scenario durations by this factor')
+    parser.add_argument('--scenarios', nargs='*',
+                        help='only run the named scenarios')
+    parser.add_argument('--methods', nargs='*',
+                        help='only run the named methods')
+    parser.add_argument('--python', action='store_true',
+                        help='disable the compiled kernels')
+    parser.add_argument('--memory', action='store_true',
+                        help='also measure peak memory, in a second run')
+    parser.add_argument('--save', help='write throughput to this JSON file')
+    parser.add_argument('--compare',
+                        help='compare throughput against this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed fractional throughput regression')
+    args = parser.parse_args(argv)
+
+    extra = {'compiled': False} if args.python else {}
+
+    throughput = {}
+
+    warm_up(sorted(set(method for method, options in CONFIGURATIONS
+                       if not args.methods or method in args.methods)),
+            extra)
+
+    for name, duration, scenario_kwargs in scenarios(args.scale):
+        if args.scenarios and name not in args.scenarios:
+            continue
+
+        reference = run(scenario_kwargs, REFERENCE[0],
+                        dict(REFERENCE[1], **extra))[0]
+        scale = np.max(np.abs(reference))
+
+        print()
+        print('Scenario ' + name + ' (' + format(duration, 'g') +
+              ' s simulated)')
+        print('{:<28}{:>12}{:>12}{:>14}{:>14}{:>12}{:>12}'.format(
+            'method', 'rhs calls', 'wall (s)', 'sim s/wall s', 'steps/s',
+            'peak (kB)', 'error'))
+
+        for method, options in CONFIGURATIONS:
+            if args.methods and method not in args.methods:
+                continue
+
+            options = dict(options, **extra)
+
+            power, stats, wall, peak = run(scenario_kwargs, method,
+                                           options)
+            if args.memory:
+                peak = run(scenario_kwargs, method, options, memory=True)[3]
+
+            if power.shape == reference.shape and np.all(np.isfinite(power)):
+                error = format(np.max(np.abs(power - reference)) / scale,
+                               '.2e')
+            else:
+                error = 'unstable'
+
+            key = name + ': ' + label(method, options)
+            if args.python:
+                key += ' (python)'
+            throughput[key] = duration / wall
+
+            print('{:<28}{:>12}{:>12.3f}{:>14.4g}{:>14}{:>12}{:>12}'.format(
+                label(method, options), stats['rhs_calls'], wall,
+                throughput[key],
+                format(stats['steps'] / stats['time_integrate'], '.3g'),
+                '-' if peak is None else format(peak / 1024, '.0f'),
+                error))
+
+    if args.save:
+        with open(args.save, 'w') as save_file:
+            json.dump(throughput, save_file, indent=1, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = [key for key in throughput if key in baseline and
+                       throughput[key] < (1 - args.tolerance)*baseline[key]]
+
+        print()
+        for key in regressions:
+            print('Throughput regression: ' + key + ' ' +
+                  format(throughput[key], '.4g') + ' sim s/wall s against ' +
+                  format(baseline[key], '.4g'))
+
+        if regressions:
+            return 1
+
+        print('No throughput regressions against ' + args.compare)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""Error and cost of the prompt jump approximation on slow transients.
+
+Runs a rod step, a slow reactivity ramp such as a boron dilution and a load
+follow with thermal feedback, with the full model at the usual millisecond
+step and with the prompt jump model at steps of seconds. For each run it
+prints the gradient (RHS) evaluations, the wall time and the largest error in
+power relative to a high precision solution of the full model. Right after a
+reactivity step the full model is still in its prompt transient, which the
+approximation skips, so the error is taken from ten prompt time constants
+after every step. The first order estimate of the error,
+n_gen_time/(beta - rho) times the relative rate of change of the reference
+power, is printed with each scenario.
+
+    python benchmarks/bench_prompt_jump.py --scale 0.5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from openpointkinetics.PointKineticsConstants import PointKineticsConstants
+from openpointkinetics.ScenarioRunner import Scenario
+from openpointkinetics import Schedule
+
+
+def scenarios(scale):
+    """Return the benchmark scenarios as (name, Scenario kwargs).
+
+    Durations of the timed phases are multiplied by scale."""
+
+    dilution = Schedule.PiecewiseLinear([0.0, 1800.0*scale], [0.0, 3E-4])
+
+    load_follow = Schedule.PiecewiseLinear(
+        [0.0, 600.0*scale, 1200.0*scale, 2400.0*scale, 3000.0*scale],
+        [0.0, -1000.0E6, -1000.0E6, 0.0, 0.0])
+
+    return [
+        ('rod_step', dict(
+            thermal_params='example', log_freq=1.0,
+            actions=[('settle', 300, 1E-6, 1.0, True),
+                     ('solve', 30*scale),
+                     ('add_rho', 5E-4), ('solve', 300*scale),
+                     ('add_rho', -1E-3), ('solve', 300*scale)])),
+        ('dilution', dict(
+            thermal_params='example', log_freq=10.0,
+            actions=[('settle', 300, 1E-6, 1.0, True),
+                     ('set_rho_schedule', dilution),
+                     ('solve', 1800*scale)])),
+        ('load_follow', dict(
+            thermal_params='example', log_freq=10.0,
+            actions=[('settle', 300, 1E-6, 1.0, True),
+                     ('set_demand_schedule', load_follow),
+                     ('solve', 3600*scale)])),
+    ]
+
+
+CONFIGURATIONS = [('full', 'RK4', {'h': 1E-3}),
+                  ('full', 'DOPRI45', {'rtol': 1E-6}),
+                  ('prompt jump', 'RK4', {'h': 0.5}),
+                  ('prompt jump', 'DOPRI45', {'rtol': 1E-6}),
+                  ('prompt jump', 'ROS2', {'h': 1.0}),
+                  ('prompt jump', 'ROS2', {'h': 5.0})]
+
+REFERENCE = ('DOPRI45', {'rtol': 1E-12, 'atol': 1E-15})
+
+
+def run(scenario_kwargs, method, options):
+    """Run one scenario with one method configuration.
+
+    Returns:
+        log - dictionary of the logged t, power and rho columns.
+        stats - the solver's stats after the run.
+        wall - wall time in seconds."""
+
+    scenario = Scenario(method=method, solver_options=dict(options),
+                        **scenario_kwargs)
+
+    start = time.perf_counter()
+
+    with np.errstate(all='ignore'):
+        solver = scenario.run()
+
+    wall = time.perf_counter() - start
+
+    log = {name: solver.logger1.column(name).copy()
+           for name in ['t', 'power', 'rho']}
+
+    return log, solver.stats, wall
+
+
+def settled(reference, constants):
+    """Mask of the samples at least ten prompt time constants,
+    n_gen_time/(beta - rho), after every step in reactivity, and the first
+    order error estimate of the approximation over them."""
+
+    t = reference['t']
+    rho = reference['rho']
+    power = reference['power']
+
+    prompt = constants.n_gen_time / (constants.beta - rho)
+    mask = np.ones(len(t), dtype=bool)
+
+    for i in np.flatnonzero(np.abs(np.diff(rho)) > 1E-5):
+        mask &= (t < t[i+1]) | (t >= t[i+1] + 10*prompt.max())
+
+    estimate = prompt * np.abs(np.gradient(power, t)) / power
+
+    return mask, estimate[mask].max()
+
+
+def label(model, method, options):
+    return model + ' ' + method + ' ' + ' '.join(
+        key + '=' + format(value, 'g')
+        for key, value in sorted(options.items()))
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply scenario durations by this factor')
+    args = parser.parse_args(argv)
+
+    constants = PointKineticsConstants()
+
+    """Compile the kernels before timing."""
+    run(dict(actions=[('set_power', 1E8), ('solve', 0.1)]), 'RK4', {})
+
+    for name, scenario_kwargs in scenarios(args.scale):
+        reference = run(scenario_kwargs, REFERENCE[0], REFERENCE[1])[0]
+        mask, estimate = settled(reference, constants)
+
+        print()
+        print('Scenario ' + name + ' (' +
+              format(reference['t'][-1], 'g') + ' s simulated), estimated '
+              'error ' + format(estimate, '.1e'))
+        print('{:<36}{:>12}{:>12}{:>12}'.format('model and method',
+                                                'rhs calls', 'wall (s)',
+                                                'error'))
+
+        for model, method, options in CONFIGURATIONS:
+            options = dict(options, prompt_jump=(model == 'prompt jump'))
+
+            log, stats, wall = run(scenario_kwargs, method, options)
+            del options['prompt_jump']
+
+            if (log['power'].shape == reference['power'].shape and
+                    np.all(np.isfinite(log['power']))):
+                error = format(np.max(np.abs(log['power'] /
+                                             reference['power'] - 1)[mask]),
+                               '.2e')
+            else:
+                error = 'unstable'
+
+            print('{:<36}{:>12}{:>12.3f}{:>12}'.format(
+                label(model, method, options), stats['rhs_calls'], wall,
+                error))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
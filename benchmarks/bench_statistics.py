@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Accuracy of the streaming quantile sketches against numpy.
+
+Folds samples of several magnitudes and signs into OnlineStatistics, in one
+batch and as chunks merged afterwards, and compares the quantiles with
+np.quantile of all the samples. The sketch guarantees a relative error of
+its accuracy, so the run fails with a non-zero exit status if any quantile
+misses by more than that. The magnitudes of each case span fewer buckets
+than the sketch keeps, beyond which the smallest magnitudes lose accuracy by
+design.
+
+    python benchmarks/bench_statistics.py --samples 20000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from openpointkinetics.OnlineStatistics import OnlineStatistics
+
+
+QUANTILES = [0.01, 0.1, 0.5, 0.9, 0.99]
+
+
+def cases(samples, rng):
+    """Return (name, values) pairs of shape (samples, 1, 1)."""
+
+    return [(name, values.reshape(samples, 1, 1)) for name, values in [
+        ('lognormal 1e-5', rng.lognormal(np.log(1E-5), 0.1, samples)),
+        ('lognormal 1e9', rng.lognormal(np.log(1E9), 0.1, samples)),
+        ('normal 1.7e-4 +- 2e-5', rng.normal(1.7E-4, 2E-5, samples)),
+        ('normal -3e-12 +- 5e-13', rng.normal(-3E-12, 5E-13, samples)),
+    ]]
+
+
+def error(statistics, values):
+    """Largest relative error of the sketched quantiles."""
+
+    worst = 0.0
+
+    for q in QUANTILES:
+        exact = np.quantile(values, q, axis=0, method='lower')
+        worst = max(worst, np.max(np.abs(statistics.quantile(q) - exact) /
+                                  np.abs(exact)))
+
+    return worst
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--chunks', type=int, default=8)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    failed = False
+
+    print()
+    print('{:<26}{:>10}{:>16}{:>16}'.format('values', 'accuracy',
+                                            'single error', 'merged error'))
+
+    for name, values in cases(args.samples, rng):
+        for accuracy in [0.01, 0.002, 0.001]:
+            single = OnlineStatistics((1, 1), accuracy)
+            single.update(values)
+
+            merged = OnlineStatistics((1, 1), accuracy)
+            for chunk in np.array_split(values, args.chunks):
+                part = OnlineStatistics((1, 1), accuracy)
+                part.update(chunk)
+                merged.merge(part)
+
+            errors = [error(single, values), error(merged, values)]
+            failed |= max(errors) > accuracy
+
+            print('{:<26}{:>10g}{:>16.2e}{:>16.2e}'.format(name, accuracy,
+                                                            *errors))
+
+    if failed:
+        print()
+        print('Quantile error above the sketch accuracy.')
+
+    return int(failed)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Shape-preserving downsampling of long series for plotting.
+
+A plot is only a few thousand pixels wide, so drawing every one of a million
+samples wastes time and memory without changing the picture. These functions
+choose a subset of the samples that keeps the visible shape of a series, and
+return their indices so the same subset can be taken from any column.
+"""
+import numpy as np
+
+
+def min_max(y, max_points):
+    """Indices of the smallest and largest sample in each of max_points/2
+    equal buckets, plus the first and last samples.
+
+    Peaks and troughs, such as a prompt jump in power, are always kept.
+    Fully vectorised.
+
+    Args:
+        y - 1-D array of values.
+        max_points - approximate number of samples to keep.
+
+    Returns:
+        indices - ascending array of the kept sample indices."""
+
+    y = np.asarray(y)
+    n = len(y)
+    buckets = max_points // 2
+
+    if n <= max_points or buckets < 1:
+        return np.arange(n)
+
+    size = -(-n // buckets)
+    full = n // size
+
+    body = y[:full*size].reshape(full, size)
+    starts = np.arange(full) * size
+
+    parts = [starts + body.argmin(axis=1), starts + body.argmax(axis=1),
+             [0, n-1]]
+
+    if full*size < n:
+        rest = y[full*size:]
+        parts.append([full*size + rest.argmin(), full*size + rest.argmax()])
+
+    return np.unique(np.concatenate(parts).astype(np.intp))
+
+
+def lttb(x, y, max_points):
+    """Indices chosen by the largest-triangle-three-buckets algorithm.
+
+    The first and last samples are kept, and from each of max_points-2
+    buckets between them the sample forming the largest triangle with the
+    previously kept sample and the mean of the next bucket. This follows the
+    shape of a curve more smoothly than `min_max`, at the cost of a loop over
+    the buckets.
+
+    Args:
+        x - 1-D array of x values.
+        y - 1-D array of y values.
+        max_points - number of samples to keep.
+
+    Returns:
+        indices - ascending array of the kept sample indices."""
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n-1, max_points-1).astype(np.intp)
+    edges = np.append(edges, n)  # the last "next bucket" is the last sample
+
+    indices = np.empty(max_points, dtype=np.intp)
+    indices[0] = 0
+    indices[-1] = n-1
+
+    a = 0
+    for i in range(max_points-2):
+        start, stop = edges[i], edges[i+1]
+        next_start, next_stop = edges[i+1], edges[i+2]
+
+        mean_x = x[next_start:next_stop].mean()
+        mean_y = y[next_start:next_stop].mean()
+
+        area = np.abs((x[a] - mean_x) * (y[start:stop] - y[a]) -
+                      (x[a] - x[start:stop]) * (mean_y - y[a]))
+
+        a = start + int(np.argmax(area))
+        indices[i+1] = a
+
+    return indices
@@ -0,0 +1,331 @@
+"""On-disk caches.
+
+A DiskCache keeps entries of named numpy arrays in a directory, one file per
+entry, named by a hash of whatever determines the entry. Reading an entry
+refreshes its modification time, and after every write the least recently
+used entries are deleted until the cache is within its size cap, so the
+directory never grows without bound. Entries are written to a temporary file
+and renamed into place, so a reader never sees a partly written entry.
+
+SettleCache stores the settled state of a PointKineticsSolver, keyed by its
+constants, method and state before settling, so `settle` can return a
+previously computed equilibrium immediately.
+
+ResultCache stores the logged trajectory and final state of a
+PointKineticsSolver `solve`, keyed by everything that determines them and
+the library version. Its entries are read memory-mapped, so a hit costs no
+parsing and only the pages that are used are read.
+"""
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import zipfile
+
+import numpy as np
+
+
+def default_path(name):
+    """Return the directory of a named cache under $OPENPOINTKINETICS_CACHE,
+    or under ~/.cache/openpointkinetics if that is not set."""
+
+    root = os.environ.get('OPENPOINTKINETICS_CACHE',
+                          os.path.join(os.path.expanduser('~'), '.cache',
+                                       'openpointkinetics'))
+
+    return os.path.join(root, name)
+
+
+def _jsonable(value):
+    """Convert numpy values for hashing as JSON."""
+
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+
+    raise TypeError("Cannot hash a value of type " + type(value).__name__)
+
+
+class DiskCache:
+    """Directory of cache entries with least recently used eviction.
+
+    Args:
+        path - directory holding the entries. Created if needed.
+        max_bytes - size cap of all the entries together.
+        max_entries - optional cap on the number of entries."""
+
+    SUFFIX = '.npz'
+
+    def __init__(self, path, max_bytes=64*2**20, max_entries=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        os.makedirs(self.path, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """Return a hex digest identifying an entry.
+
+        Args:
+            parts - values that determine the entry: numbers, strings,
+                lists, dictionaries and numpy arrays. Floats are hashed
+                exactly.
+
+        Returns:
+            key - SHA-256 hex digest of the parts.
+
+        Excepts:
+            TypeError if a part cannot be hashed."""
+
+        text = json.dumps(parts, sort_keys=True, default=_jsonable)
+
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + self.SUFFIX)
+
+    def __contains__(self, key):
+        return os.path.exists(self._entry_path(key))
+
+    def __len__(self):
+        return len(self._entries())
+
+    def _entries(self):
+        """Return (mtime, size, path) of every entry."""
+
+        entries = []
+
+        for name in os.listdir(self.path):
+            if not name.endswith(self.SUFFIX):
+                continue
+
+            path = os.path.join(self.path, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # evicted by another process
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        return entries
+
+    def _read(self, path):
+        """Load the arrays of an entry file."""
+
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def _write(self, path, arrays):
+        """Write the arrays of an entry to path."""
+
+        with open(path, 'wb') as entry_file:
+            np.savez(entry_file, **arrays)
+
+    def get(self, key):
+        """Return the arrays stored under key, or None.
+
+        A hit marks the entry as most recently used. An unreadable entry is
+        deleted and treated as a miss.
+
+        Returns:
+            arrays - dictionary of the stored numpy arrays, or None.
+
+        Excepts:
+            None"""
+
+        path = self._entry_path(key)
+
+        try:
+            arrays = self._read(path)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zipfile.BadZipFile):
+            self.invalidate(key)
+            return None
+
+        return arrays
+
+    def put(self, key, **arrays):
+        """Store arrays under key, then evict entries beyond the caps.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        handle, temp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        os.close(handle)
+
+        try:
+            self._write(temp_path, arrays)
+            os.replace(temp_path, self._entry_path(key))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used entries until the cache is within
+        max_bytes and max_entries. The newest entry is always kept."""
+
+        entries = sorted(self._entries())
+        total = sum(size for mtime, size, path in entries)
+
+        while len(entries) > 1 and (
+                total > self.max_bytes or
+                (self.max_entries is not None and
+                 len(entries) > self.max_entries)):
+            mtime, size, path = entries.pop(0)
+            total -= size
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def invalidate(self, key=None):
+        """Delete the entry stored under key, or every entry if key is
+        None."""
+
+        if key is not None:
+            paths = [self._entry_path(key)]
+        else:
+            paths = [path for mtime, size, path in self._entries()]
+
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class SettleCache(DiskCache):
+    """Cache of settled PointKineticsSolver states.
+
+    Args:
+        path - directory holding the entries. Defaults to a 'settle'
+            directory under `default_path`.
+        max_bytes - size cap of all the entries together.
+        max_entries - optional cap on the number of entries."""
+
+    def __init__(self, path=None, max_bytes=16*2**20, max_entries=None):
+
+        if path is None:
+            path = default_path('settle')
+
+        DiskCache.__init__(self, path, max_bytes, max_entries)
+
+    def settle_key(self, solver, *settle_args):
+        """Return the key of the settled state of solver.
+
+        The key covers the constants, the model, the method and its options
+        and the state before settling, less its time, together with the
+        arguments of `settle`."""
+
+        constants = solver.constants
+
+        return self.key(list(constants.beta_groups),
+                        list(constants.lambda_groups),
+                        constants.n_gen_time,
+                        solver.method_name, solver.method_options,
+                        solver.exact_linear, solver.prompt_jump,
+                        solver.state.vectorise()[1:],
+                        list(settle_args))
+
+
+class ResultCache(DiskCache):
+    """Content-addressed cache of PointKineticsSolver `solve` results.
+
+    Entries are uncompressed .npz files, and their arrays are returned as
+    read-only numpy memory maps into them.
+
+    Args:
+        path - directory holding the entries. Defaults to a 'results'
+            directory under `default_path`.
+        max_bytes - size cap of all the entries together.
+        max_entries - optional cap on the number of entries."""
+
+    def __init__(self, path=None, max_bytes=256*2**20, max_entries=None):
+
+        if path is None:
+            path = default_path('results')
+
+        DiskCache.__init__(self, path, max_bytes, max_entries)
+
+        self.hits = 0
+        self.misses = 0
+
+    def _read(self, path):
+        """Map every array of an entry file into memory."""
+
+        arrays = {}
+
+        with zipfile.ZipFile(path) as archive, open(path, 'rb') as data:
+            for info in archive.infolist():
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError("Compressed cache entry " + path)
+
+                """The array header follows the member's local file header,
+                whose name and extra fields have lengths of their own."""
+                data.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack('<HH',
+                                                          data.read(4))
+                data.seek(name_length + extra_length, os.SEEK_CUR)
+
+                version = np.lib.format.read_magic(data)
+                if version == (1, 0):
+                    header = np.lib.format.read_array_header_1_0(data)
+                else:
+                    header = np.lib.format.read_array_header_2_0(data)
+                shape, fortran_order, dtype = header
+
+                name = info.filename[:-len('.npy')]
+
+                if int(np.prod(shape)) == 0 or shape == ():
+                    arrays[name] = np.fromfile(
+                        data, dtype, int(np.prod(shape))).reshape(shape)
+                else:
+                    arrays[name] = np.memmap(
+                        path, dtype, 'r', data.tell(), shape,
+                        'F' if fortran_order else 'C')
+
+        return arrays
+
+    def solve_key(self, solver, t_change, log_freq, log):
+        """Return the key of a `solve` of solver, or None if its input
+        schedules cannot be hashed.
+
+        The key covers the library version, the constants, the model, the
+        whole state including its time, the input schedules, the method, its
+        options and current step, and the arguments of `solve`."""
+
+        from openpointkinetics import __version__
+
+        schedules = []
+
+        for schedule in [solver.pk_model.rho_schedule,
+                         solver.pk_model.demand_schedule]:
+            if schedule is None:
+                schedules.append(None)
+            elif hasattr(schedule, 'cache_key'):
+                schedules.append(schedule.cache_key())
+            else:
+                return None
+
+        constants = solver.constants
+
+        return self.key(__version__,
+                        list(constants.beta_groups),
+                        list(constants.lambda_groups),
+                        constants.n_gen_time,
+                        solver.method_name, solver.method_options,
+                        solver.method.h, solver.exact_linear,
+                        solver.prompt_jump, solver.state.vectorise(),
+                        schedules,
+                        t_change, log_freq, log)
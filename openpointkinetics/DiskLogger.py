@@ -0,0 +1,161 @@
+"""Streaming on-disk logging module.
+
+A Logger that keeps only a fixed-size buffer of rows in memory and streams
+them to disk as the run progresses, so memory use stays constant however
+long the run is. Each column is stored as a raw little-endian float64 file
+in a trajectory directory, next to a small `meta.json` recording the column
+names and the number of rows written. A finished or running trajectory can
+be reopened with `DiskLogger.open`, which memory-maps the columns instead of
+loading them.
+"""
+import json
+import os
+
+import numpy as np
+
+from openpointkinetics.Logger import Logger
+
+
+class DiskLogger(Logger):
+    """Logger streaming its columns to a trajectory directory.
+
+    Args:
+        path - directory to write the trajectory to. Created if needed.
+        columns - optional list of column names, the first of which is the
+            x-axis. PointKineticsSolver sets these itself.
+        flush_rows - number of rows buffered in memory between writes."""
+
+    DTYPE = '<f8'
+
+    def __init__(self, path, columns=None, flush_rows=4096):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.written = 0
+        self.read_only = False
+
+        Logger.__init__(self, columns, flush_rows)
+
+    @classmethod
+    def open(cls, path):
+        """Reopen a trajectory directory for reading.
+
+        Args:
+            path - trajectory directory written by a DiskLogger.
+
+        Returns:
+            logger - read-only DiskLogger whose columns are memory-mapped.
+
+        Excepts:
+            None"""
+
+        with open(os.path.join(path, 'meta.json')) as meta_file:
+            meta = json.load(meta_file)
+
+        logger = cls.__new__(cls)
+        Logger.__init__(logger)
+        logger.path = path
+        logger.flush_rows = 0
+        logger.columns = meta['columns']
+        logger.index = {name: i for i, name in enumerate(logger.columns)}
+        logger.written = meta['rows']
+        logger.read_only = True
+
+        return logger
+
+    def _column_path(self, name):
+        return os.path.join(self.path, name + '.f8')
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, 'meta.json'), 'w') as meta_file:
+            json.dump({'columns': self.columns, 'rows': self.written,
+                       'dtype': self.DTYPE}, meta_file)
+
+    def set_columns(self, columns, capacity=None):
+        """Name the columns and start a new, empty trajectory on disk.
+
+        Args:
+            columns - list of column names, the first of which is the x-axis.
+            capacity - ignored, the buffer holds flush_rows rows.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        Logger.set_columns(self, columns, self.flush_rows)
+
+        os.makedirs(self.path, exist_ok=True)
+
+        for name in self.columns:
+            open(self._column_path(name), 'wb').close()
+
+        self.written = 0
+        self._write_meta()
+
+    def flush(self):
+        """Append the buffered rows to the column files.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        if self.read_only or self.rows == 0:
+            return
+
+        for i, name in enumerate(self.columns):
+            with open(self._column_path(name), 'ab') as column_file:
+                column_file.write(self.block[i, :self.rows]
+                                  .astype(self.DTYPE).tobytes())
+
+        self.written += self.rows
+        self.rows = 0
+        self._write_meta()
+
+    def close(self):
+        """Flush any buffered rows. The trajectory can still be read."""
+
+        self.flush()
+
+    def log_row(self, row):
+        """Buffer one sample, writing the buffer to disk when it is full."""
+
+        if self.rows == self.block.shape[1]:
+            self.flush()
+
+        Logger.log_row(self, row)
+
+    def log_rows(self, rows):
+        """Buffer many samples, writing to disk as the buffer fills."""
+
+        rows = np.asarray(rows, dtype=float)
+
+        for start in range(0, rows.shape[0], self.block.shape[1]):
+            chunk = rows[start:start+self.block.shape[1]]
+
+            if self.rows + chunk.shape[0] > self.block.shape[1]:
+                self.flush()
+
+            Logger.log_rows(self, chunk)
+
+    def column(self, name):
+        """Return the values of one column as a read-only memory map.
+
+        Buffered rows are flushed first so the whole run is visible."""
+
+        self.flush()
+
+        if self.written == 0:
+            return np.zeros(0)
+
+        return np.memmap(self._column_path(name), dtype=self.DTYPE, mode='r',
+                         shape=(self.written,))
+
+    def view(self):
+        """Return a (columns, samples) array of the whole trajectory.
+
+        This loads every column into memory; prefer `column` or `get`."""
+
+        return np.array([self.column(name) for name in self.columns])
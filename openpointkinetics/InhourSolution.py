@@ -0,0 +1,108 @@
+"""Closed-form point kinetics solution without thermal feedback.
+
+With no thermal feedback the reactivity is constant between changes made by
+the user, so power and precursors obey the linear, constant coefficient
+system x' = A x with x = [power, c1...cN]. The eigenvalues of A are the roots
+of the inhour equation, and the solution at any time is
+
+    x(t) = V exp(W t) V^-1 x(0)
+
+where W and V are the eigenvalues and eigenvectors of A. The decomposition is
+cached per (constants, rho) so repeated reactivity steps reuse it.
+"""
+import numpy as np
+
+
+_DECOMPOSITIONS = {}  # shared decomposition cache, see `decomposition`
+
+CACHE_SIZE = 256  # maximum number of cached decompositions
+
+
+def kinetics_matrix(constants, rho):
+    """Build the matrix A of the linear point kinetics system.
+
+    Args:
+        constants - PointKineticsConstants instance.
+        rho - constant reactivity.
+
+    Returns:
+        matrix - (ndg+1, ndg+1) array acting on [power, c1...cN].
+
+    Excepts:
+        None"""
+
+    beta_groups = np.asarray(constants.beta_groups, dtype=float)
+    lambda_groups = np.asarray(constants.lambda_groups, dtype=float)
+
+    matrix = np.zeros((constants.ndg+1, constants.ndg+1))
+
+    matrix[0, 0] = (rho - constants.beta) / constants.n_gen_time
+    matrix[0, 1:] = lambda_groups
+    matrix[1:, 0] = beta_groups / constants.n_gen_time
+    matrix[1:, 1:] = np.diag(-lambda_groups)
+
+    return matrix
+
+
+def decomposition(constants, rho):
+    """Return the cached eigendecomposition of the kinetics matrix.
+
+    Args:
+        constants - PointKineticsConstants instance.
+        rho - constant reactivity.
+
+    Returns:
+        eigenvalues - array of the inhour roots.
+        eigenvectors - matrix with the eigenvectors as columns.
+        inverse - inverse of the eigenvector matrix.
+
+    Excepts:
+        None"""
+
+    key = (tuple(constants.beta_groups), tuple(constants.lambda_groups),
+           constants.n_gen_time, rho)
+
+    if key not in _DECOMPOSITIONS:
+        if len(_DECOMPOSITIONS) >= CACHE_SIZE:
+            del _DECOMPOSITIONS[next(iter(_DECOMPOSITIONS))]
+
+        eigenvalues, eigenvectors = np.linalg.eig(kinetics_matrix(constants,
+                                                                  rho))
+        _DECOMPOSITIONS[key] = (eigenvalues, eigenvectors,
+                                np.linalg.inv(eigenvectors))
+
+    return _DECOMPOSITIONS[key]
+
+
+def evaluate(constants, vector, dts):
+    """Evaluate the closed-form solution at several times.
+
+    Args:
+        constants - PointKineticsConstants instance.
+        vector - vectorised PointKineticsState to start from. Its heat
+            capacity must be <= 0, i.e. no thermal feedback.
+        dts - array of times, measured from the time of vector, at which to
+            evaluate the solution.
+
+    Returns:
+        states - array of shape (len(dts), ndg+7) with one vectorised state
+            per requested time.
+
+    Excepts:
+        None"""
+
+    vector = np.asarray(vector, dtype=float)
+    dts = np.asarray(dts, dtype=float)
+
+    eigenvalues, eigenvectors, inverse = decomposition(constants, vector[2])
+
+    modes = inverse @ vector[[1] + list(range(7, vector.shape[0]))]
+    kinetics = (np.exp(np.outer(dts, eigenvalues)) * modes) @ eigenvectors.T
+
+    states = np.empty((dts.shape[0], vector.shape[0]))
+    states[:] = vector
+    states[:, 0] = vector[0] + dts
+    states[:, 1] = kinetics[:, 0].real
+    states[:, 7:] = kinetics[:, 1:].real
+
+    return states
@@ -0,0 +1,293 @@
+"""Inverse point kinetics: reactivity from a measured power trace.
+
+Solving the power equation for the reactivity gives
+
+    rho(t) = beta + n_gen_time * (dP/dt - sum_i lambda_i C_i) / P
+
+where the precursors C_i obey dC_i/dt = beta_i/n_gen_time P - lambda_i C_i.
+Writing C_i as a convolution of the whole power history costs O(N^2) for N
+samples. Instead, with the power taken as linear between samples, each group
+is updated exactly from one sample to the next,
+
+    C_i(t+dt) = exp(-lambda_i dt) C_i(t) + beta_i/n_gen_time *
+                (P(t) B_i + P(t+dt) (A_i - B_i))
+
+    A_i = (1 - exp(-lambda_i dt)) / lambda_i
+    B_i = (1 - exp(-lambda_i dt) (1 + lambda_i dt)) / (lambda_i^2 dt)
+
+so the cost is O(N), the sampling may be non-uniform, and only the last
+samples and the precursors are carried from one chunk of a stream to the
+next. Within a chunk the recurrence is evaluated with cumulative sums rather
+than a Python loop. dP/dt is taken from the last three samples, which is
+second order on a non-uniform grid; noisy traces should be filtered first,
+as the derivative amplifies noise by n_gen_time/dt.
+"""
+import numpy as np
+
+from openpointkinetics.PointKineticsConstants import PointKineticsConstants
+
+
+DECAY_LIMIT = 200.0  # largest decay exponent lambda*dt summed in one block
+
+
+class InverseKinetics:
+    """Streaming reactivity reconstruction from power samples.
+
+    Feed it chunks of sample times and powers with `process`, or an iterable
+    of chunks with `stream`, and get the reactivity at every sample. Memory
+    does not grow with the length of the trace.
+
+    Args:
+        constants - PointKineticsConstants of the reactor. Defaults to the
+            PointKineticsConstants defaults.
+        precursors - optional precursor concentrations at the first sample.
+            By default the reactor is taken to be critical and in
+            equilibrium there, so the first reactivity is zero."""
+
+    def __init__(self, constants=None, precursors=None):
+
+        if constants is None:
+            constants = PointKineticsConstants()
+
+        self.constants = constants
+
+        self.lambda_groups = np.asarray(constants.lambda_groups, dtype=float)
+        self.beta_over_gen = (np.asarray(constants.beta_groups, dtype=float) /
+                              constants.n_gen_time)
+
+        self.initial_precursors = precursors
+
+        self.reset()
+
+    def reset(self):
+        """Forget the samples seen so far, to start a new trace.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        self.t = np.empty(0)  # the last (up to two) samples seen
+        self.power = np.empty(0)
+
+        if self.initial_precursors is None:
+            self.precursors = None
+        else:
+            self.precursors = np.array(self.initial_precursors, dtype=float)
+
+        self.samples = 0
+
+    def process(self, t, power):
+        """Reconstruct the reactivity at a chunk of samples.
+
+        Args:
+            t - array of sample times, strictly increasing and later than
+                the samples of previous chunks.
+            power - array of the power at each sample time.
+
+        Returns:
+            rho - array of the reactivity at each sample time.
+
+        Excepts:
+            ValueError - if t and power differ in length or the sample times
+                do not increase."""
+
+        t = np.asarray(t, dtype=float).ravel()
+        power = np.asarray(power, dtype=float).ravel()
+
+        if t.shape != power.shape:
+            raise ValueError('t and power must have the same length, got ' +
+                             str(len(t)) + ' and ' + str(len(power)))
+
+        if len(t) == 0:
+            return np.empty(0)
+
+        if self.precursors is None:
+            self.precursors = (self.beta_over_gen * power[0] /
+                               self.lambda_groups)
+
+        """Carry the last two samples of the previous chunk, which the first
+        update and derivatives of this chunk need."""
+        carried = len(self.t)
+        t_all = np.concatenate([self.t, t])
+        power_all = np.concatenate([self.power, power])
+
+        dt = np.diff(t_all)
+
+        if np.any(dt <= 0):
+            raise ValueError('sample times must be strictly increasing')
+
+        if carried:
+            steps = slice(carried - 1, None)
+            precursors = self._precursors(dt[steps], power_all[steps])
+        else:
+            precursors = np.concatenate(
+                [self.precursors[:, None], self._precursors(dt, power_all)],
+                axis=1)
+
+        d_power = self._derivative(t_all, power_all, dt)[carried:]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rho = (self.constants.beta + self.constants.n_gen_time *
+                   (d_power - self.lambda_groups @ precursors) / power)
+
+        self.precursors = precursors[:, -1]
+        self.t = t_all[-2:]
+        self.power = power_all[-2:]
+        self.samples += len(t)
+
+        return rho
+
+    def stream(self, chunks):
+        """Reconstruct the reactivity of a stream of chunks.
+
+        Args:
+            chunks - iterable of (t, power) array pairs, e.g. from `chunked`
+                or read block by block from a historian export.
+
+        Returns:
+            generator of (t, rho) array pairs, one per chunk.
+
+        Excepts:
+            ValueError - see `process`."""
+
+        for t, power in chunks:
+            yield t, self.process(t, power)
+
+    def _precursors(self, dt, power):
+        """Precursors after each of the len(dt) steps from the carried ones.
+
+        Args:
+            dt - array of step lengths.
+            power - array of the power at the start of the first step and
+                the end of every step, len(dt)+1 long.
+
+        Returns:
+            precursors - array of shape (ndg, len(dt))."""
+
+        lambdas = self.lambda_groups
+
+        if len(dt) == 0:
+            return np.empty((len(lambdas), 0))
+
+        x = lambdas[:, None] * dt
+
+        """exp(-x) = 1 + expm1(-x) keeps A accurate for small x. B loses all
+        precision to cancellation there, so it takes its series instead."""
+        a = np.expm1(-x)
+        decay = a + 1.0
+        a /= -lambdas[:, None]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            b = np.where(x < 1E-3, dt * (0.5 - x*(1.0/3.0 - x/8.0)),
+                         (a - dt*decay) / x)
+
+        source = b * power[:-1]
+        source += (a - b) * power[1:]
+        source *= self.beta_over_gen[:, None]
+
+        """C_k = decay_k C_{k-1} + source_k is solved in blocks as
+        C_k = (C_0 + sum_j source_j exp(s_j)) / exp(s_k), with s the
+        cumulative decay exponent from the start of the block. Blocks are cut
+        so that exp(s) cannot overflow; a single step decaying by more than
+        DECAY_LIMIT forgets its past anyway, so its exponent is clipped."""
+        np.minimum(x, DECAY_LIMIT, out=x)
+
+        reach = np.cumsum(x[np.argmax(lambdas)])
+        cuts = np.searchsorted(reach, DECAY_LIMIT * np.arange(
+            1, int(reach[-1] // DECAY_LIMIT) + 1))
+
+        precursors = np.empty((len(lambdas), len(dt)))
+        current = self.precursors[:, None]
+
+        for start, stop in zip(np.concatenate([[0], cuts]),
+                               np.concatenate([cuts, [len(dt)]])):
+            if start == stop:
+                continue
+
+            growth = np.exp(np.cumsum(x[:, start:stop], axis=1))
+            block = precursors[:, start:stop]
+
+            np.multiply(source[:, start:stop], growth, out=block)
+            np.cumsum(block, axis=1, out=block)
+            block += current
+            block /= growth
+
+            current = block[:, -1:]
+
+        return precursors
+
+    def _derivative(self, t, power, dt):
+        """dP/dt at every sample from the three latest samples, non-uniform
+        second order backward differences. The second sample of a trace has
+        only a first order backward difference, and the first is taken to
+        be steady."""
+
+        d_power = np.zeros(len(t))
+
+        if len(t) > 1:
+            d_power[1] = (power[1] - power[0]) / dt[0]
+
+        if len(t) > 2:
+            h1 = dt[:-1]
+            h2 = dt[1:]
+            d_power[2:] = (power[:-2] * h2 / (h1 * (h1 + h2)) -
+                           power[1:-1] * (h1 + h2) / (h1 * h2) +
+                           power[2:] * (2*h2 + h1) / (h2 * (h1 + h2)))
+
+        return d_power
+
+
+def chunked(samples, chunk_size=8192):
+    """Group an iterable of (t, power) samples into arrays.
+
+    Args:
+        samples - iterable of (t, power) pairs, e.g. rows of a CSV reader.
+        chunk_size - number of samples per chunk.
+
+    Returns:
+        generator of (t, power) array pairs of up to chunk_size samples.
+
+    Excepts:
+        None"""
+
+    block = np.empty((chunk_size, 2))
+    rows = 0
+
+    for sample in samples:
+        block[rows] = sample
+        rows += 1
+
+        if rows == chunk_size:
+            yield block[:, 0].copy(), block[:, 1].copy()
+            rows = 0
+
+    if rows:
+        yield block[:rows, 0].copy(), block[:rows, 1].copy()
+
+
+def reactivity(t, power, constants=None, chunk_size=8192):
+    """Reconstruct the reactivity of a whole power trace.
+
+    Args:
+        t - array of sample times.
+        power - array of the power at each sample time.
+        constants - PointKineticsConstants of the reactor.
+        chunk_size - number of samples processed at once, which bounds the
+            working memory.
+
+    Returns:
+        rho - array of the reactivity at each sample time.
+
+    Excepts:
+        ValueError - see `InverseKinetics.process`."""
+
+    inverse = InverseKinetics(constants)
+
+    t = np.asarray(t, dtype=float)
+    power = np.asarray(power, dtype=float)
+
+    return np.concatenate([np.empty(0)] + [
+        inverse.process(t[i:i+chunk_size], power[i:i+chunk_size])
+        for i in range(0, len(t), chunk_size)])
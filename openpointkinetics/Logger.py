@@ -1,13 +1,136 @@
 """Logging and plotting module."""
-import matplotlib.pyplot as plt
 import numpy as np
 
 
 class Logger:
-    """Data logging class."""
+    """Data logging class.
 
-    def __init__(self):
-        self.data = {}
+    Samples logged with `log_row` are stored in one preallocated float64
+    block with a named column per variable and a row per sample, the first
+    column being the shared x-axis (e.g. time). The block grows by doubling,
+    so appending a row costs a single array assignment. Individual 2-D
+    datasets can still be logged point by point with `log`.
+
+    Args:
+        columns - optional list of column names for `log_row`, the first of
+            which is the x-axis.
+        capacity - initial number of rows to allocate."""
+
+    def __init__(self, columns=None, capacity=1024):
+        self.datasets = {}
+
+        self.columns = []
+        self.index = {}
+        self.block = np.empty((0, 0))
+        self.rows = 0
+
+        if columns is not None:
+            self.set_columns(columns, capacity)
+
+    def set_columns(self, columns, capacity=1024):
+        """Name the columns of the block, discarding any logged rows.
+
+        Args:
+            columns - list of column names, the first of which is the x-axis.
+            capacity - initial number of rows to allocate.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        self.columns = list(columns)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.block = np.empty((len(self.columns), capacity))
+        self.rows = 0
+
+    def _reserve(self, rows):
+        """Grow the block so that it can hold at least `rows` rows."""
+
+        capacity = self.block.shape[1]
+
+        if rows > capacity:
+            capacity = max(rows, 2*capacity)
+            block = np.empty((len(self.columns), capacity))
+            block[:, :self.rows] = self.block[:, :self.rows]
+            self.block = block
+
+    def log_row(self, row):
+        """Append one sample holding a value for every column.
+
+        Args:
+            row - sequence of values in column order.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        if self.rows == self.block.shape[1]:
+            self._reserve(self.rows + 1)
+
+        self.block[:, self.rows] = row
+        self.rows += 1
+
+    def log_rows(self, rows):
+        """Append many samples at once.
+
+        Args:
+            rows - 2-D array like with one sample per row, in column order.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        rows = np.asarray(rows, dtype=float)
+
+        self._reserve(self.rows + rows.shape[0])
+
+        self.block[:, self.rows:self.rows+rows.shape[0]] = rows.T
+        self.rows += rows.shape[0]
+
+    def view(self):
+        """Return a (columns, samples) view of the logged block."""
+
+        return self.block[:, :self.rows]
+
+    def column(self, name):
+        """Return a view of the logged values of one column."""
+
+        return self.block[self.index[name], :self.rows]
+
+    def get(self, dataset):
+        """Return the x and y values of a column or dataset as arrays.
+
+        Args:
+            dataset - name of a column of the block or of a dataset created
+                with `log`.
+
+        Returns:
+            x - array of x values. Views for columns of the block.
+            y - array of y values. Views for columns of the block.
+
+        Excepts:
+            KeyError if there is no such column or dataset."""
+
+        if dataset in self.index:
+            return self.column(self.columns[0]), self.column(dataset)
+
+        return (np.asarray(self.datasets[dataset][0]),
+                np.asarray(self.datasets[dataset][1]))
+
+    @property
+    def data(self):
+        """Dictionary of (x, y) pairs for every column and dataset."""
+
+        data = {name: self.get(name) for name in self.columns[1:]}
+        data.update(self.datasets)
+
+        return data
 
     def log(self, dataset, x, y):
         """Create a 2-D dataset and add data to it.
@@ -23,14 +146,15 @@ class Logger:
         Excepts:
             None"""
 
-        if dataset not in self.data.keys():
-            self.data[dataset] = ([], [])
+        if dataset not in self.datasets.keys():
+            self.datasets[dataset] = ([], [])
 
-        self.data[dataset][0].append(x)
-        self.data[dataset][1].append(y)
+        self.datasets[dataset][0].append(x)
+        self.datasets[dataset][1].append(y)
 
     def plot(self, datasets, xlabel=None, ylabel=None, title=None, grid=True,
-             xlog=False, ylog=False):
+             xlog=False, ylog=False, max_points=5000, decimation='min_max',
+             path=None):
         """Plotting function.
 
         Args:
@@ -41,6 +165,14 @@ class Logger:
             grid - Boolean for grid on/off.
             xlog - Boolean for logarithmic scale on x-axis.
             ylog - Boolean for logarithmic scale on y-axis.
+            max_points - longest series drawn in full. Longer series are
+                downsampled to about this many points.
+            decimation - 'min_max' to keep the extremes of each bucket of
+                samples, 'lttb' for largest-triangle-three-buckets, or None
+                to draw every point. See the Decimation module.
+            path - if given, write the figure to this image file, in the
+                format given by its extension, instead of showing it. No
+                window or interactive backend is needed.
 
         Returns:
             None
@@ -48,30 +180,51 @@ class Logger:
         Excepts:
             None"""
 
-        fig = plt.figure(figsize=(12, 9))
+        from openpointkinetics import Decimation
+
+        if path is None:
+            import matplotlib.pyplot as plt  # only needed when plotting
+
+            fig = plt.figure(figsize=(12, 9))
+        else:
+            from matplotlib.figure import Figure  # no GUI backend needed
+
+            fig = Figure(figsize=(12, 9))
+
+        axes = fig.add_subplot()
 
         for dataset in datasets:
-            x = np.asarray(self.data[dataset][0])
-            y = np.asarray(self.data[dataset][1])
-            plt.plot(x, y, label=dataset)
+            x, y = self.get(dataset)
+
+            if decimation == 'min_max':
+                indices = Decimation.min_max(y, max_points)
+            elif decimation == 'lttb':
+                indices = Decimation.lttb(x, y, max_points)
+            else:
+                indices = slice(None)
 
-        plt.legend()
+            axes.plot(x[indices], y[indices], label=dataset)
 
-        plt.xlabel(xlabel)
-        plt.ylabel(ylabel)
+        axes.legend()
 
-        plt.title(title)
+        axes.set_xlabel(xlabel)
+        axes.set_ylabel(ylabel)
 
-        plt.grid(grid)
+        axes.set_title(title)
+
+        axes.grid(grid)
 
         if xlog:
-            plt.xscale('log')
+            axes.set_xscale('log')
         else:
-            plt.xscale('linear')
+            axes.set_xscale('linear')
 
         if ylog:
-            plt.yscale('log')
+            axes.set_yscale('log')
         else:
-            plt.yscale('linear')
+            axes.set_yscale('linear')
 
-        plt.show()
+        if path is None:
+            plt.show()
+        else:
+            fig.savefig(path)
@@ -0,0 +1,298 @@
+"""Streaming statistics of many trajectories on a shared grid.
+
+Every trajectory is folded into running statistics as it is produced and
+then discarded, so the memory used depends on the grid and not on the number
+of trajectories. Two sets of statistics built from different trajectories,
+e.g. in different worker processes, merge into the statistics of all of them.
+
+The mean and variance are merged with the pairwise update of Chan, Golub and
+LeVeque, which is Welford's update for a batch. Quantiles come from a
+relative-error sketch after DDSketch (Masson, Rim and Lee, 2019): values are
+counted in buckets whose bounds grow geometrically, so any quantile is known
+to within a relative error, and merging two sketches adds their counts.
+"""
+import numpy as np
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch of values at every point of a grid.
+
+    Values of either sign are counted in buckets (gamma^(k-1), gamma^k] of
+    their magnitude, gamma = (1+accuracy)/(1-accuracy), with one set of
+    buckets shared by every grid point. The buckets span the magnitudes seen
+    so far; beyond max_buckets the smallest magnitudes are lumped together,
+    losing accuracy only for values far smaller than the largest.
+
+    The accuracy is relative to the distance from a centre, which should be
+    a typical value, e.g. a nominal trajectory, for values such as a
+    temperature far from zero that vary by a small fraction.
+
+    Args:
+        shape - shape of the grid, e.g. (times, columns).
+        accuracy - relative accuracy of the quantiles.
+        max_buckets - largest number of buckets of each sign.
+        centre - optional array of the given shape to measure values
+            from. Defaults to zero."""
+
+    def __init__(self, shape, accuracy=0.01, max_buckets=1024, centre=None):
+
+        self.shape = tuple(shape)
+        self.centre = np.zeros(self.shape)
+        if centre is not None:
+            self.centre = np.broadcast_to(np.asarray(centre, dtype=float),
+                                          self.shape).copy()
+
+        self.accuracy = accuracy
+        self.max_buckets = max_buckets
+        self.log_gamma = np.log((1.0 + accuracy) / (1.0 - accuracy))
+
+        self.cells = int(np.prod(self.shape))
+        self.offset = 0  # key of the first bucket
+        self.positive = np.zeros((self.cells, 0), dtype=np.int64)
+        self.negative = np.zeros((self.cells, 0), dtype=np.int64)
+        self.zero = np.zeros(self.cells, dtype=np.int64)
+
+    def _resize(self, low, high):
+        """Make the buckets span keys low to high, dropping the smallest
+        magnitudes into the first bucket beyond max_buckets."""
+
+        if self.positive.shape[1]:
+            low = min(low, self.offset)
+            high = max(high, self.offset + self.positive.shape[1] - 1)
+        low = max(low, high - self.max_buckets + 1)
+
+        stores = []
+        for store in [self.positive, self.negative]:
+            resized = np.zeros((self.cells, high - low + 1), dtype=np.int64)
+            keys = np.maximum(self.offset + np.arange(store.shape[1]), low)
+            np.add.at(resized, (slice(None), keys - low), store)
+            stores.append(resized)
+
+        self.positive, self.negative = stores
+        self.offset = low
+
+    def _keys(self, magnitude):
+        """Bucket keys of positive magnitudes."""
+
+        return np.ceil(np.log(magnitude) / self.log_gamma).astype(np.int64)
+
+    def update(self, values):
+        """Count a batch of values.
+
+        Args:
+            values - array of shape (batch,) + shape.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        values = (np.asarray(values, dtype=float) -
+                  self.centre).reshape(-1, self.cells)
+        cell = np.broadcast_to(np.arange(self.cells), values.shape)
+
+        finite = np.isfinite(values)
+        nonzero = finite & (values != 0.0)
+        self.zero += np.sum(finite & (values == 0.0), axis=0)
+
+        if not nonzero.any():
+            return
+
+        keys = self._keys(np.abs(values[nonzero]))
+        span = self.positive.shape[1]
+
+        if (not span or keys.min() < self.offset or
+                keys.max() >= self.offset + span):
+            self._resize(keys.min(), keys.max())
+            span = self.positive.shape[1]
+
+        keys = np.maximum(keys, self.offset) - self.offset
+        flat = cell[nonzero] * span + keys
+        negative = values[nonzero] < 0
+
+        self.positive += np.bincount(flat[~negative], minlength=self.cells *
+                                     span).reshape(self.cells, span)
+        self.negative += np.bincount(flat[negative], minlength=self.cells *
+                                     span).reshape(self.cells, span)
+
+    def merge(self, other):
+        """Add the counts of another sketch of the same grid and accuracy.
+
+        Returns:
+            None
+
+        Excepts:
+            ValueError - if the sketches are not compatible."""
+
+        if (other.shape != self.shape or other.accuracy != self.accuracy or
+                not np.array_equal(other.centre, self.centre)):
+            raise ValueError('sketches of different grids, accuracies or '
+                             'centres cannot be merged')
+
+        self.zero += other.zero
+
+        if not other.positive.shape[1]:
+            return
+
+        self._resize(other.offset,
+                     other.offset + other.positive.shape[1] - 1)
+
+        keys = np.maximum(other.offset + np.arange(other.positive.shape[1]),
+                          self.offset) - self.offset
+        np.add.at(self.positive, (slice(None), keys), other.positive)
+        np.add.at(self.negative, (slice(None), keys), other.negative)
+
+    def count(self):
+        """Return the number of values counted at every grid point."""
+
+        return (self.zero + self.positive.sum(axis=1) +
+                self.negative.sum(axis=1)).reshape(self.shape)
+
+    def quantile(self, q):
+        """Estimate a quantile at every grid point.
+
+        Args:
+            q - quantile between 0 and 1.
+
+        Returns:
+            values - array of the given shape, nan where nothing has been
+                counted.
+
+        Excepts:
+            None"""
+
+        span = self.positive.shape[1]
+
+        """Buckets in ascending order of value: negatives from the largest
+        magnitude down, zero, then positives."""
+        counts = np.concatenate([self.negative[:, ::-1], self.zero[:, None],
+                                 self.positive], axis=1)
+        midpoints = (2.0 * np.exp((self.offset + np.arange(span)) *
+                                  self.log_gamma) /
+                     (1.0 + np.exp(self.log_gamma)))
+        values = np.concatenate([-midpoints[::-1], [0.0], midpoints])
+
+        cumulative = np.cumsum(counts, axis=1)
+        total = cumulative[:, -1]
+        rank = np.floor(q * np.maximum(total - 1, 0))
+
+        index = np.argmax(cumulative > rank[:, None], axis=1)
+        result = values[index]
+        result[total == 0] = np.nan
+
+        return result.reshape(self.shape) + self.centre
+
+
+class OnlineStatistics:
+    """Running statistics of values at every point of a grid.
+
+    The last axis of the grid separates variables, e.g. power and
+    temperature, whose magnitudes differ, so each has its own quantile
+    sketch.
+
+    Args:
+        shape - shape of the grid, e.g. (times, columns).
+        accuracy - relative accuracy of the quantiles, or None to keep no
+            quantile sketches.
+        max_buckets - see QuantileSketch.
+        centre - optional array of the given shape that the quantile
+            sketches measure values from, see QuantileSketch."""
+
+    def __init__(self, shape, accuracy=0.01, max_buckets=1024, centre=None):
+
+        self.shape = tuple(shape)
+        self.count = 0
+        self.mean = np.zeros(self.shape)
+        self.m2 = np.zeros(self.shape)  # sum of squared deviations
+        self.min = np.full(self.shape, np.inf)
+        self.max = np.full(self.shape, -np.inf)
+
+        if centre is None:
+            centre = np.zeros(self.shape)
+        centre = np.broadcast_to(np.asarray(centre, dtype=float), self.shape)
+
+        self.sketches = []
+        if accuracy is not None:
+            self.sketches = [QuantileSketch(self.shape[:-1], accuracy,
+                                            max_buckets, centre[..., column])
+                             for column in range(self.shape[-1])]
+
+    def update(self, values):
+        """Fold in a batch of trajectories.
+
+        Args:
+            values - array of shape (batch,) + shape.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        values = np.asarray(values, dtype=float).reshape((-1,) + self.shape)
+
+        if len(values) == 0:
+            return
+
+        mean = values.mean(axis=0)
+        m2 = ((values - mean)**2).sum(axis=0)
+
+        self._combine(len(values), mean, m2)
+
+        np.minimum(self.min, values.min(axis=0), out=self.min)
+        np.maximum(self.max, values.max(axis=0), out=self.max)
+
+        for column, sketch in enumerate(self.sketches):
+            sketch.update(values[..., column])
+
+    def merge(self, other):
+        """Fold in the statistics of other trajectories on the same grid.
+
+        Returns:
+            None
+
+        Excepts:
+            ValueError - if the grids differ."""
+
+        if other.shape != self.shape:
+            raise ValueError('statistics of different grids cannot be merged')
+
+        if other.count == 0:
+            return
+
+        self._combine(other.count, other.mean, other.m2)
+
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+
+    def _combine(self, count, mean, m2):
+        """Chan et al. pairwise update of the count, mean and m2."""
+
+        total = self.count + count
+        delta = mean - self.mean
+
+        self.mean += delta * (count / total)
+        self.m2 += m2 + delta**2 * (self.count * count / total)
+        self.count = total
+
+    @property
+    def variance(self):
+        """Sample variance at every grid point."""
+
+        return self.m2 / max(self.count - 1, 1)
+
+    @property
+    def std(self):
+        """Sample standard deviation at every grid point."""
+
+        return np.sqrt(self.variance)
+
+    def quantile(self, q):
+        """Estimate a quantile at every grid point, see QuantileSketch."""
+
+        return np.stack([sketch.quantile(q) for sketch in self.sketches],
+                        axis=-1)
@@ -0,0 +1,193 @@
+"""Point Kinetics Ensemble.
+
+Ensemble solver class. Holds many independent cores as the rows of a single
+(N, ndg+7) array and progresses them all together with the vectorised model
+and integrator paths. Each member has its own constants and its own
+reactivity, demand and thermal inputs, so a parameter sweep costs about as
+much as a few array operations per step rather than N interpreter loops.
+"""
+import numpy as np
+
+from openpointkinetics.PointKineticsModel import PointKineticsModel
+from openpointkinetics.PointKineticsConstants import PointKineticsConstants
+from openpointkinetics.numericalmethods import Builder
+
+
+class EnsembleConstants:
+    """Per-member constants of an ensemble stacked into arrays.
+
+    Args:
+        constants - list of PointKineticsConstants instances, one per member.
+            All members must have the same number of delayed groups."""
+
+    def __init__(self, constants):
+
+        ndg = constants[0].ndg
+
+        if any(c.ndg != ndg for c in constants):
+            raise ValueError("All ensemble members must have the same number "
+                             "of delayed groups.")
+
+        self.beta_groups = np.array([c.beta_groups for c in constants],
+                                    dtype=float)
+        self.lambda_groups = np.array([c.lambda_groups for c in constants],
+                                      dtype=float)
+        self.n_gen_time = np.array([c.n_gen_time for c in constants],
+                                   dtype=float)
+        self.beta = self.beta_groups.sum(axis=1)
+        self.ndg = ndg
+        self.size = len(constants)
+
+
+class PointKineticsEnsemble:
+    """Progress an ensemble of independent cores in one array.
+
+    Args:
+        constants - list of PointKineticsConstants, one per member. If an
+            integer is given instead, that many members are created with the
+            default PointKineticsConstants.
+        method - name of the numerical method, as accepted by
+            `Builder.builder`. Defaults to the Forward Euler Method.
+        h - integration step.
+
+    The setters accept either a scalar, applied to every member, or a
+    sequence with one value per member."""
+
+    def __init__(self, constants, method='F_Euler', h=1E-3):
+
+        if isinstance(constants, int):
+            constants = [PointKineticsConstants()
+                         for i in range(constants)]
+
+        self.constants = EnsembleConstants(constants)
+
+        self.ndg = self.constants.ndg
+        self.size = self.constants.size
+
+        self.pk_model = self._build_model()
+
+        """One row per member, laid out as a vectorised PointKineticsState:
+        [t, power, rho, temperature, demand, alpha_t, heat_capacity,
+        c1...cN]"""
+        self.states = np.zeros((self.size, self.ndg+7))
+
+        self.times = []
+        self.samples = []
+
+        self.method = Builder.builder(method, self.pk_model.d_by_dt, h,
+                                      ddt_array=self.pk_model.d_by_dt_array,
+                                      jacobian=self.pk_model.jacobian)
+
+    def _build_model(self):
+        """Return the model progressing the stacked states."""
+
+        return PointKineticsModel(self.constants)
+
+    def set_power(self, power):
+        """Set initial core power of each member."""
+        self.states[:, 1] = power
+
+    def set_rho(self, rho):
+        """Set reactivity of each member at the current time."""
+        self.states[:, 2] = rho
+
+    def add_rho(self, rho):
+        """Create a reactivity addition in each member."""
+        self.states[:, 2] += rho
+
+    def set_temperature(self, temperature):
+        """Set isothermal core temperature of each member."""
+        self.states[:, 3] = temperature
+
+    def set_demand(self, demand):
+        """Set steam demand of each member at the current time."""
+        self.states[:, 4] = demand
+
+    def add_demand(self, demand):
+        """Add to current steam demand of each member."""
+        self.states[:, 4] += demand
+
+    def set_alpha_t(self, alpha_t):
+        """Set isothermal temperature coefficient of reactivity of each
+        member."""
+        self.states[:, 5] = alpha_t
+
+    def set_heat_capacity(self, heat_capacity):
+        """Set heat capacity of the thermal feedback body of each member."""
+        self.states[:, 6] = heat_capacity
+
+    def set_precursors(self, precursors):
+        """Set precursor populations. Accepts a list of ndg values applied to
+        every member, or an (N, ndg) array."""
+        self.states[:, 7:] = precursors
+
+    def set_example_thermal_params(self):
+        """Apply the example Sizewell B thermal parameters of
+        `PointKineticsSolver.set_example_thermal_params` to every member."""
+
+        self.set_temperature(300.0)
+        self.set_heat_capacity(334.5*1E6*4.1813)
+        self.set_alpha_t(-2.5E-4)
+        self.set_demand(3500.0E6)
+        self.set_power(3500.0E6)
+        self.set_rho(0.0)
+
+    def get_t(self):
+        """Return current time value, which is shared by all members."""
+
+        return self.states[0, 0]
+
+    def solve(self, t_change, log_freq, log=True):
+        """Progress every member by t_change seconds, logging at log_freq
+        intervals.
+
+        As `PointKineticsSolver.solve`, the members are logged now and every
+        log_freq seconds up to t_stop, and finish one interval after the last
+        log. With log_freq <= 0 they are logged now only and finish at
+        t_stop."""
+
+        t_start = self.get_t()
+        t_stop = t_start + t_change
+
+        if log_freq <= 0.0:
+            n_logs = 1
+            log_freq = t_change
+            t_finish = t_stop
+        else:
+            n_logs = int((t_stop - t_start) / log_freq + 1E-9) + 1
+            t_finish = t_start + log_freq*n_logs
+
+        if not log:
+            self.states = self.method.solve(self.states, t_finish)
+            return
+
+        for i in range(1, n_logs+1):
+            self.times.append(self.get_t())
+            self.samples.append(self.states.copy())
+
+            self.states = self.method.solve(
+                self.states, t_finish if i == n_logs else t_start + log_freq*i)
+
+    def settle(self):
+        """Run simulation for a period to reach equilibrium.
+        Turns off logging and resets t to 0s"""
+
+        self.solve(300, 0, log=False)
+        self.states[:, 0] = 0.0
+
+    def results(self):
+        """Return the logged samples as one stacked array.
+
+        Returns:
+            times - array of shape (T,) of the logged times.
+            samples - array of shape (T, N, ndg+7) holding the state of every
+                member at each logged time.
+
+        Excepts:
+            None"""
+
+        if not self.samples:
+            return (np.zeros(0),
+                    np.zeros((0, self.size, self.ndg+7)))
+
+        return np.asarray(self.times), np.stack(self.samples)
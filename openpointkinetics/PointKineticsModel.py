@@ -1,4 +1,5 @@
 """Point Kinetics Model for progressing system."""
+import numpy as np
 
 
 class PointKineticsModel:
@@ -8,6 +9,48 @@ class PointKineticsModel:
 
         self.constants = constants
 
+        """Group constants held as arrays for the vectorised `d_by_dt_array`
+        path. These are computed once here so no per-call conversion is
+        needed. n_gen_time and beta may be scalars or, for an ensemble of
+        cores, arrays with one entry per member."""
+        self.beta_groups = np.asarray(constants.beta_groups, dtype=float)
+        self.lambda_groups = np.asarray(constants.lambda_groups, dtype=float)
+        self.n_gen_time = np.asarray(constants.n_gen_time, dtype=float)
+        self.beta = np.asarray(constants.beta, dtype=float)
+        self.beta_over_gen = self.beta_groups / self.n_gen_time[..., None]
+
+        """Optional time functions added to the reactivity and steam demand
+        held in the state, evaluated at the integrator's time. See the
+        Schedule module."""
+        self.rho_schedule = None
+        self.demand_schedule = None
+
+    def has_schedules(self):
+        """Return True if any input schedule is set."""
+
+        return (self.rho_schedule is not None or
+                self.demand_schedule is not None)
+
+    def apply_schedules(self, vectors):
+        """Return a copy of state vectors with the scheduled inputs added to
+        their reactivity and steam demand, i.e. the inputs the model acts on.
+
+        Arguments:
+            vectors - array like of state vectors, one per row.
+
+        Returns:
+            vectors - numpy array of the effective state vectors."""
+
+        vectors = np.array(vectors, dtype=float)
+
+        for vector in vectors:
+            if self.rho_schedule is not None:
+                vector[2] += self.rho_schedule(vector[0])
+            if self.demand_schedule is not None:
+                vector[4] += self.demand_schedule(vector[0])
+
+        return vectors
+
     def d_by_dt(self, vector):
         """Calculates rate of change of all elements of a vectorised state.
 
@@ -45,6 +88,11 @@ class PointKineticsModel:
         rho = vector[2]
         temperature = vector[3]  # unused but kept for readability
         demand = vector[4]
+
+        if self.rho_schedule is not None:
+            rho = rho + self.rho_schedule(vector[0])
+        if self.demand_schedule is not None:
+            demand = demand + self.demand_schedule(vector[0])
         alpha_t = vector[5]
         heat_capacity = vector[6]
         precursors = vector[7:]
@@ -79,3 +127,117 @@ class PointKineticsModel:
 
         return [dt_dt, dp_dt, drho_dt, dtemp_dt, ddemand_dt, dalpha_t_dt,
                 dheat_capacity_dt] + dprecursor_dt
+
+    def d_by_dt_array(self, vector, out=None):
+        """Vectorised equivalent of `d_by_dt`.
+
+        Arguments:
+            vector - numpy array of state vectors laid out as for `d_by_dt`.
+                The last axis is the state, so a single state has shape
+                (ndg+7,) and a stack of N states has shape (N, ndg+7).
+            out - optional preallocated array with the same shape as vector
+                to write the result into.
+
+        Returns:
+            out - array of time derivatives with the same shape as vector.
+
+        Excepts:
+            None"""
+
+        if out is None:
+            out = np.empty_like(vector)
+
+        power = vector[..., 1]
+        rho = vector[..., 2]
+        demand = vector[..., 4]
+
+        """Stacked states share one time, so schedules are evaluated once."""
+        if self.rho_schedule is not None:
+            rho = rho + self.rho_schedule(vector.flat[0])
+        if self.demand_schedule is not None:
+            demand = demand + self.demand_schedule(vector.flat[0])
+        alpha_t = vector[..., 5]
+        heat_capacity = vector[..., 6]
+        precursors = vector[..., 7:]
+
+        out[..., 0] = 1.0
+
+        out[..., 1] = ((rho - self.beta) / self.n_gen_time) * power
+        if self.lambda_groups.ndim == 1:
+            out[..., 1] += precursors @ self.lambda_groups
+        else:
+            out[..., 1] += np.einsum('...i,...i->...', self.lambda_groups,
+                                     precursors)
+
+        out[..., 3] = 0.0
+        np.divide(power - demand, heat_capacity, out=out[..., 3],
+                  where=heat_capacity > 0)
+
+        np.multiply(out[..., 3], alpha_t, out=out[..., 2])
+
+        out[..., 4:7] = 0.0
+
+        np.multiply(self.beta_over_gen, power[..., None], out=out[..., 7:])
+        out[..., 7:] -= self.lambda_groups * precursors
+
+        return out
+
+    def jacobian(self, vector):
+        """Analytic Jacobian of `d_by_dt` with respect to the state.
+
+        The time derivative of any input schedule is not included, so the
+        column for t is zero.
+
+        Arguments:
+            vector - numpy array holding a state vector, or a stack of state
+                vectors with the state on the last axis.
+
+        Returns:
+            jac - array of shape vector.shape + (ndg+7,) where
+                jac[..., i, j] is the derivative of gradient i with respect
+                to state element j.
+
+        Excepts:
+            None"""
+
+        vector = np.asarray(vector, dtype=float)
+
+        power = vector[..., 1]
+        rho = vector[..., 2]
+        demand = vector[..., 4]
+
+        """Stacked states share one time, so schedules are evaluated once."""
+        if self.rho_schedule is not None:
+            rho = rho + self.rho_schedule(vector.flat[0])
+        if self.demand_schedule is not None:
+            demand = demand + self.demand_schedule(vector.flat[0])
+        alpha_t = vector[..., 5]
+        heat_capacity = vector[..., 6]
+
+        jac = np.zeros(vector.shape + (vector.shape[-1],))
+
+        jac[..., 1, 1] = (rho - self.beta) / self.n_gen_time
+        jac[..., 1, 2] = power / self.n_gen_time
+        jac[..., 1, 7:] = self.lambda_groups
+
+        """Thermal feedback terms only exist where the thermal body has a
+        heat capacity."""
+        feedback = heat_capacity > 0
+        inv_hc = np.divide(1.0, heat_capacity, out=np.zeros_like(power),
+                           where=feedback)
+        dtemp_dt = (power - demand) * inv_hc
+
+        jac[..., 3, 1] = inv_hc
+        jac[..., 3, 4] = -inv_hc
+        jac[..., 3, 6] = -dtemp_dt * inv_hc
+
+        jac[..., 2, 1] = alpha_t * inv_hc
+        jac[..., 2, 4] = -alpha_t * inv_hc
+        jac[..., 2, 5] = dtemp_dt
+        jac[..., 2, 6] = -alpha_t * dtemp_dt * inv_hc
+
+        jac[..., 7:, 1] = self.beta_over_gen
+        diagonal = np.arange(7, vector.shape[-1])
+        jac[..., diagonal, diagonal] = -self.lambda_groups
+
+        return jac
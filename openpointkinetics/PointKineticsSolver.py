@@ -5,13 +5,25 @@ reactivity change via `set_rho`, and an amount of time and temporal resolution
 over which to progress a solution via `solve`, and get access to plot
 functionality for the data stored via these methods.
 """
+import json
+import time
+
+import numpy as np
+
 from openpointkinetics.PointKineticsModel import PointKineticsModel
+from openpointkinetics.PromptJumpModel import PromptJumpModel
 from openpointkinetics.PointKineticsConstants import PointKineticsConstants
 from openpointkinetics.PointKineticsState import PointKineticsState
 from openpointkinetics.Logger import Logger
+from openpointkinetics import InhourSolution
 from openpointkinetics.numericalmethods import Builder
 
 
+PHASES = ['state', 'integrate', 'exact', 'log', 'cache']  # see `stats`
+
+LOG_CHUNK = 4096  # log samples computed and written by `solve` at a time
+
+
 class PointKineticsSolver:
     """Contains functionality to set reactivity parameters and solve for power
     and precursor populations.
@@ -25,30 +37,74 @@ class PointKineticsSolver:
         method - the method used by the solver, as dictated by an integer
             value. Currently the list of possible solvers is as follows:
 
-                1: Forward Euler Method
+                'F_Euler': Forward Euler Method
+                'F_Euler_PC': Forward Euler predictor-corrector method
+                'RK4': fourth-order Runge-Kutta method
+                'DOPRI45': adaptive Dormand-Prince 5(4) method
+                'ROS2': stiff second-order Rosenbrock method
 
             If no value is provided, the method will default to the Forward
             Euler Method.
+        exact_linear - if True, whenever there is no thermal feedback
+            (heat_capacity <= 0) `solve` evaluates the closed-form solution
+            at the log times instead of time-stepping with the method.
+        logger - optional sink for the logged samples, e.g. a DiskLogger to
+            stream a long run to disk. Defaults to an in-memory Logger.
+        prompt_jump - if True, use the PromptJumpModel: the power follows
+            the precursors and reactivity algebraically, so slow transients
+            can be solved with steps of seconds, and `set_rho` and `add_rho`
+            make the power jump. Set the precursors in equilibrium, e.g.
+            with `equilibrate`, before solving. The compiled kernels
+            implement the full model only and are not used.
+        method_options - keyword arguments passed on to `Builder.builder`,
+            e.g. the step h, rtol and atol for 'DOPRI45', or compiled=False
+            to disable the compiled kernels used when Numba is installed.
 
 
     """
 
-    def __init__(self, constants=None, method='F_Euler'):
+    def __init__(self, constants=None, method='F_Euler', exact_linear=False,
+                 logger=None, prompt_jump=False, **method_options):
 
         if constants is None:
             constants = PointKineticsConstants()
 
-        self.logger1 = Logger()
-
+        self.constants = constants
         self.ndg = constants.ndg
 
-        self.pk_model = PointKineticsModel(constants)
+        self.exact_linear = exact_linear
+        self.prompt_jump = prompt_jump
+
+        self.method_name = method
+        self.method_options = method_options
+
+        if prompt_jump:
+            self.pk_model = PromptJumpModel(constants)
+        else:
+            self.pk_model = PointKineticsModel(constants)
 
         self.state = PointKineticsState(constants.ndg)
         self.set_power(0.0)
 
+        if logger is None:
+            logger = Logger()
+
+        self.logger1 = logger
+        self.logger1.set_columns(self.state.vector_labels())
+
         self.method = Builder.builder(method, lambda vector:
-                                      self.pk_model.d_by_dt(vector))
+                                      self.pk_model.d_by_dt(vector),
+                                      ddt_array=self.pk_model.d_by_dt_array,
+                                      jacobian=self.pk_model.jacobian,
+                                      model=(None if prompt_jump else
+                                             self.pk_model),
+                                      **method_options)
+
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.intervals = 0
+        self.stats_callback = None
+        self.settle_cache = None
+        self.result_cache = None
 
     def set_power(self, power):
         """Set initial core power."""
@@ -56,12 +112,32 @@ class PointKineticsSolver:
 
     def set_rho(self, rho):
         """Set reactivity at the current time."""
+        self._jump_power(rho - self.state.rho)
         self.state.rho = rho
 
     def add_rho(self, rho):
         """Create a reactivity addition."""
+        self._jump_power(rho)
         self.state.rho = self.state.rho + rho
 
+    def _jump_power(self, change):
+        """With the prompt jump approximation, scale the power for a step
+        change in reactivity with the precursors held,
+        P+ = P-(beta - rho-)/(beta - rho+)."""
+
+        if not self.prompt_jump:
+            return
+
+        rho = self.state.rho
+        if self.pk_model.rho_schedule is not None:
+            rho = rho + self.pk_model.rho_schedule(self.state.get_t())
+
+        if rho + change >= self.constants.beta:
+            raise ValueError('the prompt jump approximation needs rho < beta')
+
+        self.state.power = (self.state.power * (self.constants.beta - rho) /
+                            (self.constants.beta - rho - change))
+
     def set_temperature(self, temperaturej):
         """Set isothermal core temperature at the current time."""
         self.state.temperature = temperaturej
@@ -82,6 +158,34 @@ class PointKineticsSolver:
         """Set heat capacity of thermal feedback body"""
         self.state.heat_capacity = heat_capacity
 
+    def set_rho_schedule(self, schedule):
+        """Add a time function, e.g. from the Schedule module, to the
+        reactivity. It is evaluated at the integrator's own time, so ramps
+        and rod movements need no extra `solve` calls. Pass None to remove
+        it. Logged reactivity includes the scheduled value."""
+        self.pk_model.rho_schedule = schedule
+
+    def set_demand_schedule(self, schedule):
+        """Add a time function, e.g. from the Schedule module, to the steam
+        demand. Pass None to remove it. Logged demand includes the scheduled
+        value."""
+        self.pk_model.demand_schedule = schedule
+
+    def set_settle_cache(self, cache):
+        """Use a DiskCache.SettleCache in `settle`: a settle from a state
+        already settled with the same constants, method and arguments loads
+        the cached state and method step instead of running. Pass None to
+        stop using it."""
+        self.settle_cache = cache
+
+    def set_result_cache(self, cache):
+        """Use a DiskCache.ResultCache in `solve`: a solve with the same
+        constants, state, input schedules, method and arguments as one
+        cached before logs the cached samples and loads the cached final
+        state instead of integrating. Solves with input schedules that have
+        no `cache_key` are not cached. Pass None to stop using it."""
+        self.result_cache = cache
+
     def set_precursors(self, precursors):
         """Provide new precursor values, if you want. Make sure the list you
         provide is the same length as length of the precursor list that was
@@ -119,45 +223,373 @@ class PointKineticsSolver:
 
     def solve(self, t_change, log_freq, log=True):
         """Progress the solver by t_change seconds, logging at log_freq
-        intervals."""
+        intervals.
+
+        The state is logged now and every log_freq seconds up to t_stop, and
+        the solver finishes one interval after the last log, where the next
+        call carries on logging. With log_freq <= 0 the state is logged now
+        only and the solver finishes at t_stop. The numerical method samples
+        the log times by dense output, LOG_CHUNK samples per call, and each
+        chunk is passed to the logger before the next is computed, so a
+        DiskLogger keeps memory bounded however long the run. With a result
+        cache set, see `set_result_cache`, the result is looked up first and
+        stored afterwards."""
+
+        lap = time.perf_counter()
+
+        key = None
+        if self.result_cache is not None:
+            key = self.result_cache.solve_key(self, t_change, log_freq, log)
 
-        t_stop = self.state.get_t() + t_change
+            if key is not None and self._load_result(key, log, lap):
+                return
+
+        t_start = self.state.get_t()
+        t_stop = t_start + t_change
 
         if log_freq <= 0.0:
-            log_freq = t_stop
+            n_logs = 1
+            log_freq = t_change
+            t_finish = t_stop
+        else:
+            n_logs = int((t_stop - t_start) / log_freq + 1E-9) + 1
+            t_finish = t_start + log_freq*n_logs
 
-        while self.state.get_t() <= t_stop:
-            if log:
+        vector = self.state.vectorise()
+        lap = self._lap('state', lap)
 
-                self.logger1.log("power", self.state.get_t(), self.state.power)
-                self.logger1.log("rho", self.state.get_t(), self.state.rho)
-                self.logger1.log("temperature", self.state.get_t(),
-                                 self.state.temperature)
-                self.logger1.log("demand", self.state.get_t(),
-                                 self.state.demand)
-                self.logger1.log("alpha_t", self.state.get_t(),
-                                 self.state.alpha_t)
-                self.logger1.log("heat_capacity", self.state.get_t(),
-                                 self.state.heat_capacity)
+        exact = self._exact_applies()
+        phase = 'exact' if exact else 'integrate'
 
-                for i in range(self.ndg):
-                    self.logger1.log("precursor"+str(i),
-                                     self.state.get_t(),
-                                     self.state.precursors[i])
-            new_state = self.method.solve(self.state.vectorise(),
-                                          self.state.get_t()+log_freq)
+        new_state = vector
+        logged = []  # the logged chunks, kept only for the result cache
 
-            self.state.load_vector(new_state)
+        if not log:
+            if exact:
+                new_state = InhourSolution.evaluate(
+                    self.constants, vector, [t_finish - t_start])[0]
+            else:
+                new_state = self.method.solve(vector, t_finish)
+            lap = self._lap(phase, lap)
 
-    def settle(self):
+        for first in range(0, n_logs if log else 0, LOG_CHUNK):
+            last = min(first + LOG_CHUNK, n_logs)
 
-        """Run simulation for a period to reach equilibrium.
-        Turns off logging and resets t to 0s"""
+            times = t_start + log_freq*np.arange(first, last+1)
+            if last == n_logs:
+                times[-1] = t_finish
+
+            if exact:
+                states = InhourSolution.evaluate(self.constants, vector,
+                                                 times - t_start)
+                samples, new_state = states[:-1], states[-1]
+            else:
+                new_state, samples = self.method.solve_dense(
+                    new_state, times[-1], times[:-1])
+            lap = self._lap(phase, lap)
+
+            if self.prompt_jump:
+                samples = self.pk_model.apply_prompt_jump(samples)
+
+            if self.pk_model.has_schedules():
+                samples = self.pk_model.apply_schedules(samples)
+
+            self.logger1.log_rows(samples)
+
+            if key is not None:
+                logged.append(np.asarray(samples, dtype=float))
+            lap = self._lap('log', lap)
+
+        if self.prompt_jump:
+            new_state = self.pk_model.apply_prompt_jump(new_state)[0]
+
+        self.state.load_vector(new_state)
+        lap = self._lap('state', lap)
+
+        if key is not None:
+            self.result_cache.put(
+                key, state=np.array(new_state, dtype=float),
+                h=np.array(self.method.h),
+                log=np.concatenate(logged or
+                                   [np.empty((0, len(new_state)))]))
+            self._lap('cache', lap)
+
+        self._end_interval()
+
+    def _load_result(self, key, log, lap):
+        """Finish a solve from the result cache. Return False on a miss."""
+
+        entry = self.result_cache.get(key)
+
+        if entry is None:
+            self.result_cache.misses += 1
+            return False
+
+        self.result_cache.hits += 1
+
+        if log:
+            self.logger1.log_rows(entry['log'])
+
+        self.state.load_vector(entry['state'])
+        self.method.h = float(entry['h'])
+        self._lap('cache', lap)
+
+        self._end_interval()
+
+        return True
+
+    def _lap(self, phase, start):
+        """Add the time since start to a phase and return the current
+        time."""
+
+        now = time.perf_counter()
+        self.timings[phase] += now - start
+
+        return now
+
+    def _end_interval(self):
+        """Count a finished solve or advance interval and report it to the
+        stats callback, if one is set."""
+
+        self.intervals += 1
+
+        if self.stats_callback is not None:
+            self.stats_callback(self.state.get_t(), self.stats)
+
+    @property
+    def stats(self):
+        """Dictionary of the work done since the solver was built or
+        `reset_stats` was called: the method's rhs_calls, jacobian_calls,
+        steps and rejected steps, the number of solve and advance
+        intervals, and the wall time in seconds spent in each phase as
+        time_state (vectorise and load_vector), time_integrate (the
+        numerical method), time_exact (the closed-form solution), time_log
+        (logging) and time_cache (the result cache)."""
+
+        stats = self.method.stats.as_dict()
+        stats['intervals'] = self.intervals
+
+        for phase in PHASES:
+            stats['time_' + phase] = self.timings[phase]
+
+        return stats
+
+    def reset_stats(self):
+        """Set the counters and timings reported by `stats` to zero."""
+
+        self.method.stats.reset()
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.intervals = 0
+
+    def set_stats_callback(self, callback):
+        """Call callback(t, stats) at the end of every solve and advance
+        interval, e.g. to sample the work done through a long run. settle
+        advances in check_interval intervals. Pass None to remove it; with
+        no callback set the hook costs a single comparison per interval."""
+        self.stats_callback = callback
+
+    def _exact_applies(self):
+        """Return True if the closed-form solution can progress the state:
+        exact_linear was requested, there is no thermal feedback and the
+        reactivity is constant."""
+
+        return (self.exact_linear and not self.prompt_jump and
+                self.state.heat_capacity <= 0 and
+                self.pk_model.rho_schedule is None)
+
+    def advance(self, t_change):
+        """Progress the solver by t_change seconds without logging."""
+
+        lap = time.perf_counter()
+
+        vector = self.state.vectorise()
+        lap = self._lap('state', lap)
+
+        if self._exact_applies():
+            new_state = InhourSolution.evaluate(self.constants, vector,
+                                                [t_change])[0]
+            lap = self._lap('exact', lap)
+        else:
+            new_state = self.method.solve(vector, vector[0]+t_change)
+            lap = self._lap('integrate', lap)
+
+        if self.prompt_jump:
+            new_state = self.pk_model.apply_prompt_jump(new_state)[0]
+
+        self.state.load_vector(new_state)
+        self._lap('state', lap)
+
+        self._end_interval()
+
+    def equilibrate(self):
+        """Set the state to its closed-form steady state.
+
+        With thermal feedback the power is balanced with the steam demand,
+        and any reactivity is removed by the temperature change that the
+        feedback would produce. The precursors are then set to equilibrium
+        with the power, C_i = beta_i*P/(lambda_i*n_gen_time).
+        Resets t to 0s"""
+
+        if self.state.heat_capacity > 0:
+            self.set_power(self.state.demand)
+
+            if self.state.alpha_t != 0.0:
+                self.set_temperature(self.state.temperature -
+                                     self.state.rho / self.state.alpha_t)
+                self.state.rho = 0.0  # the power is already balanced
+
+        if self.state.rho != 0.0:
+            print("No steady state exists with non-zero reactivity.")
+            print("Setting precursors in equilibrium with the current power.")
+
+        self.set_precursors([beta_i*self.state.power /
+                             (lambda_i*self.constants.n_gen_time)
+                             for beta_i, lambda_i in
+                             zip(self.constants.beta_groups,
+                                 self.constants.lambda_groups)])
 
-        self.solve(300, 0, log=False)
         self.state.zero_t()
 
-    def plot_power(self):
+    def converged(self, tol):
+        """Return True if the power, the temperature and every precursor
+        group change by less than tol of their magnitude per second. The
+        reactivity is left out: it follows the temperature, and under
+        thermal feedback it settles to zero, where no relative test can
+        pass."""
+
+        vector = self.state.vectorise()
+        grad = self.pk_model.d_by_dt_array(vector)
+
+        index = np.r_[1, 3, 7:len(vector)]
+
+        return bool(np.all(np.abs(grad[index]) <=
+                           tol*np.abs(vector[index])))
+
+    def settle(self, t_max=300.0, tol=1E-6, check_interval=1.0,
+               analytic=False):
+
+        """Run simulation for a period to reach equilibrium.
+        Turns off logging and resets t to 0s
+
+        Args:
+            t_max - longest time to run for.
+            tol - relative rate of change per second of the power, the
+                temperature and every precursor group below which the
+                solver is considered settled, see `converged`. Checked
+                every check_interval seconds.
+            check_interval - time between convergence checks.
+            analytic - if True, skip the transient and set the steady state
+                directly with `equilibrate`.
+
+        With a settle cache set, see `set_settle_cache`, the result, the
+        settled state and the method's step, is looked up first and stored
+        afterwards. Solvers with input schedules
+        are never cached."""
+
+        key = None
+        if self.settle_cache is not None and not self.pk_model.has_schedules():
+            key = self.settle_cache.settle_key(self, t_max, tol,
+                                               check_interval, analytic)
+            entry = self.settle_cache.get(key)
+
+            if entry is not None:
+                self.state.load_vector(entry['state'])
+                if 'h' in entry:  # entries from before the step was kept
+                    self.method.h = float(entry['h'])
+                return
+
+        if analytic:
+            self.equilibrate()
+        else:
+            t_stop = self.state.get_t() + t_max
+
+            while self.state.get_t() < t_stop and not self.converged(tol):
+                self.advance(min(check_interval, t_stop - self.state.get_t()))
+
+            self.state.zero_t()
+
+        if key is not None:
+            self.settle_cache.put(key, state=np.array(self.state.vectorise()),
+                                  h=np.array(self.method.h))
+
+    def save_checkpoint(self, path, log=False):
+        """Save the solver to an uncompressed numpy .npz file.
+
+        Args:
+            path - file to write. numpy adds the .npz extension if missing.
+            log - if True, also save the logged samples.
+
+        The state, the constants, the method, its options and its current
+        step are saved. Input schedules are Python callables and are not
+        saved; set them again after loading.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        if self.pk_model.has_schedules():
+            print("Input schedules are not saved in checkpoints.")
+
+        config = {'method': self.method_name,
+                  'method_options': self.method_options,
+                  'exact_linear': self.exact_linear,
+                  'prompt_jump': self.prompt_jump,
+                  'h': self.method.h}
+
+        arrays = {'state': np.array(self.state.vectorise(), dtype=float),
+                  'beta_groups': np.array(self.constants.beta_groups,
+                                          dtype=float),
+                  'lambda_groups': np.array(self.constants.lambda_groups,
+                                            dtype=float),
+                  'n_gen_time': np.array(self.constants.n_gen_time,
+                                         dtype=float),
+                  'config': np.array(json.dumps(config))}
+
+        if log:
+            arrays['log'] = self.logger1.view()
+            arrays['log_columns'] = np.array(self.logger1.columns)
+
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load_checkpoint(cls, path, logger=None):
+        """Build a solver from a file written by `save_checkpoint`.
+
+        Args:
+            path - checkpoint file.
+            logger - optional sink for the logged samples, as in the
+                constructor. Saved samples are logged to it.
+
+        Returns:
+            solver - PointKineticsSolver in the saved state.
+
+        Excepts:
+            None"""
+
+        with np.load(path) as data:
+            config = json.loads(str(data['config']))
+
+            constants = PointKineticsConstants(
+                data['beta_groups'].tolist(), data['lambda_groups'].tolist(),
+                float(data['n_gen_time']))
+
+            solver = cls(constants, config['method'], config['exact_linear'],
+                         logger, config.get('prompt_jump', False),
+                         **config['method_options'])
+
+            solver.method.h = config['h']
+            solver.state.load_vector(data['state'])
+
+            if 'log' in data.files:
+                solver.logger1.set_columns(data['log_columns'].tolist(),
+                                           data['log'].shape[1])
+                solver.logger1.log_rows(data['log'].T)
+
+        return solver
+
+    def plot_power(self, path=None):
         """Plot core power from time 0 to latest t_stop from `solve`
         method."""
 
@@ -165,44 +597,49 @@ class PointKineticsSolver:
                           xlabel="Time(s)",
                           ylabel="power",
                           ylog=True,
-                          title="Variation of Core Power with Time")
+                          title="Variation of Core Power with Time",
+                          path=path)
 
-    def plot_rho(self):
+    def plot_rho(self, path=None):
         """Plot reactivity changes from time 0 to latest t_stop from `solve`
         method"""
 
         self.logger1.plot(["rho"],
                           xlabel="Time(s)",
                           ylabel=r"$\rho$",
-                          title="Variation of Reactivity with Time")
+                          title="Variation of Reactivity with Time",
+                          path=path)
 
-    def plot_temperature(self):
+    def plot_temperature(self, path=None):
         """Plot temperature changes from time 0 to latest t_stop from
         'solve'"""
 
         self.logger1.plot(["temperature"],
                           xlabel="Time(s)",
                           ylabel="Temperature",
-                          title="Variation of Temperature with Time")
+                          title="Variation of Temperature with Time",
+                          path=path)
 
-    def plot_demand(self):
+    def plot_demand(self, path=None):
         """Plot steam demand changes from time 0 to latest t_stop from
         'solve'"""
 
         self.logger1.plot(["demand"],
                           xlabel="Time(s)",
                           ylabel="Steam Demand (J)",
-                          title="Variation of Steam Demand with Time")
+                          title="Variation of Steam Demand with Time",
+                          path=path)
 
-    def plot_alpha_t(self):
+    def plot_alpha_t(self, path=None):
         """Plot alpha_t changes from time 0 to latest t_stop from 'solve'"""
 
         self.logger1.plot(["alpha_t"],
                           xlabel="Time(s)",
                           ylabel=r"$\alpha_{T}$",
-                          title=r"Variation of $\alpha_{T}$ with Time")
+                          title=r"Variation of $\alpha_{T}$ with Time",
+                          path=path)
 
-    def plot_heat_capacity(self):
+    def plot_heat_capacity(self, path=None):
         """Plot changes in thermal body heat capacity from time 0 to latest
         t_stop from 'solve'"""
 
@@ -210,9 +647,10 @@ class PointKineticsSolver:
                           xlabel="Time(s)",
                           ylabel="Heat Capacity",
                           title="Variation of Thermal Body Heat\
-                            Capacity with Time")
+                            Capacity with Time",
+                          path=path)
 
-    def plot_precursors(self):
+    def plot_precursors(self, path=None):
         """Plot precursor populations from time 0 to latest t_stop from `solve`
         method."""
 
@@ -220,4 +658,5 @@ class PointKineticsSolver:
                           xlabel="Time(s)",
                           ylabel="Number in Group",
                           ylog=True,
-                          title="Variation of Number of Delayed Neutron Precursors with Time")
+                          title="Variation of Number of Delayed Neutron Precursors with Time",
+                          path=path)
@@ -1,80 +1,126 @@
-"""Point Kinetics System State module."""
+"""Point Kinetics System State module.
+
+The state is held in one contiguous float64 buffer laid out as its vector,
+[t, power, rho, temperature, demand, alpha_t, heat_capacity, c1..cN], and the
+named fields read and write that buffer. `vectorise` returns the buffer
+itself and `load_vector` copies into it, so neither allocates. The buffer may
+be provided by the caller, e.g. a numpy array over a
+multiprocessing.shared_memory block, to share the state between processes.
+"""
+import numpy as np
+
+
+def _field(index, doc):
+    """Property reading and writing one element of the buffer."""
+
+    def get(self):
+        return self.buffer.item(index)
+
+    def set(self, value):
+        self.buffer[index] = value
+
+    return property(get, set, doc=doc)
 
 
 class PointKineticsState:
-    """Set the state of the system."""
+    """Set the state of the system.
+
+    Args:
+        ndg - number of delayed groups.
+        buffer - optional float64 numpy array of ndg+7 elements to hold the
+            state in, e.g. one backed by shared memory. It is used as it is,
+            not copied, and its values are kept. By default a new zeroed
+            buffer is allocated."""
+
+    __slots__ = ['ndg', 'vectorLen', 'buffer']
 
-    def __init__(self, ndg):
+    def __init__(self, ndg, buffer=None):
 
         self.ndg = ndg  # number of delayed groups
 
-        self.power = 0.0  # core power
+        self.vectorLen = self.ndg+7  # Length of system state when vectorised
+
+        if buffer is None:
+            buffer = np.zeros(self.vectorLen)
 
-        self.rho = 0.0  # core reactivity
+        if (not isinstance(buffer, np.ndarray) or buffer.dtype != np.float64
+                or buffer.shape != (self.vectorLen,)):
+            raise ValueError('the state buffer must be a float64 array of ' +
+                             str(self.vectorLen) + ' elements')
 
-        self.temperature = 0.0  # isothermal approximation of core temp
+        self.buffer = buffer
 
-        self.demand = 0.0  # steam demand (Watts)
+    time = _field(0, "Current time.")
 
-        """alpha_t could vary with time or state, so is not considered a
-        constant and is best placed in this module (isothermal
-        approximation)"""
-        self.alpha_t = 0.0
+    power = _field(1, "Core power.")
 
-        self.heat_capacity = 0.0  # of total thermal body (Joules/Kelvin)
+    rho = _field(2, "Core reactivity.")
 
-        """List of precursor populations in each group. Since we are modelling
-        power and not neutron numbers, "precursor population"" is to be
-        interpreted as:
+    temperature = _field(3, "Isothermal approximation of core temp.")
+
+    demand = _field(4, "Steam demand (Watts).")
+
+    alpha_t = _field(5, """Temperature coefficient of reactivity. alpha_t
+        could vary with time or state, so is not considered a constant and
+        is best placed in this module (isothermal approximation).""")
+
+    heat_capacity = _field(6, "Of total thermal body (Joules/Kelvin).")
+
+    @property
+    def precursors(self):
+        """Array of precursor populations in each group, a view of the
+        buffer. Since we are modelling power and not neutron numbers,
+        "precursor population" is to be interpreted as:
 
         energyPerFission*fissionCrossSection*actualPrecursorPopulation"""
-        self.precursors = [0.0]*ndg
 
-        self.time = 0.0
+        return self.buffer[7:]
 
-        self.vectorLen = self.ndg+7  # Length of system state when vectorised
+    @precursors.setter
+    def precursors(self, precursors):
+        self.buffer[7:] = precursors
+
+    def __getstate__(self):
+        return self.ndg, np.array(self.buffer)
+
+    def __setstate__(self, state):
+        self.ndg, self.buffer = state
+        self.vectorLen = self.ndg+7
 
     def vectorise(self):
-        """Pack the separate paramers into a single list.
+        """Return the state as a single vector.
 
         Args:
             None
 
         Returns:
-            vector - list made of time value, power, reactivity
-                change, and all precursor values.
+            vector - the state's own buffer, a numpy array made of time
+                value, power, reactivity change, temperature, demand,
+                alpha_t, heat capacity and all precursor values. It is not
+                a copy: it changes with the state, and writing to it changes
+                the state. Copy it to keep a snapshot.
 
         Excepts:
             None"""
 
-        vector = [0.0]*self.vectorLen
+        return self.buffer
 
-        vector[0] = self.time
-        vector[1] = self.power
-        vector[2] = self.rho
-        vector[3] = self.temperature
-        vector[4] = self.demand
-        vector[5] = self.alpha_t
-        vector[6] = self.heat_capacity
-        vector[7:] = self.precursors
+    def vector_labels(self):
+        """Return the names of the elements of `vectorise`, in order."""
 
-        return vector
+        return (["t", "power", "rho", "temperature", "demand", "alpha_t",
+                 "heat_capacity"] +
+                ["precursor"+str(i) for i in range(self.ndg)])
 
     def load_vector(self, vector):
-        """Pack the separate paramers into a single list."""
+        """Copy a vector laid out as by `vectorise`, a list or numpy array,
+        into the state."""
 
-        if len(vector) is not self.vectorLen:
+        if len(vector) != self.vectorLen:
             print("Wrong vector length for vector load operation.")
             exit()
 
-        self.time = vector[0]
-        self.power = vector[1]
-        self.rho = vector[2]
-        self.temperature = vector[3]
-        self.demand = vector[4]
-        self.alpha_t = vector[5]
-        self.heat_capacity = vector[6]
-        self.precursors = vector[7:]
+        self.buffer[:] = vector
 
         return None
 
@@ -82,7 +128,7 @@ class PointKineticsState:
         """Return current time value."""
 
         return self.time
-    
+
     def zero_t(self):
         """Zero time value"""
         self.time = 0.0
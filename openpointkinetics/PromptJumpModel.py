@@ -0,0 +1,188 @@
+"""Prompt jump approximation of the point kinetics model.
+
+The power equation
+
+    dP/dt = (rho - beta)/n_gen_time P + sum_i lambda_i C_i
+
+relaxes on the prompt neutron time scale n_gen_time/(beta - rho), which is
+what bounds the step of the explicit methods. For transients much slower
+than that, dP/dt is negligible against the other two terms, and the power
+follows the precursors and the reactivity algebraically:
+
+    P = n_gen_time S / (beta - rho),    S = sum_i lambda_i C_i
+
+The precursor and thermal equations are driven by that power, so the fastest
+remaining time scale is that of the shortest lived precursor group, and the
+methods can take steps of a large fraction of a second, or of seconds with
+the stiff ROS2 or adaptive DOPRI45 methods. The power element of the state
+is carried along with the derivative of the algebraic power,
+
+    dP/dt = (n_gen_time dS/dt + P drho/dt) / (beta - rho)
+
+and `apply_prompt_jump` sets it exactly from the precursors and reactivity. A
+step change of reactivity makes the power jump with the precursors held,
+P+ = P- (beta - rho-) / (beta - rho+). The approximation needs rho < beta.
+Its relative error in power is of the order of n_gen_time/(beta - rho)
+times the relative rate of change of the power.
+"""
+import numpy as np
+
+from openpointkinetics.PointKineticsModel import PointKineticsModel
+
+
+class PromptJumpModel(PointKineticsModel):
+    """Point kinetics model with the power eliminated by the prompt jump
+    approximation. The state vector is laid out as for PointKineticsModel,
+    but no gradient reads its power element."""
+
+    def _inputs(self, vector):
+        """Reactivity and steam demand including any input schedules."""
+
+        rho = vector[..., 2]
+        demand = vector[..., 4]
+
+        """Stacked states share one time, so schedules are evaluated once."""
+        if self.rho_schedule is not None:
+            rho = rho + self.rho_schedule(vector.flat[0])
+        if self.demand_schedule is not None:
+            demand = demand + self.demand_schedule(vector.flat[0])
+
+        return rho, demand
+
+    def _source(self, precursors):
+        """sum_i lambda_i C_i of the precursors on the last axis."""
+
+        if self.lambda_groups.ndim == 1:
+            return precursors @ self.lambda_groups
+
+        return np.einsum('...i,...i->...', self.lambda_groups, precursors)
+
+    def apply_prompt_jump(self, vectors):
+        """Return a copy of state vectors with their power set by the prompt
+        jump approximation from their precursors and reactivity, including
+        any scheduled reactivity.
+
+        Arguments:
+            vectors - array like of state vectors, one per row, or a single
+                state vector.
+
+        Returns:
+            vectors - numpy array of the state vectors, one per row.
+
+        Excepts:
+            None"""
+
+        vectors = np.array(vectors, dtype=float, ndmin=2)
+
+        rho = vectors[:, 2].copy()
+        if self.rho_schedule is not None:
+            rho += [self.rho_schedule(t) for t in vectors[:, 0]]
+
+        vectors[:, 1] = (self.n_gen_time * self._source(vectors[:, 7:]) /
+                         (self.beta - rho))
+
+        return vectors
+
+    def d_by_dt(self, vector):
+        """List equivalent of `d_by_dt_array`, see `PointKineticsModel`."""
+
+        return self.d_by_dt_array(np.array(vector, dtype=float)).tolist()
+
+    def d_by_dt_array(self, vector, out=None):
+        """Rate of change of every element of a state, or of a stack of
+        states, with the power given by the prompt jump approximation. See
+        `PointKineticsModel.d_by_dt_array`.
+
+        The time derivative of the input schedules is not included in that
+        of the power element; `apply_prompt_jump` restores it.
+
+        Excepts:
+            None"""
+
+        if out is None:
+            out = np.empty_like(vector)
+
+        rho, demand = self._inputs(vector)
+        alpha_t = vector[..., 5]
+        heat_capacity = vector[..., 6]
+        precursors = vector[..., 7:]
+
+        margin = self.beta - rho
+        power = self.n_gen_time * self._source(precursors) / margin
+
+        out[..., 0] = 1.0
+
+        out[..., 3] = 0.0
+        np.divide(power - demand, heat_capacity, out=out[..., 3],
+                  where=heat_capacity > 0)
+
+        np.multiply(out[..., 3], alpha_t, out=out[..., 2])
+
+        out[..., 4:7] = 0.0
+
+        np.multiply(self.beta_over_gen, power[..., None], out=out[..., 7:])
+        out[..., 7:] -= self.lambda_groups * precursors
+
+        out[..., 1] = (self.n_gen_time * self._source(out[..., 7:]) +
+                       power * out[..., 2]) / margin
+
+        return out
+
+    def jacobian(self, vector):
+        """Analytic Jacobian of `d_by_dt_array` with respect to the state.
+
+        The time derivative of any input schedule is not included, so the
+        column for t is zero. No gradient depends on the power element, so
+        its column is zero too. See `PointKineticsModel.jacobian`.
+
+        Excepts:
+            None"""
+
+        vector = np.asarray(vector, dtype=float)
+        grad = self.d_by_dt_array(vector)
+
+        rho = self._inputs(vector)[0]
+        alpha_t = vector[..., 5]
+        heat_capacity = vector[..., 6]
+
+        margin = self.beta - rho
+        power = self.n_gen_time * self._source(vector[..., 7:]) / margin
+
+        """Derivatives of the prompt jump power."""
+        d_power = np.zeros(vector.shape)
+        d_power[..., 2] = power / margin
+        d_power[..., 7:] = (self.n_gen_time[..., None] * self.lambda_groups /
+                            margin[..., None])
+
+        jac = np.zeros(vector.shape + (vector.shape[-1],))
+
+        """Thermal feedback terms only exist where the thermal body has a
+        heat capacity."""
+        feedback = heat_capacity > 0
+        inv_hc = np.divide(1.0, heat_capacity, out=np.zeros_like(margin),
+                           where=feedback)
+
+        jac[..., 3, :] = d_power * inv_hc[..., None]
+        jac[..., 3, 4] = -inv_hc
+        jac[..., 3, 6] = -grad[..., 3] * inv_hc
+
+        jac[..., 2, :] = alpha_t[..., None] * jac[..., 3, :]
+        jac[..., 2, 5] = grad[..., 3]
+
+        jac[..., 7:, :] = (self.beta_over_gen[..., :, None] *
+                           d_power[..., None, :])
+        diagonal = np.arange(7, vector.shape[-1])
+        jac[..., diagonal, diagonal] -= self.lambda_groups
+
+        d_source = np.einsum('...i,...ij->...j',
+                             np.broadcast_to(self.lambda_groups,
+                                             vector[..., 7:].shape),
+                             jac[..., 7:, :])
+
+        jac[..., 1, :] = ((self.n_gen_time[..., None] * d_source +
+                           d_power * grad[..., 2, None] +
+                           power[..., None] * jac[..., 2, :]) /
+                          margin[..., None])
+        jac[..., 1, 2] += grad[..., 1] / margin
+
+        return jac
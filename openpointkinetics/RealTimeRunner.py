@@ -0,0 +1,205 @@
+"""Real-time runner.
+
+Advance a PointKineticsSolver in step with the wall clock, or at a fixed
+speed-up, under asyncio. The run is cut into short frames of simulated time.
+Between frames the runner applies the commands waiting on its queue, such as
+a rod movement with `add_rho` or a change of steam demand, and publishes a
+snapshot of the state to each subscriber. Frame deadlines are measured from
+the start of the run rather than from the previous frame, so late frames are
+caught up and the simulation does not drift from the wall clock however long
+it runs. Each snapshot is published once its frame's deadline has passed.
+Frames that finish after their deadline are counted as overruns.
+
+    runner = RealTimeRunner(solver, frame=0.05)
+    snapshots = runner.subscribe()
+    task = asyncio.create_task(runner.run())
+    await runner.send('add_rho', 1E-4)
+    snapshot = await snapshots.get()
+"""
+import asyncio
+
+import numpy as np
+
+
+class RealTimeRunner:
+    """Run a solver against the wall clock.
+
+    Args:
+        solver - PointKineticsSolver to advance.
+        frame - simulated time advanced between command and snapshot
+            points. Commands wait at most one frame, divided by speed, of
+            wall time before they are applied.
+        speed - simulated seconds per wall clock second.
+        log - if True, log the state to the solver's logger every frame."""
+
+    COMMANDS = ['set_rho', 'add_rho', 'set_demand', 'add_demand']
+
+    def __init__(self, solver, frame=0.05, speed=1.0, log=False):
+        self.solver = solver
+        self.frame = frame
+        self.speed = speed
+        self.log = log
+
+        self.commands = asyncio.Queue()
+        self.subscribers = []
+        self.running = False
+
+        self.frames = 0
+        self.overruns = 0
+        self.max_lag = 0.0
+        self.commands_applied = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    async def send(self, name, value):
+        """Queue a command, applied before the next frame.
+
+        Args:
+            name - one of COMMANDS.
+            value - its argument.
+
+        Returns:
+            None
+
+        Excepts:
+            ValueError if the command is not recognised."""
+
+        self.send_nowait(name, value)
+
+    def send_nowait(self, name, value):
+        """Queue a command from synchronous code in the event loop's
+        thread. See `send`."""
+
+        if name not in self.COMMANDS:
+            raise ValueError("Unrecognised real-time command: " + str(name))
+
+        self.commands.put_nowait(
+            (name, value, asyncio.get_running_loop().time()))
+
+    def subscribe(self, maxsize=1):
+        """Return an asyncio.Queue receiving a snapshot after every frame.
+
+        A subscriber that falls behind loses its oldest snapshots rather than
+        holding up the simulation, so with the default maxsize of 1 the
+        queue always holds the latest state.
+
+        A snapshot is a dictionary of the state variables, as named by
+        `PointKineticsState.vector_labels`, with any input schedules
+        applied, plus 'wall', the loop time at which it was taken."""
+
+        queue = asyncio.Queue(maxsize)
+        self.subscribers.append(queue)
+
+        return queue
+
+    def unsubscribe(self, queue):
+        """Stop publishing snapshots to a queue from `subscribe`."""
+
+        self.subscribers.remove(queue)
+
+    def stop(self):
+        """Make `run` return after the current frame."""
+
+        self.running = False
+
+    def _apply_commands(self, now):
+        """Apply every queued command, recording its latency."""
+
+        while not self.commands.empty():
+            name, value, queued = self.commands.get_nowait()
+
+            getattr(self.solver, name)(value)
+
+            latency = now - queued
+            self.commands_applied += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def _publish(self, now):
+        """Log the state and send a snapshot of it to the subscribers."""
+
+        vector = self.solver.state.vectorise().tolist()
+
+        if self.solver.pk_model.has_schedules():
+            vector = self.solver.pk_model.apply_schedules(
+                np.array([vector]))[0].tolist()
+
+        if self.log:
+            self.solver.logger1.log_row(vector)
+
+        if not self.subscribers:
+            return
+
+        snapshot = dict(zip(self.solver.state.vector_labels(), vector))
+        snapshot['wall'] = now
+
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()  # drop the oldest snapshot
+
+            queue.put_nowait(snapshot)
+
+    async def run(self, duration=None):
+        """Advance the solver in real time.
+
+        Args:
+            duration - simulated time to run for. Runs until `stop` is
+                called if None.
+
+        Returns:
+            None
+
+        Excepts:
+            None"""
+
+        loop = asyncio.get_running_loop()
+
+        self.running = True
+
+        wall_start = loop.time()
+        frames = 0
+        if duration is not None:
+            frames_total = int(round(duration / self.frame))
+
+        self._publish(wall_start)
+
+        while self.running and (duration is None or frames < frames_total):
+
+            self._apply_commands(loop.time())
+
+            self.solver.advance(self.frame)
+            frames += 1
+            self.frames += 1
+
+            deadline = wall_start + frames*self.frame/self.speed
+
+            """Publish at the frame's deadline, not before it, so no
+            snapshot is ahead of the wall clock."""
+            lag = loop.time() - deadline
+            if lag > 0.0:
+                self.overruns += 1
+                self.max_lag = max(self.max_lag, lag)
+                await asyncio.sleep(0)  # let commands in, then catch up
+            else:
+                await asyncio.sleep(-lag)
+
+            self._publish(loop.time())
+
+        self.running = False
+
+    @property
+    def stats(self):
+        """Dictionary of the frames run, the overruns, the largest lag
+        behind the wall clock in seconds, and the number and mean and
+        largest latency in seconds of the applied commands."""
+
+        mean_latency = 0.0
+        if self.commands_applied:
+            mean_latency = self.total_latency / self.commands_applied
+
+        return {'frames': self.frames,
+                'overruns': self.overruns,
+                'max_lag': self.max_lag,
+                'commands': self.commands_applied,
+                'mean_latency': mean_latency,
+                'max_latency': self.max_latency}
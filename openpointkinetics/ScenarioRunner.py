@@ -0,0 +1,176 @@
+"""Scenario runner.
+
+Run many independent PointKineticsSolver scenarios on a process pool. Each
+scenario describes a complete run: constants, initial thermal parameters, a
+schedule of actions such as `set_rho` and `solve`, the numerical method and
+the log frequency. Scenarios are dispatched to the workers in chunks, and
+each worker hands its logged block back through shared memory rather than
+pickling it, so the results arrive as Logger instances in scenario order.
+"""
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from openpointkinetics.Logger import Logger
+
+
+class Scenario:
+    """Description of a single solver run.
+
+    Args:
+        actions - list of tuples (name, *args) applied to the solver in
+            order. name is one of the ACTIONS, e.g. ('set_rho', 1E-3),
+            ('solve', 60) or ('settle',). 'solve' takes t_change and
+            optionally log_freq, which defaults to the scenario log_freq.
+        constants - PointKineticsConstants instance, or None for defaults.
+        thermal_params - None, 'example' to call
+            `set_example_thermal_params`, or a dictionary such as
+            {'temperature': 300.0, 'demand': 3500.0E6} applied with the
+            matching set_ methods.
+        method - name of the numerical method.
+        log_freq - default log frequency of 'solve' actions.
+        solver_options - further keyword arguments for PointKineticsSolver,
+            e.g. h or exact_linear.
+        settle_cache - optional DiskCache.SettleCache used by 'settle'
+            actions. Workers share it through the file system."""
+
+    ACTIONS = ['set_power', 'set_rho', 'add_rho', 'set_temperature',
+               'set_demand', 'add_demand', 'set_alpha_t', 'set_heat_capacity',
+               'set_precursors', 'set_rho_schedule', 'set_demand_schedule',
+               'solve', 'settle']
+
+    def __init__(self, actions, constants=None, thermal_params=None,
+                 method='F_Euler', log_freq=0.1, solver_options=None,
+                 settle_cache=None):
+
+        for action in actions:
+            if action[0] not in self.ACTIONS:
+                raise ValueError("Unrecognised scenario action: " +
+                                 str(action[0]))
+
+        self.actions = list(actions)
+        self.constants = constants
+        self.thermal_params = thermal_params
+        self.method = method
+        self.log_freq = log_freq
+        self.solver_options = solver_options or {}
+        self.settle_cache = settle_cache
+
+    def run(self):
+        """Run the scenario in the current process.
+
+        Returns:
+            solver - the PointKineticsSolver after the last action.
+
+        Excepts:
+            None"""
+
+        from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+
+        solver = PointKineticsSolver(self.constants, self.method,
+                                     **self.solver_options)
+        solver.set_settle_cache(self.settle_cache)
+
+        if self.thermal_params == 'example':
+            solver.set_example_thermal_params()
+        elif self.thermal_params is not None:
+            for name, value in self.thermal_params.items():
+                getattr(solver, 'set_' + name)(value)
+
+        for action in self.actions:
+            name, args = action[0], action[1:]
+
+            if name == 'solve' and len(args) == 1:
+                args = (args[0], self.log_freq)
+
+            getattr(solver, name)(*args)
+
+        return solver
+
+
+def _run_in_worker(job):
+    """Pool worker: run one scenario and publish its log in shared memory.
+
+    Returns:
+        index - position of the scenario in the submitted list.
+        name - name of the shared memory block, or None if nothing was
+            logged.
+        rows - number of logged samples.
+        columns - column names of the log."""
+
+    index, scenario = job
+
+    logger = scenario.run().logger1
+    block = logger.view()
+
+    if block.size == 0:
+        return index, None, 0, logger.columns
+
+    memory = shared_memory.SharedMemory(create=True, size=block.nbytes)
+    np.ndarray(block.shape, dtype=float, buffer=memory.buf)[:] = block
+    memory.close()
+
+    """The parent takes ownership and unlinks the block once it has copied
+    it, so stop this worker's resource tracker from cleaning it up too."""
+    resource_tracker.unregister(memory._name, 'shared_memory')
+
+    return index, memory.name, block.shape[1], logger.columns
+
+
+def _collect(name, rows, columns):
+    """Copy a worker's shared memory block into a Logger and release it."""
+
+    logger = Logger(columns, max(rows, 1))
+
+    if name is not None:
+        memory = shared_memory.SharedMemory(name=name)
+        logger.log_rows(np.ndarray((len(columns), rows), dtype=float,
+                                   buffer=memory.buf).T)
+        memory.close()
+        memory.unlink()
+
+    return logger
+
+
+def run_scenarios(scenarios, processes=None, chunksize=None, progress=None):
+    """Run scenarios on a process pool.
+
+    Args:
+        scenarios - list of Scenario instances.
+        processes - number of worker processes. Defaults to the number of
+            CPUs.
+        chunksize - number of scenarios sent to a worker at a time. Defaults
+            to spreading the scenarios over about four chunks per worker.
+        progress - optional function progress(done, total) called in this
+            process as each scenario finishes.
+
+    Returns:
+        results - list of Logger instances holding the logged samples of
+            each scenario, in the same order as scenarios.
+
+    Excepts:
+        None"""
+
+    scenarios = list(scenarios)
+    total = len(scenarios)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if chunksize is None:
+        chunksize = max(1, total // (4*processes))
+
+    results = [None] * total
+
+    with multiprocessing.Pool(processes) as pool:
+        for done, (index, name, rows, columns) in enumerate(
+                pool.imap_unordered(_run_in_worker, enumerate(scenarios),
+                                    chunksize)):
+
+            results[index] = _collect(name, rows, columns)
+
+            if progress is not None:
+                progress(done+1, total)
+
+    return results
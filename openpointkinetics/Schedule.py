@@ -0,0 +1,145 @@
+"""Input schedules.
+
+Time functions for the reactivity and steam demand inputs of the solver.
+PointKineticsModel evaluates a schedule at the integrator's own time, so a
+ramp or a load-follow profile needs only a single `solve` call. Any callable
+taking the time and returning a value can be used as a schedule; the classes
+here cover the common cases and cache the table interval they last looked up,
+which makes evaluation at the steadily advancing times of an integrator cost
+O(1) rather than a search of the whole table.
+
+A schedule with a `cache_key` method, as all of these have, can be part of
+a cached result, see DiskCache.ResultCache. The key must change whenever the
+function does.
+"""
+import bisect
+import math
+
+
+class PiecewiseLinear:
+    """Linear interpolation of a table, held constant beyond its ends.
+
+    Args:
+        times - ascending list of times.
+        values - list of values at those times."""
+
+    def __init__(self, times, values):
+
+        if len(times) != len(values) or len(times) == 0:
+            raise ValueError("times and values must be non-empty lists of "
+                             "the same length.")
+
+        self.times = [float(t) for t in times]
+        self.values = [float(v) for v in values]
+        self.index = 0  # start of the table interval last looked up
+
+    def cache_key(self):
+        """Return the values that define the schedule, for hashing."""
+
+        return [type(self).__name__, self.times, self.values,
+                getattr(self, 'initial', None)]
+
+    def locate(self, t):
+        """Return i such that times[i] <= t < times[i+1], starting from the
+        interval last looked up."""
+
+        i = self.index
+        times = self.times
+
+        if t < times[i]:
+            i = max(bisect.bisect_right(times, t) - 1, 0)
+        else:
+            while i+1 < len(times) and t >= times[i+1]:
+                i += 1
+
+        self.index = i
+
+        return i
+
+    def __call__(self, t):
+
+        if t <= self.times[0]:
+            return self.values[0]
+        if t >= self.times[-1]:
+            return self.values[-1]
+
+        i = self.locate(t)
+
+        fraction = (t - self.times[i]) / (self.times[i+1] - self.times[i])
+
+        return self.values[i] + fraction*(self.values[i+1] - self.values[i])
+
+
+class Steps(PiecewiseLinear):
+    """Piecewise constant table. The value at times[i] holds until
+    times[i+1]; before times[0] the value is `initial`.
+
+    Args:
+        times - ascending list of times at which the value changes.
+        values - list of values taken at those times.
+        initial - value before the first time."""
+
+    def __init__(self, times, values, initial=0.0):
+
+        PiecewiseLinear.__init__(self, times, values)
+        self.initial = float(initial)
+
+    def __call__(self, t):
+
+        if t < self.times[0]:
+            return self.initial
+
+        return self.values[self.locate(t)]
+
+
+class Step(Steps):
+    """Single step from `before` to `after` at time t_step."""
+
+    def __init__(self, t_step, after, before=0.0):
+
+        Steps.__init__(self, [t_step], [after], before)
+
+
+class Ramp(PiecewiseLinear):
+    """Linear ramp from `start` at t_start to `end` at t_end, constant
+    outside."""
+
+    def __init__(self, t_start, t_end, start, end):
+
+        PiecewiseLinear.__init__(self, [t_start, t_end], [start, end])
+
+
+class ScramCurve:
+    """Reactivity inserted by a scram.
+
+    The rods start dropping at t_scram and accelerate uniformly, reaching the
+    bottom after insertion_time, so the inserted fraction of their length is
+    x = ((t - t_scram)/insertion_time)**2. The rod worth follows the usual
+    S-shaped integral curve, x - sin(2 pi x)/(2 pi), giving 0 before the scram
+    and -worth once the rods are fully in.
+
+    Args:
+        t_scram - time at which the rods are released.
+        worth - total (positive) reactivity worth of the rods.
+        insertion_time - time for the rods to be fully inserted."""
+
+    def __init__(self, t_scram, worth, insertion_time=2.0):
+
+        self.t_scram = t_scram
+        self.worth = worth
+        self.insertion_time = insertion_time
+
+    def cache_key(self):
+        """Return the values that define the schedule, for hashing."""
+
+        return [type(self).__name__, self.t_scram, self.worth,
+                self.insertion_time]
+
+    def __call__(self, t):
+
+        if t <= self.t_scram:
+            return 0.0
+
+        x = min(((t - self.t_scram) / self.insertion_time)**2, 1.0)
+
+        return -self.worth * (x - math.sin(2*math.pi*x) / (2*math.pi))
@@ -0,0 +1,406 @@
+"""Forward sensitivities and least-squares fitting of model parameters.
+
+The sensitivity S_p = dx/dp of the state x to a parameter p obeys
+
+    dS_p/dt = J(x) S_p + df/dp
+
+where J is the Jacobian of the point kinetics gradient f. The sensitivities
+are integrated alongside the state as extra rows of a stacked state, so any
+numerical method steps them with the steps of the state, and DOPRI45 chooses
+those steps from the error of the state alone. Every gradient call evaluates
+the state's Jacobian once for all the rows. One solve then gives the
+gradient of a fit with respect to every parameter, where finite differences
+would need an extra solve per parameter.
+
+Parameters are named as the state elements, for the initial conditions and
+the constant thermal parameters, or as the group constants:
+
+    'power', 'rho', 'temperature', 'demand', 'alpha_t', 'heat_capacity'
+    'n_gen_time', 'beta0'...'betaN', 'lambda0'...'lambdaN'
+
+With ROS2 the sensitivity rows use the Jacobian of the state only, which
+keeps the method second order as ROS2 is a W-method.
+"""
+import numpy as np
+
+from openpointkinetics.PointKineticsConstants import PointKineticsConstants
+from openpointkinetics.PointKineticsModel import PointKineticsModel
+from openpointkinetics.numericalmethods import Builder
+
+
+STATE_PARAMETERS = {'power': 1, 'rho': 2, 'temperature': 3, 'demand': 4,
+                    'alpha_t': 5, 'heat_capacity': 6}  # state vector index
+
+DENSE_METHODS = ['dopri45', 'ros2']  # sample stacked states by dense output
+
+
+def parse_parameter(name, ndg):
+    """Split a parameter name into its kind and index.
+
+    Args:
+        name - parameter name, see the module docstring.
+        ndg - number of delayed neutron groups.
+
+    Returns:
+        kind - 'state', 'n_gen_time', 'beta' or 'lambda'.
+        index - state vector index for 'state', group index for 'beta' and
+            'lambda', else None.
+
+    Excepts:
+        ValueError - if the name is not a parameter."""
+
+    if name in STATE_PARAMETERS:
+        return 'state', STATE_PARAMETERS[name]
+
+    if name == 'n_gen_time':
+        return 'n_gen_time', None
+
+    for kind in ['beta', 'lambda']:
+        group = name[len(kind):]
+        if name.startswith(kind) and group.isdigit() and int(group) < ndg:
+            return kind, int(group)
+
+    raise ValueError('unknown parameter ' + repr(name))
+
+
+class SensitivityModel(PointKineticsModel):
+    """Point kinetics model of a state stacked with its sensitivities.
+
+    The vector has shape (1+p, ndg+7): row 0 is the state and row 1+j its
+    sensitivity to parameter j. Column 0 of every row holds the time, as for
+    any stacked state.
+
+    Args:
+        constants - PointKineticsConstants.
+        kinds - list of (kind, index) pairs from `parse_parameter`."""
+
+    def __init__(self, constants, kinds):
+
+        PointKineticsModel.__init__(self, constants)
+
+        self.kinds = kinds
+
+    def d_by_dt(self, vector):
+        """Gradient of a list state. See `d_by_dt_array`."""
+
+        return self.d_by_dt_array(np.asarray(vector, dtype=float)).tolist()
+
+    def d_by_dt_array(self, vector, out=None):
+        """Gradient of the state and its sensitivities."""
+
+        if out is None:
+            out = np.empty_like(vector)
+
+        state = vector[0]
+
+        PointKineticsModel.d_by_dt_array(self, state, out[0])
+        np.matmul(vector[1:], PointKineticsModel.jacobian(self, state).T,
+                  out=out[1:])
+        out[1:, 0] = 1.0
+
+        power = state[1]
+        rho = state[2]
+        if self.rho_schedule is not None:
+            rho = rho + self.rho_schedule(state[0])
+
+        for row, (kind, i) in zip(out[1:], self.kinds):
+            if kind == 'beta':
+                row[1] -= power / self.n_gen_time
+                row[7+i] += power / self.n_gen_time
+            elif kind == 'lambda':
+                row[1] += state[7+i]
+                row[7+i] -= state[7+i]
+            elif kind == 'n_gen_time':
+                row[1] -= (rho - self.beta) * power / self.n_gen_time**2
+                row[7:] -= self.beta_groups * power / self.n_gen_time**2
+
+        return out
+
+    def jacobian(self, vector):
+        """Jacobian of the state, repeated for every row."""
+
+        jac = PointKineticsModel.jacobian(self, vector[0])
+
+        return np.broadcast_to(jac, vector.shape + (vector.shape[-1],))
+
+
+class SensitivitySolver:
+    """Solve a solver's state and its sensitivities to parameters.
+
+    The solver's state, constants, input schedules, method and method
+    options are captured when this is created, and are not changed by
+    `solve`. The compiled kernels handle single states only, so the Python
+    implementation of the method is used.
+
+    Args:
+        solver - PointKineticsSolver to start from.
+        parameters - list of parameter names, see the module docstring.
+        equilibrium - if True, the precursors start in equilibrium with the
+            power, C_i = beta_i*P/(lambda_i*n_gen_time), for every set of
+            parameter values, and their sensitivities start accordingly."""
+
+    def __init__(self, solver, parameters, equilibrium=False):
+
+        self.parameters = list(parameters)
+        self.kinds = [parse_parameter(name, solver.ndg)
+                      for name in self.parameters]
+        self.equilibrium = equilibrium
+
+        self.vector = np.array(solver.state.vectorise(), dtype=float)
+        self.constants = solver.constants
+        self.rho_schedule = solver.pk_model.rho_schedule
+        self.demand_schedule = solver.pk_model.demand_schedule
+
+        self.method_name = solver.method_name
+
+        options = dict(solver.method_options)
+        options['h'] = solver.method.h
+        options['compiled'] = False
+        options['error_index'] = 0
+
+        self.model = None
+        self.method = Builder.builder(
+            solver.method_name, lambda vector: self.model.d_by_dt(vector),
+            ddt_array=lambda vector, out: self.model.d_by_dt_array(vector,
+                                                                   out),
+            jacobian=lambda vector: self.model.jacobian(vector), **options)
+
+    def values(self):
+        """Return the starting value of every parameter, in order."""
+
+        values = []
+
+        for kind, i in self.kinds:
+            if kind == 'state':
+                values.append(self.vector[i])
+            elif kind == 'beta':
+                values.append(self.constants.beta_groups[i])
+            elif kind == 'lambda':
+                values.append(self.constants.lambda_groups[i])
+            else:
+                values.append(self.constants.n_gen_time)
+
+        return np.array(values, dtype=float)
+
+    def solve(self, t_samples, values=None):
+        """Solve the state and its sensitivities at the sample times.
+
+        Args:
+            t_samples - ascending times, from the solver's time on.
+            values - optional value of every parameter, in order, replacing
+                those of the solver.
+
+        Returns:
+            samples - array of shape (len(t_samples), ndg+7) of the state.
+            sensitivities - array of shape (len(t_samples), p, ndg+7),
+                where [k, j, i] is the derivative of state element i at
+                t_samples[k] with respect to parameter j. Column 0 is zero.
+
+        Excepts:
+            None"""
+
+        if values is None:
+            values = self.values()
+
+        vector = self.vector.copy()
+        beta_groups = list(self.constants.beta_groups)
+        lambda_groups = list(self.constants.lambda_groups)
+        n_gen_time = self.constants.n_gen_time
+
+        for (kind, i), value in zip(self.kinds, values):
+            if kind == 'state':
+                vector[i] = value
+            elif kind == 'beta':
+                beta_groups[i] = value
+            elif kind == 'lambda':
+                lambda_groups[i] = value
+            else:
+                n_gen_time = value
+
+        constants = PointKineticsConstants(beta_groups, lambda_groups,
+                                           n_gen_time)
+
+        self.model = SensitivityModel(constants, self.kinds)
+        self.model.rho_schedule = self.rho_schedule
+        self.model.demand_schedule = self.demand_schedule
+
+        stack = np.zeros((1 + len(self.kinds), len(vector)))
+        stack[0] = vector
+        stack[:, 0] = vector[0]
+
+        for row, (kind, i) in zip(stack[1:], self.kinds):
+            if kind == 'state':
+                row[i] = 1.0
+
+        if self.equilibrium:
+            self._equilibrate(stack, constants)
+
+        t_samples = np.asarray(t_samples, dtype=float)
+
+        if self.method_name.lower() in DENSE_METHODS:
+            stack, samples = self.method.solve_dense(stack, t_samples[-1],
+                                                     t_samples)
+        else:
+            samples = np.empty((len(t_samples),) + stack.shape)
+
+            for i, t_sample in enumerate(t_samples):
+                stack = self.method.solve(stack, t_sample)
+                samples[i] = stack
+
+        sensitivities = samples[:, 1:].copy()
+        sensitivities[..., 0] = 0.0
+
+        return samples[:, 0].copy(), sensitivities
+
+    def _equilibrate(self, stack, constants):
+        """Set the precursors of the stacked state and sensitivities to
+        equilibrium with the power."""
+
+        beta_groups = np.asarray(constants.beta_groups, dtype=float)
+        lambda_groups = np.asarray(constants.lambda_groups, dtype=float)
+        n_gen_time = constants.n_gen_time
+        power = stack[0, 1]
+
+        precursors = beta_groups * power / (lambda_groups * n_gen_time)
+        stack[0, 7:] = precursors
+
+        for row, (kind, i) in zip(stack[1:], self.kinds):
+            if kind == 'state' and i == 1:
+                row[7:] = beta_groups / (lambda_groups * n_gen_time)
+            elif kind == 'beta':
+                row[7+i] = precursors[i] / beta_groups[i]
+            elif kind == 'lambda':
+                row[7+i] = -precursors[i] / lambda_groups[i]
+            elif kind == 'n_gen_time':
+                row[7:] = -precursors / n_gen_time
+
+
+class FitResult:
+    """Outcome of `fit`.
+
+    Attributes:
+        parameters - list of the fitted parameter names.
+        values - dict of the fitted value of every parameter.
+        errors - dict of the standard error of every parameter, from the
+            covariance of the fit.
+        covariance - (p, p) covariance matrix of the parameters.
+        cost - sum of the squared weighted residuals.
+        iterations - number of accepted steps.
+        evaluations - number of sensitivity solves.
+        converged - True if the fit met its tolerance."""
+
+    def __init__(self, parameters, values, covariance, cost, iterations,
+                 evaluations, converged):
+
+        self.parameters = parameters
+        self.values = dict(zip(parameters, values))
+        self.errors = dict(zip(parameters,
+                               np.sqrt(np.abs(np.diag(covariance)))))
+        self.covariance = covariance
+        self.cost = cost
+        self.iterations = iterations
+        self.evaluations = evaluations
+        self.converged = converged
+
+
+def fit(solver, parameters, t, observed, columns='power', sigma=1.0,
+        equilibrium=False, max_iterations=50, tol=1E-10):
+    """Fit parameters of a solver to a measured transient.
+
+    Levenberg-Marquardt least squares, minimising the sum of the squared
+    residuals (model - observed)/sigma. The Jacobian of the residuals comes
+    from one sensitivity solve per iteration. The transient starts from the
+    solver's current state, with its input schedules, method and options.
+    The solver itself is not changed.
+
+    Args:
+        solver - PointKineticsSolver set up at the start of the transient.
+        parameters - list of parameter names to fit, see the module
+            docstring. The solver's values are the first guess.
+        t - array of the measurement times.
+        observed - array of the measurements, of shape (len(t),) for one
+            column or (len(t), len(columns)).
+        columns - name, or list of names, of the measured state elements.
+        sigma - measurement uncertainty, a scalar or an array shaped like
+            observed.
+        equilibrium - see SensitivitySolver.
+        max_iterations - largest number of accepted steps.
+        tol - relative decrease of the cost below which the fit has
+            converged.
+
+    Returns:
+        result - FitResult.
+
+    Excepts:
+        ValueError - if a parameter name is unknown."""
+
+    if isinstance(columns, str):
+        columns = [columns]
+
+    labels = solver.state.vector_labels()
+    index = [labels.index(column) for column in columns]
+
+    observed = np.asarray(observed, dtype=float).reshape(len(t), len(index))
+
+    sigma = np.asarray(sigma, dtype=float)
+    if sigma.ndim:
+        sigma = sigma.reshape(observed.shape)
+    weight = 1.0 / np.broadcast_to(sigma, observed.shape)
+
+    engine = SensitivitySolver(solver, parameters, equilibrium)
+
+    def residuals(values):
+        samples, sensitivities = engine.solve(t, values)
+        residual = ((samples[:, index] - observed) * weight).ravel()
+        jac = (sensitivities[:, :, index] *
+               weight[:, None, :]).transpose(0, 2, 1).reshape(-1, len(values))
+        return residual, jac
+
+    values = engine.values()
+    residual, jac = residuals(values)
+    cost = residual @ residual
+    evaluations = 1
+    iterations = 0
+    converged = False
+    damping = 1E-3
+
+    while iterations < max_iterations and not converged:
+        """Solve in parameters scaled to unit Jacobian columns, as e.g. a
+        heat capacity and a temperature coefficient differ by 1E12."""
+        scale = np.maximum(np.sqrt(np.sum(jac**2, axis=0)), 1E-300)
+        scaled = jac / scale
+        normal = scaled.T @ scaled
+
+        step = np.linalg.solve(normal + damping * np.diag(np.diag(normal)),
+                               -(scaled.T @ residual)) / scale
+
+        """Stop when even the linearised model cannot reduce the cost."""
+        predicted = residual + jac @ step
+        if cost - predicted @ predicted <= tol * cost:
+            converged = True
+            break
+
+        trial = values + step
+        trial_residual, trial_jac = residuals(trial)
+        trial_cost = trial_residual @ trial_residual
+        evaluations += 1
+
+        if trial_cost < cost:
+            converged = cost - trial_cost <= tol * cost
+            values, residual, jac, cost = (trial, trial_residual, trial_jac,
+                                           trial_cost)
+            iterations += 1
+            damping = max(damping / 10.0, 1E-12)
+        else:
+            damping *= 10.0
+            if damping > 1E12:
+                break  # no step reduces the cost, so not converged
+
+    scale = np.maximum(np.sqrt(np.sum(jac**2, axis=0)), 1E-300)
+    scaled = jac / scale
+    dof = max(len(residual) - len(values), 1)
+    covariance = (np.linalg.pinv(scaled.T @ scaled) / np.outer(scale, scale) *
+                  cost / dof)
+
+    return FitResult(list(parameters), values, covariance, cost, iterations,
+                     evaluations, converged)
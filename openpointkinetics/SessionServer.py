@@ -0,0 +1,636 @@
+"""Multi-session simulation server.
+
+Host many PointKineticsSolver sessions in one process and serve them over a
+local TCP or Unix socket, so clients such as training stations and test
+harnesses need not start an interpreter each.
+
+Protocol. Every message is a frame: a little-endian uint32 length followed by
+that many bytes. A request frame holds a uint8 operation, a uint32 session id
+and a body; a reply frame holds a uint8 status, 0 for success or 1 for an
+error whose body is the UTF-8 message, and a body. Requests on a connection
+are answered in order. The bodies of the frequent operations are packed
+binary; only CREATE and METRICS, which carry free-form options and
+statistics, use UTF-8 JSON.
+
+    CREATE     JSON {"method", "constants", "thermal_params", options...}
+               -> uint32 session id
+    CONFIGURE  repeated (uint8 command, float64 value), see CONFIGURE_COMMANDS
+               -> empty
+    SOLVE      float64 t_change, float64 log_freq, uint8 log
+               -> float64 t, uint32 logged rows
+    QUERY      uint32 first row, uint32 row count (0 for all)
+               -> uint32 columns, uint32 rows, float64 rows x columns
+    SNAPSHOT   empty -> float64 state vector
+    METRICS    empty -> JSON of the server metrics, or of the session's
+               stats for a non-zero session id
+    CLEAR_LOG  empty -> empty, discards the session's logged rows
+    CLOSE      empty -> empty, deletes the session
+
+Scheduling. SOLVE requests are queued and progressed in rounds. Each round,
+every session with queued work advances by at most slice_time of simulated
+time, so a long run cannot starve short ones, and the rounds run on a
+thread pool so the event loop keeps serving requests. Sessions with the same
+constants, fixed-step method, options and log frequency, and no input
+schedules or prompt jump, are stepped together as one stacked array; the
+model does not depend on time, so their clocks need not agree. Batched
+sessions step exactly onto each log time rather than sampling between steps.
+Sessions with the adaptive DOPRI45 method are stepped on their own, since
+a shared step and error norm would make each result depend on the others in
+its batch. A settle is run on the thread pool too.
+
+Each session's logged rows are capped at memory_limit bytes; a SOLVE that
+would exceed it fails and the client can QUERY and CLEAR_LOG first.
+
+    python -m openpointkinetics.SessionServer --port 7450
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from openpointkinetics.PointKineticsConstants import PointKineticsConstants
+from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+
+
+CREATE, CONFIGURE, SOLVE, QUERY, SNAPSHOT, METRICS, CLEAR_LOG, CLOSE = range(8)
+
+OPERATIONS = ['create', 'configure', 'solve', 'query', 'snapshot', 'metrics',
+              'clear_log', 'close']
+
+CONFIGURE_COMMANDS = ['set_power', 'set_rho', 'add_rho', 'set_temperature',
+                      'set_demand', 'add_demand', 'set_alpha_t',
+                      'set_heat_capacity', 'set_example_thermal_params',
+                      'equilibrate', 'settle']
+# set_example_thermal_params and equilibrate ignore the value, and settle
+# takes it as t_max.
+
+LENGTH = struct.Struct('<I')
+REQUEST = struct.Struct('<BI')
+REPLY = struct.Struct('<B')
+COMMAND = struct.Struct('<Bd')
+SOLVE_ARGS = struct.Struct('<ddB')
+SOLVE_REPLY = struct.Struct('<dI')
+QUERY_ARGS = struct.Struct('<II')
+SESSION = struct.Struct('<I')
+
+
+class _Job:
+    """Queued SOLVE of a session, counted in steps of at most slice_time.
+
+    A log interval longer than slice_time is split into log_every equal
+    steps, logging at the first, so that no step holds up a round."""
+
+    def __init__(self, intervals, log_freq, log, slice_time, future):
+        self.log_every = max(1, int(-(-log_freq // slice_time)))
+        self.step = log_freq / self.log_every
+        self.remaining = intervals * self.log_every
+        self.done = 0
+        self.log = log
+        self.future = future
+
+    def logs_at(self, i):
+        """Return True if the state is logged before step done+i."""
+
+        return self.log and (self.done + i) % self.log_every == 0
+
+
+class _Session:
+    """A solver with the lock serialising its requests and its queued job."""
+
+    def __init__(self, solver, options):
+        self.solver = solver
+        self.lock = asyncio.Lock()
+        self.job = None
+
+        self.batchable = (solver.method_name.lower() != 'dopri45' and
+                          not solver.prompt_jump)
+
+        self.batch_key = json.dumps(
+            [list(solver.constants.beta_groups),
+             list(solver.constants.lambda_groups),
+             solver.constants.n_gen_time, solver.method_name, options])
+
+    def memory(self):
+        """Bytes held by the logged rows."""
+
+        logger = self.solver.logger1
+
+        return logger.rows * len(logger.columns) * 8
+
+
+class SessionServer:
+    """Serve PointKineticsSolver sessions over a local socket.
+
+    Args:
+        workers - threads stepping the sessions. Defaults to the number of
+            CPUs. The compiled kernels and large numpy operations release
+            the GIL, so more than one is useful.
+        memory_limit - largest size in bytes of a session's logged rows.
+        slice_time - simulated time a session advances per scheduling
+            round.
+        max_sessions - largest number of open sessions."""
+
+    def __init__(self, workers=None, memory_limit=64*2**20, slice_time=1.0,
+                 max_sessions=1024):
+
+        self.workers = workers or os.cpu_count()
+        self.memory_limit = memory_limit
+        self.slice_time = slice_time
+        self.max_sessions = max_sessions
+
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+
+        self.pool = ThreadPoolExecutor(self.workers)
+        self.server = None
+        self.scheduler = None
+        self.work = None
+
+        self.started = time.monotonic()
+        self.requests = dict.fromkeys(OPERATIONS, 0)
+        self.errors = 0
+        self.rounds = 0
+        self.batches = 0
+        self.batched_sessions = 0
+        self.steps = 0
+        self.simulated = 0.0
+        self.busy = 0.0
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Start listening, on a Unix socket if path is given and on TCP
+        otherwise. Port 0 picks a free port; see `address`."""
+
+        self.work = asyncio.Event()
+        self.scheduler = asyncio.create_task(self._schedule())
+
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._serve, path)
+        else:
+            self.server = await asyncio.start_server(self._serve, host, port)
+
+    @property
+    def address(self):
+        """Address clients connect to: (host, port) or a socket path."""
+
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def close(self):
+        """Stop listening and stepping, failing any queued solves."""
+
+        self.server.close()
+        await self.server.wait_closed()
+
+        self.scheduler.cancel()
+
+        for session in self.sessions.values():
+            if session.job is not None and not session.job.future.done():
+                session.job.future.set_exception(
+                    RuntimeError("Server closed."))
+
+        self.pool.shutdown()
+
+    async def _serve(self, reader, writer):
+        """Answer the requests of one connection in order."""
+
+        try:
+            while True:
+                header = await reader.readexactly(LENGTH.size)
+                frame = await reader.readexactly(LENGTH.unpack(header)[0])
+
+                try:
+                    operation, session_id = REQUEST.unpack_from(frame)
+                    self.requests[OPERATIONS[operation]] += 1
+
+                    body = await self._handle(operation, session_id,
+                                              frame[REQUEST.size:])
+                    reply = REPLY.pack(0) + body
+                except Exception as error:
+                    self.errors += 1
+                    reply = REPLY.pack(1) + str(error).encode()
+
+                writer.write(LENGTH.pack(len(reply)) + reply)
+                await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, operation, session_id, body):
+
+        if operation == CREATE:
+            return self._create(json.loads(body.decode()))
+
+        if operation == METRICS and session_id == 0:
+            return json.dumps(self.metrics()).encode()
+
+        if session_id not in self.sessions:
+            raise KeyError("No session " + str(session_id))
+
+        session = self.sessions[session_id]
+
+        async with session.lock:
+
+            if operation == CONFIGURE:
+                for offset in range(0, len(body), COMMAND.size):
+                    command, value = COMMAND.unpack_from(body, offset)
+                    command = CONFIGURE_COMMANDS[command]
+
+                    if command == 'settle':
+                        await asyncio.get_running_loop().run_in_executor(
+                            self.pool, self._configure, session.solver,
+                            command, value)
+                    else:
+                        self._configure(session.solver, command, value)
+                return b''
+
+            if operation == SOLVE:
+                t_change, log_freq, log = SOLVE_ARGS.unpack(body)
+                await self._solve(session, t_change, log_freq, bool(log))
+                return SOLVE_REPLY.pack(session.solver.state.get_t(),
+                                        session.solver.logger1.rows)
+
+            if operation == QUERY:
+                first, count = QUERY_ARGS.unpack(body)
+                block = session.solver.logger1.view()[:, first:]
+                if count:
+                    block = block[:, :count]
+                return (QUERY_ARGS.pack(*block.shape) +
+                        np.ascontiguousarray(block.T, '<f8').tobytes())
+
+            if operation == SNAPSHOT:
+                return np.array(session.solver.state.vectorise(),
+                                '<f8').tobytes()
+
+            if operation == METRICS:
+                stats = session.solver.stats
+                stats['rows'] = session.solver.logger1.rows
+                stats['memory'] = session.memory()
+                return json.dumps(stats).encode()
+
+            if operation == CLEAR_LOG:
+                logger = session.solver.logger1
+                logger.set_columns(logger.columns)
+                return b''
+
+            if operation == CLOSE:
+                del self.sessions[session_id]
+                return b''
+
+        raise ValueError("Unrecognised operation " + str(operation))
+
+    def _create(self, options):
+        """Build a session from CREATE options, returning its packed id."""
+
+        if len(self.sessions) >= self.max_sessions:
+            raise RuntimeError("Too many sessions.")
+
+        options = dict(options)
+        method = options.pop('method', 'F_Euler')
+        constants = options.pop('constants', None)
+        thermal_params = options.pop('thermal_params', None)
+
+        if constants is not None:
+            constants = PointKineticsConstants(**constants)
+
+        solver = PointKineticsSolver(constants, method, **options)
+
+        if thermal_params == 'example':
+            solver.set_example_thermal_params()
+        elif thermal_params is not None:
+            for name, value in thermal_params.items():
+                self._configure(solver, 'set_' + name, value)
+
+        session_id = next(self.session_ids)
+        self.sessions[session_id] = _Session(solver, options)
+
+        return SESSION.pack(session_id)
+
+    def _configure(self, solver, command, value):
+
+        if command not in CONFIGURE_COMMANDS:
+            raise ValueError("Unrecognised configure command " + command)
+
+        if command == 'settle':
+            solver.settle(value)
+        elif command in ['set_example_thermal_params', 'equilibrate']:
+            getattr(solver, command)()
+        else:
+            getattr(solver, command)(value)
+
+    async def _solve(self, session, t_change, log_freq, log):
+        """Queue a solve for the scheduler and wait for it to finish."""
+
+        if log_freq <= 0.0:
+            intervals = 1  # log now only and finish at t_stop, as solve
+            log_freq = t_change
+        else:
+            intervals = int(t_change / log_freq + 1E-9) + 1
+
+        if log_freq <= 0.0:
+            raise ValueError("t_change or log_freq must be positive.")
+
+        if log:
+            columns = len(session.solver.logger1.columns)
+            if (session.memory() + intervals*columns*8 > self.memory_limit):
+                raise MemoryError("Solve would exceed the session memory "
+                                  "limit of " + str(self.memory_limit) +
+                                  " bytes.")
+
+        session.job = _Job(intervals, log_freq, log, self.slice_time,
+                           asyncio.get_running_loop().create_future())
+        self.work.set()
+
+        try:
+            await session.job.future
+        finally:
+            session.job = None
+
+    async def _schedule(self):
+        """Progress the queued jobs in fair rounds."""
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+            await self.work.wait()
+
+            pending = [session for session in self.sessions.values()
+                       if session.job is not None and
+                       not session.job.future.done()]
+
+            if not pending:
+                self.work.clear()
+                continue
+
+            groups = {}
+            for session in pending:
+                solver = session.solver
+                if (not session.batchable or
+                        solver.pk_model.has_schedules() or
+                        solver._exact_applies()):
+                    key = id(session)
+                else:
+                    key = (session.batch_key, solver.method.h,
+                           session.job.step, session.job.log)
+                groups.setdefault(key, []).append(session)
+
+            start = time.perf_counter()
+
+            results = await asyncio.gather(
+                *[loop.run_in_executor(self.pool, self._run_group, group)
+                  for group in groups.values()],
+                return_exceptions=True)
+
+            self.busy += time.perf_counter() - start
+            self.rounds += 1
+
+            for group, result in zip(groups.values(), results):
+                if not isinstance(result, Exception):
+                    self.steps += result * len(group)
+                    self.simulated += (result * group[0].job.step *
+                                       len(group))
+                    if len(group) > 1:
+                        self.batches += 1
+                        self.batched_sessions += len(group)
+
+                for session in group:
+                    job = session.job
+                    if isinstance(result, Exception):
+                        job.future.set_exception(result)
+                    elif job.remaining == 0:
+                        job.future.set_result(None)
+
+    def _slice(self, job):
+        """Number of steps a job advances in one round."""
+
+        return max(1, min(job.remaining,
+                          int(self.slice_time / job.step + 1E-9)))
+
+    def _run_group(self, group):
+        """Advance a group of sessions by one slice, returning the number of
+        steps advanced. Runs on the pool."""
+
+        if len(group) == 1:
+            solver = group[0].solver
+            job = group[0].job
+            steps = self._slice(job)
+
+            if job.log_every == 1:
+                solver.solve((steps - 1)*job.step, job.step, job.log)
+            else:
+                for i in range(steps):
+                    if job.logs_at(i):
+                        solver.solve(0.0, job.step)  # log, then one step
+                    else:
+                        solver.advance(job.step)
+        else:
+            steps = min(self._slice(session.job) for session in group)
+            self._run_batch(group, steps)
+
+        for session in group:
+            session.job.done += steps
+            session.job.remaining -= steps
+
+        return steps
+
+    def _run_batch(self, group, steps):
+        """Step sessions sharing constants, fixed-step method and step as
+        one stacked array, with their times held apart. The work done is
+        added to the stats of every session's method."""
+
+        step = group[0].job.step
+        method = group[0].solver.method
+        before = method.stats.as_dict()
+
+        states = np.array([session.solver.state.vectorise()
+                           for session in group])
+        times = states[:, 0].copy()
+        states[:, 0] = 0.0
+
+        rows = np.empty((steps,) + states.shape)
+
+        for i in range(steps):
+            rows[i] = states
+            rows[i, :, 0] = times + i*step
+
+            states[:, 0] = 0.0
+            states = method.solve(states, step)
+
+        states[:, 0] = times + steps*step
+
+        work = {name: count - before[name]
+                for name, count in method.stats.as_dict().items()}
+
+        for j, session in enumerate(group):
+            if j > 0:
+                session.solver.method.stats.add(**work)
+
+            logged = [i for i in range(steps) if session.job.logs_at(i)]
+            if logged:
+                session.solver.logger1.log_rows(rows[logged, j])
+
+            session.solver.state.load_vector(states[j])
+
+    def metrics(self):
+        """Dictionary of server wide metrics."""
+
+        uptime = time.monotonic() - self.started
+
+        return {'sessions': len(self.sessions),
+                'uptime': uptime,
+                'requests': dict(self.requests),
+                'errors': self.errors,
+                'rounds': self.rounds,
+                'batches': self.batches,
+                'batched_sessions': self.batched_sessions,
+                'steps': self.steps,
+                'simulated': self.simulated,
+                'busy': self.busy,
+                'simulated_per_busy_second':
+                    self.simulated / self.busy if self.busy else 0.0,
+                'memory': sum(session.memory()
+                              for session in self.sessions.values())}
+
+
+class SessionClient:
+    """Blocking client of a SessionServer.
+
+    Args:
+        address - (host, port) of a TCP server or the path of a Unix
+            socket."""
+
+    def __init__(self, address):
+        import socket
+
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX)
+        else:
+            self.socket = socket.socket(socket.AF_INET)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.socket.connect(address)
+        self.stream = self.socket.makefile('rb')
+
+    def close(self):
+        self.stream.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def request(self, operation, session_id=0, body=b''):
+        """Send one request and return the reply body.
+
+        Excepts:
+            RuntimeError with the server's message if the request failed."""
+
+        frame = REQUEST.pack(operation, session_id) + body
+        self.socket.sendall(LENGTH.pack(len(frame)) + frame)
+
+        header = self.stream.read(LENGTH.size)
+        if len(header) < LENGTH.size:
+            raise ConnectionError("Server closed the connection.")
+
+        reply = self.stream.read(LENGTH.unpack(header)[0])
+
+        if REPLY.unpack_from(reply)[0] != 0:
+            raise RuntimeError(reply[REPLY.size:].decode())
+
+        return reply[REPLY.size:]
+
+    def create(self, method='F_Euler', constants=None, thermal_params=None,
+               **options):
+        """Create a session, returning its id. constants is a dictionary of
+        PointKineticsConstants arguments; options are PointKineticsSolver
+        keyword arguments such as h."""
+
+        options = dict(options, method=method, constants=constants,
+                       thermal_params=thermal_params)
+
+        return SESSION.unpack(self.request(CREATE, 0,
+                                           json.dumps(options).encode()))[0]
+
+    def configure(self, session_id, *commands):
+        """Apply (command, value) pairs, command in CONFIGURE_COMMANDS."""
+
+        body = b''.join(COMMAND.pack(CONFIGURE_COMMANDS.index(command),
+                                     value)
+                        for command, value in commands)
+
+        self.request(CONFIGURE, session_id, body)
+
+    def solve(self, session_id, t_change, log_freq, log=True):
+        """Solve as PointKineticsSolver.solve, returning the new time and
+        the number of logged rows."""
+
+        return SOLVE_REPLY.unpack(self.request(
+            SOLVE, session_id, SOLVE_ARGS.pack(t_change, log_freq, log)))
+
+    def query(self, session_id, first=0, count=0):
+        """Return logged rows from first as a (rows, columns) array, in the
+        column order of PointKineticsState.vector_labels."""
+
+        reply = self.request(QUERY, session_id, QUERY_ARGS.pack(first, count))
+        columns, rows = QUERY_ARGS.unpack_from(reply)
+
+        return np.frombuffer(reply, '<f8', offset=QUERY_ARGS.size).reshape(
+            rows, columns)
+
+    def snapshot(self, session_id):
+        """Return the current state vector."""
+
+        return np.frombuffer(self.request(SNAPSHOT, session_id), '<f8')
+
+    def metrics(self, session_id=0):
+        """Return the server metrics, or a session's stats."""
+
+        return json.loads(self.request(METRICS, session_id).decode())
+
+    def clear_log(self, session_id):
+        self.request(CLEAR_LOG, session_id)
+
+    def close_session(self, session_id):
+        self.request(CLOSE, session_id)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(
+        description="Serve point kinetics sessions on a local socket.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7450)
+    parser.add_argument('--unix', help='serve on this Unix socket instead')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--memory-limit', type=int, default=64*2**20,
+                        help='bytes of logged rows per session')
+    parser.add_argument('--slice-time', type=float, default=1.0,
+                        help='simulated seconds per session per round')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = SessionServer(args.workers, args.memory_limit,
+                               args.slice_time)
+        await server.start(args.host, args.port, args.unix)
+        print("Serving on " + str(server.address))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
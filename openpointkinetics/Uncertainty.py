@@ -0,0 +1,370 @@
+"""Monte Carlo uncertainty propagation.
+
+Uncertain constants and thermal parameters are drawn many times, every draw
+is run as a member of a PointKineticsEnsemble, and the trajectories are
+folded into OnlineStatistics on the shared log grid, chunk by chunk. Only
+one chunk of trajectories is held at a time, so memory does not grow with
+the number of samples, and the statistics of chunks run in different worker
+processes merge into those of the whole study.
+
+Samples are drawn in the unit hypercube, by plain random sampling, Latin
+hypercube sampling or a scrambled Sobol sequence, and mapped onto each
+parameter's distribution. Every chunk can draw its own slice of the design
+from the seed alone. The Sobol sequence needs SciPy.
+"""
+import multiprocessing
+import warnings
+from statistics import NormalDist
+
+import numpy as np
+
+from openpointkinetics.OnlineStatistics import OnlineStatistics
+from openpointkinetics.PointKineticsConstants import PointKineticsConstants
+from openpointkinetics.PointKineticsEnsemble import PointKineticsEnsemble
+from openpointkinetics.PointKineticsState import PointKineticsState
+from openpointkinetics.Sensitivity import parse_parameter
+
+try:
+    from scipy.stats import qmc
+    SOBOL_AVAILABLE = True
+except ImportError:
+    SOBOL_AVAILABLE = False
+
+
+SAMPLERS = ['random', 'lhs', 'sobol']
+
+DISTRIBUTIONS = ['uniform', 'normal', 'lognormal']
+
+_NORMAL_PPF = np.vectorize(NormalDist().inv_cdf, otypes=[float])
+
+
+def _uniform(seed, start, count, dims):
+    """Rows start to start+count of a stream of uniform rows of dims values.
+    The generator skips the earlier rows, one 64-bit draw per value."""
+
+    bit_generator = np.random.PCG64(seed)
+    bit_generator.advance(start * dims)
+
+    return np.random.Generator(bit_generator).random((count, dims))
+
+
+def unit_samples(sampler, samples, dims, start, count, seed=0):
+    """Draw rows start to start+count of a design in the unit hypercube.
+
+    Args:
+        sampler - 'random', 'lhs' (Latin hypercube) or 'sobol'.
+        samples - total number of samples in the design. Sobol designs
+            are best balanced with a power of two.
+        dims - number of dimensions.
+        start - first row to draw.
+        count - number of rows to draw.
+        seed - seed of the whole design. The same seed gives the same
+            design however it is split into chunks.
+
+    Returns:
+        unit - array of shape (count, dims) in the open unit hypercube.
+
+    Excepts:
+        ValueError - if the sampler is not recognised.
+        ImportError - if 'sobol' is requested without SciPy."""
+
+    if sampler == 'random':
+        unit = _uniform(seed, start, count, dims)
+
+    elif sampler == 'lhs':
+        """Every chunk regenerates the strata permutations of the whole
+        design from the seed, and jitters its own rows within them."""
+        strata = np.random.default_rng(seed)
+        permutations = np.stack([strata.permutation(samples)
+                                 for dim in range(dims)], axis=1)
+        unit = ((permutations[start:start+count] +
+                 _uniform([seed, 1], start, count, dims)) / samples)
+
+    elif sampler == 'sobol':
+        if not SOBOL_AVAILABLE:
+            raise ImportError("Sobol sampling requires SciPy.")
+
+        engine = qmc.Sobol(dims, scramble=True, seed=seed)
+        """SciPy warns about every chunk that is not a power of two long,
+        but the balance that matters is that of the whole design."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            if start:
+                engine.fast_forward(start)
+            unit = engine.random(count)
+
+    else:
+        raise ValueError('unknown sampler ' + repr(sampler) + ', expected '
+                         'one of ' + str(SAMPLERS))
+
+    return np.clip(unit, 1E-12, 1.0 - 1E-12)
+
+
+class Parameter:
+    """An uncertain parameter and its distribution.
+
+    Args:
+        name - parameter name as in the Sensitivity module, e.g. 'alpha_t',
+            'heat_capacity', 'n_gen_time' or 'beta2', or 'beta_groups' or
+            'lambda_groups' for every group, each drawn independently.
+        distribution - 'uniform' between a and b, 'normal' with mean a and
+            standard deviation b, or 'lognormal' with median a and log
+            standard deviation b.
+        a, b - distribution parameters. For 'beta_groups' and
+            'lambda_groups' they may hold one value per group."""
+
+    def __init__(self, name, distribution, a, b):
+
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError('unknown distribution ' + repr(distribution) +
+                             ', expected one of ' + str(DISTRIBUTIONS))
+
+        self.name = name
+        self.distribution = distribution
+        self.a = np.asarray(a, dtype=float)
+        self.b = np.asarray(b, dtype=float)
+
+    def names(self, ndg):
+        """Return the single parameter names this parameter draws."""
+
+        if self.name in ['beta_groups', 'lambda_groups']:
+            return [self.name[:-len('_groups')] + str(i) for i in range(ndg)]
+
+        parse_parameter(self.name, ndg)
+
+        return [self.name]
+
+    def values(self, unit):
+        """Map unit samples of shape (count, dims) onto the distribution."""
+
+        a = np.broadcast_to(self.a, unit.shape[1:])
+        b = np.broadcast_to(self.b, unit.shape[1:])
+
+        if self.distribution == 'uniform':
+            return a + (b - a) * unit
+        if self.distribution == 'normal':
+            return a + b * _NORMAL_PPF(unit)
+
+        return a * np.exp(b * _NORMAL_PPF(unit))
+
+
+class UncertaintyStudy:
+    """A transient whose parameters are uncertain.
+
+    Args:
+        parameters - list of Parameter instances.
+        actions - list of tuples (name, *args) applied to every chunk's
+            PointKineticsEnsemble after the parameters are drawn, as in a
+            Scenario, e.g. [('add_rho', 1E-4), ('solve', 60)]. 'solve'
+            takes t_change and logs at log_freq, and its logged samples
+            make up the grid of the statistics.
+        constants - PointKineticsConstants of the nominal core.
+        thermal_params - None, 'example' or a dictionary of set_ values
+            applied before the parameters are drawn, as in a Scenario.
+        columns - state elements to gather statistics of.
+        method - name of the numerical method.
+        h - integration step.
+        log_freq - log frequency of the 'solve' actions.
+        equilibrium - if True, the precursors of every member start in
+            equilibrium with its power and drawn constants.
+        accuracy - relative accuracy of the quantile sketches, or None."""
+
+    def __init__(self, parameters, actions, constants=None,
+                 thermal_params=None, columns=('power',), method='RK4',
+                 h=1E-3, log_freq=0.1, equilibrium=True, accuracy=0.01):
+
+        if constants is None:
+            constants = PointKineticsConstants()
+
+        self.parameters = list(parameters)
+        self.actions = list(actions)
+        self.constants = constants
+        self.thermal_params = thermal_params
+        self.columns = list(columns)
+        self.method = method
+        self.h = h
+        self.log_freq = log_freq
+        self.equilibrium = equilibrium
+        self.accuracy = accuracy
+
+        self.names = [name for parameter in self.parameters
+                      for name in parameter.names(constants.ndg)]
+        self.dims = len(self.names)
+
+    def draw(self, unit):
+        """Map unit samples onto the parameters.
+
+        Returns:
+            values - array of shape (count, dims), in the order of
+                `self.names`."""
+
+        values = []
+        start = 0
+
+        for parameter in self.parameters:
+            dims = len(parameter.names(self.constants.ndg))
+            values.append(parameter.values(unit[:, start:start+dims]))
+            start += dims
+
+        return np.concatenate(values, axis=1)
+
+    def run(self, values, centre=None):
+        """Run one chunk of parameter values.
+
+        Args:
+            values - array of shape (count, dims) from `draw`.
+            centre - optional array of shape (len(times), len(columns)),
+                e.g. the nominal trajectory, that the quantile sketches
+                measure values from.
+
+        Returns:
+            times - array of the logged times.
+            statistics - OnlineStatistics of shape (len(times),
+                len(columns)) over the chunk.
+
+        Excepts:
+            None"""
+
+        kinds = [parse_parameter(name, self.constants.ndg)
+                 for name in self.names]
+
+        constants = []
+        for row in values:
+            beta_groups = list(self.constants.beta_groups)
+            lambda_groups = list(self.constants.lambda_groups)
+            n_gen_time = self.constants.n_gen_time
+
+            for (kind, i), value in zip(kinds, row):
+                if kind == 'beta':
+                    beta_groups[i] = value
+                elif kind == 'lambda':
+                    lambda_groups[i] = value
+                elif kind == 'n_gen_time':
+                    n_gen_time = value
+
+            constants.append(PointKineticsConstants(beta_groups,
+                                                    lambda_groups,
+                                                    n_gen_time))
+
+        ensemble = PointKineticsEnsemble(constants, self.method, self.h)
+
+        if self.thermal_params == 'example':
+            ensemble.set_example_thermal_params()
+        elif self.thermal_params is not None:
+            for name, value in self.thermal_params.items():
+                getattr(ensemble, 'set_' + name)(value)
+
+        for (kind, i), value in zip(kinds, values.T):
+            if kind == 'state':
+                ensemble.states[:, i] = value
+
+        if self.equilibrium:
+            model = ensemble.pk_model
+            ensemble.set_precursors(model.beta_over_gen / model.lambda_groups
+                                    * ensemble.states[:, 1:2])
+
+        for action in self.actions:
+            name, args = action[0], action[1:]
+
+            if name == 'solve':
+                args = (args[0], self.log_freq)
+
+            getattr(ensemble, name)(*args)
+
+        times, samples = ensemble.results()
+
+        labels = PointKineticsState(self.constants.ndg).vector_labels()
+        index = [labels.index(column) for column in self.columns]
+
+        statistics = OnlineStatistics((len(times), len(index)),
+                                      self.accuracy, centre=centre)
+        statistics.update(samples[:, :, index].transpose(1, 0, 2))
+
+        return times, statistics
+
+    def nominal(self):
+        """Run the draw at the median of every distribution.
+
+        Returns:
+            times - array of the logged times.
+            trajectory - array of shape (len(times), len(columns))."""
+
+        times, statistics = self.run(self.draw(np.full((1, self.dims), 0.5)))
+
+        return times, statistics.mean
+
+    def run_chunk(self, chunk):
+        """Draw and run one chunk of a design.
+
+        Args:
+            chunk - tuple (sampler, samples, start, count, seed, centre),
+                see `unit_samples` and `run`.
+
+        Returns:
+            times, statistics - see `run`."""
+
+        sampler, samples, start, count, seed, centre = chunk
+
+        return self.run(self.draw(unit_samples(sampler, samples, self.dims,
+                                               start, count, seed)), centre)
+
+
+def propagate(study, samples, sampler='lhs', seed=0, chunk_size=256,
+              processes=1, progress=None):
+    """Propagate the uncertain parameters of a study through its transient.
+
+    Args:
+        study - UncertaintyStudy.
+        samples - number of parameter draws.
+        sampler - 'random', 'lhs' or 'sobol', see `unit_samples`.
+        seed - seed of the design.
+        chunk_size - number of draws run together in one ensemble.
+        processes - number of worker processes. 1 runs the chunks in this
+            process; None uses every CPU.
+        progress - optional function progress(done, samples) called as each
+            chunk finishes.
+
+    Returns:
+        times - array of the logged times.
+        statistics - OnlineStatistics of shape (len(times),
+            len(study.columns)) over every draw.
+
+    Excepts:
+        ValueError - if the sampler is not recognised.
+        ImportError - if 'sobol' is requested without SciPy."""
+
+    # Quantiles are sketched relative to the nominal trajectory, which every
+    # chunk must share to merge.
+    centre = None
+    if study.accuracy is not None:
+        centre = study.nominal()[1]
+
+    chunks = [(sampler, samples, start, min(chunk_size, samples - start),
+               seed, centre) for start in range(0, samples, chunk_size)]
+
+    times = None
+    statistics = None
+    done = 0
+
+    def fold(result, count):
+        nonlocal times, statistics, done
+
+        if statistics is None:
+            times, statistics = result
+        else:
+            statistics.merge(result[1])
+
+        done += count
+        if progress is not None:
+            progress(done, samples)
+
+    if processes == 1:
+        for chunk in chunks:
+            fold(study.run_chunk(chunk), chunk[3])
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            for chunk, result in zip(chunks, pool.imap(study.run_chunk,
+                                                       chunks)):
+                fold(result, chunk[3])
+
+    return times, statistics
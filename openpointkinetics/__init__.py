@@ -1 +1,68 @@
-from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+"""openpointkinetics - a simple point kinetics solver.
+
+The public classes are imported on first use rather than with the package,
+so `import openpointkinetics` stays cheap for batch workers and command line
+tools that only need part of it, and never loads numpy or matplotlib by
+itself.
+"""
+import importlib
+import sys
+import types
+
+__version__ = '0.1.0'
+
+_EXPORTS = {'PointKineticsSolver': 'openpointkinetics.PointKineticsSolver',
+            'PointKineticsEnsemble': 'openpointkinetics.PointKineticsEnsemble',
+            'DiskLogger': 'openpointkinetics.DiskLogger',
+            'SettleCache': 'openpointkinetics.DiskCache',
+            'ResultCache': 'openpointkinetics.DiskCache',
+            'Scenario': 'openpointkinetics.ScenarioRunner',
+            'run_scenarios': 'openpointkinetics.ScenarioRunner',
+            'RealTimeRunner': 'openpointkinetics.RealTimeRunner',
+            'SessionServer': 'openpointkinetics.SessionServer',
+            'SessionClient': 'openpointkinetics.SessionServer',
+            'CoupledCore': 'openpointkinetics.CoupledCore',
+            'neighbour_coupling': 'openpointkinetics.CoupledCore',
+            'InverseKinetics': 'openpointkinetics.InverseKinetics',
+            'SensitivitySolver': 'openpointkinetics.Sensitivity',
+            'OnlineStatistics': 'openpointkinetics.OnlineStatistics'}
+
+_SUBMODULES = ['Schedule', 'Sensitivity', 'Uncertainty']
+
+__all__ = list(_EXPORTS) + _SUBMODULES
+
+
+def __getattr__(name):
+
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module('openpointkinetics.' + name)
+    else:
+        raise AttributeError("module 'openpointkinetics' has no attribute " +
+                             repr(name))
+
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+class _Package(types.ModuleType):
+    """Importing a submodule binds it as an attribute of the package, which
+    would hide the class of the same name, e.g. PointKineticsSolver. Bind
+    the class instead, as an eager `from ... import` in this file would."""
+
+    def __setattr__(self, name, value):
+
+        if (isinstance(value, types.ModuleType) and
+                _EXPORTS.get(name) == value.__name__):
+            value = getattr(value, name)
+
+        types.ModuleType.__setattr__(self, name, value)
+
+
+sys.modules[__name__].__class__ = _Package
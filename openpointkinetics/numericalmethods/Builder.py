@@ -6,30 +6,73 @@ keep that code as tidy as possible.
 """
 
 
-def builder(method, ddt, h=1E-3):
+def builder(method, ddt, h=1E-3, ddt_array=None, jacobian=None, model=None,
+            compiled=None, **options):
+    """Build a numerical method.
+
+    Args:
+        method - string name of the method.
+        ddt - function returning the gradient of a list state.
+        h - step
+        ddt_array - optional vectorised gradient function ddt_array(vector,
+            out), used by the methods when they are given numpy states.
+        jacobian - optional function returning the Jacobian of the gradient
+            for a numpy state, used by the implicit 'ROS2' method.
+        model - optional PointKineticsModel whose gradient ddt evaluates.
+            Required for the compiled kernels.
+        compiled - None to use a compiled kernel when Numba is installed and
+            one exists for the method, False to always use the Python
+            implementation.
+        options - method specific keyword arguments, e.g. rtol and atol for
+            the adaptive 'DOPRI45' method.
+
+    Returns:
+        instance of the requested numerical method class."""
 
     from openpointkinetics.numericalmethods.ForwardEulerMethod import ForwardEulerMethod
     from openpointkinetics.numericalmethods.ForwardEulerPC import ForwardEulerPC
     from openpointkinetics.numericalmethods.RungeKuttaFourthOrder import RK4
+    from openpointkinetics.numericalmethods.DormandPrince import DormandPrince45
+    from openpointkinetics.numericalmethods.Rosenbrock import Rosenbrock2
+    from openpointkinetics.numericalmethods import CompiledKernels
 
     # Set a default if the specified method not recognised
     if method.lower() not in [i.lower() for i in ['F_Euler',
                                                   'F_Euler_PC',
-                                                  'RK4']]:
+                                                  'RK4',
+                                                  'DOPRI45',
+                                                  'ROS2']]:
     
         print("Unrecognised numerical method request passed to\
               NumericalMethodBuilder")
         print("Using default Forward-Euler method")
         method = 'F_Euler'
 
+    if (compiled is not False and model is not None and
+            CompiledKernels.AVAILABLE and
+            method.lower() in CompiledKernels.METHODS):
+        print("Using compiled kernel")
+        return CompiledKernels.CompiledMethod(method.lower(), model,
+                                              builder(method, ddt, h,
+                                                      ddt_array, jacobian,
+                                                      **options))
+
     if method.lower() == 'F_Euler'.lower():
         print("Using Forward-Euler method")
-        return ForwardEulerMethod(ddt, h)
+        return ForwardEulerMethod(ddt, h, ddt_array)
 
     elif method.lower() == 'F_Euler_PC'.lower():
         print("Using Forward-Euler predictor-corrector method")
-        return ForwardEulerPC(ddt, h)
+        return ForwardEulerPC(ddt, h, ddt_array)
 
     elif method.lower() == 'RK4'.lower():
         print("Using Runge-Kutta method")
-        return RK4(ddt, h)
+        return RK4(ddt, h, ddt_array)
+
+    elif method.lower() == 'DOPRI45'.lower():
+        print("Using adaptive Dormand-Prince 5(4) method")
+        return DormandPrince45(ddt, h, ddt_array, **options)
+
+    elif method.lower() == 'ROS2'.lower():
+        print("Using stiff Rosenbrock (ROS2) method")
+        return Rosenbrock2(ddt, h, ddt_array, jacobian)
@@ -0,0 +1,304 @@
+"""Optional compiled integration kernels.
+
+When Numba is installed, the point kinetics gradient and the whole stepping
+loop of the forward Euler, forward Euler predictor-corrector and RK4 methods
+are compiled together into one kernel per method, including their dense
+output. `Builder.builder` selects these automatically for a single
+PointKineticsSolver state. The pure Python classes remain the reference
+implementation and the fallback, and are used whenever Numba is missing, the
+state is a stack of ensemble members or the model has input schedules, which
+are Python callables. The kernels release the GIL, so solvers in different
+threads can run them in parallel.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    AVAILABLE = True
+except ImportError:
+    AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Stand-in so the kernels below can still be defined."""
+        return lambda function: function
+
+
+METHODS = ['f_euler', 'f_euler_pc', 'rk4']  # methods with a compiled kernel
+
+
+@njit(cache=True, nogil=True)
+def _ddt(y, out, beta_over_gen, lambda_groups, beta, n_gen_time):
+    """Gradient of a single state, as PointKineticsModel.d_by_dt."""
+
+    power = y[1]
+
+    dp_dt = ((y[2] - beta) / n_gen_time) * power
+    for i in range(lambda_groups.shape[0]):
+        dp_dt += lambda_groups[i] * y[7+i]
+        out[7+i] = beta_over_gen[i] * power - lambda_groups[i] * y[7+i]
+
+    if y[6] <= 0:
+        dtemp_dt = 0.0
+    else:
+        dtemp_dt = (power - y[4]) / y[6]
+
+    out[0] = 1.0
+    out[1] = dp_dt
+    out[2] = dtemp_dt * y[5]
+    out[3] = dtemp_dt
+    out[4] = 0.0
+    out[5] = 0.0
+    out[6] = 0.0
+
+
+@njit(cache=True, nogil=True)
+def _step_size(t, t_target, h):
+    """Step to take from t, shortened to land exactly on t_target. See
+    DenseOutput.last_step."""
+
+    if t_target - t <= h*(1.0 + 1E-6):
+        return t_target - t, True
+
+    return h, False
+
+
+@njit(cache=True, nogil=True)
+def forward_euler(y0, t_target, h_max, t_samples, samples,
+                  beta_over_gen, lambda_groups, beta, n_gen_time):
+    """Compiled ForwardEulerMethod.solve_dense. Fills samples in place and
+    returns the state at t_target, the number of steps and the number of
+    gradient evaluations."""
+
+    n = y0.shape[0]
+    y = y0.copy()
+    y_new = np.empty(n)
+    grad = np.empty(n)
+    i_sample = 0
+    steps = 0
+
+    while y[0] < t_target:
+        steps += 1
+        h, last_step = _step_size(y[0], t_target, h_max)
+
+        _ddt(y, grad, beta_over_gen, lambda_groups, beta, n_gen_time)
+        for j in range(n):
+            y_new[j] = y[j] + h*grad[j]
+
+        if last_step:
+            y_new[0] = t_target
+
+        while (i_sample < t_samples.shape[0] and
+               t_samples[i_sample] <= y_new[0]):
+            theta = (t_samples[i_sample] - y[0]) / h
+            for j in range(n):
+                samples[i_sample, j] = y[j] + theta*(y_new[j] - y[j])
+            samples[i_sample, 0] = t_samples[i_sample]
+            i_sample += 1
+
+        y[:] = y_new
+
+    for i in range(i_sample, t_samples.shape[0]):
+        samples[i, :] = y
+
+    return y, steps, steps
+
+
+@njit(cache=True, nogil=True)
+def forward_euler_pc(y0, t_target, h_max, t_samples, samples,
+                     beta_over_gen, lambda_groups, beta, n_gen_time):
+    """Compiled ForwardEulerPC.solve_dense. Fills samples in place and
+    returns the state at t_target, the number of steps and the number of
+    gradient evaluations."""
+
+    n = y0.shape[0]
+    y = y0.copy()
+    y_pred = np.empty(n)
+    y_new = np.empty(n)
+    grad1 = np.empty(n)
+    grad2 = np.empty(n)
+    i_sample = 0
+    steps = 0
+
+    while y[0] < t_target:
+        steps += 1
+        h, last_step = _step_size(y[0], t_target, h_max)
+
+        _ddt(y, grad1, beta_over_gen, lambda_groups, beta, n_gen_time)
+        for j in range(n):
+            y_pred[j] = y[j] + h*grad1[j]
+
+        _ddt(y_pred, grad2, beta_over_gen, lambda_groups, beta, n_gen_time)
+        for j in range(n):
+            y_new[j] = y[j] + 0.5*h*(grad1[j] + grad2[j])
+
+        if last_step:
+            y_new[0] = t_target
+
+        while (i_sample < t_samples.shape[0] and
+               t_samples[i_sample] <= y_new[0]):
+            theta = (t_samples[i_sample] - y[0]) / h
+            for j in range(n):
+                samples[i_sample, j] = (y[j] + theta*h*grad1[j] +
+                                        theta**2*(y_new[j] - y[j] -
+                                                  h*grad1[j]))
+            samples[i_sample, 0] = t_samples[i_sample]
+            i_sample += 1
+
+        y[:] = y_new
+
+    for i in range(i_sample, t_samples.shape[0]):
+        samples[i, :] = y
+
+    return y, steps, 2*steps
+
+
+@njit(cache=True, nogil=True)
+def rk4(y0, t_target, h_max, t_samples, samples,
+        beta_over_gen, lambda_groups, beta, n_gen_time):
+    """Compiled RK4.solve_dense. Fills samples in place and returns the
+    state at t_target, the number of steps and the number of gradient
+    evaluations."""
+
+    n = y0.shape[0]
+    y = y0.copy()
+    y_stage = np.empty(n)
+    y_new = np.empty(n)
+    k1 = np.empty(n)
+    k2 = np.empty(n)
+    k3 = np.empty(n)
+    k4 = np.empty(n)
+    k1_new = np.empty(n)
+    have_k1 = False
+    i_sample = 0
+    steps = 0
+    rhs_calls = 0
+
+    while y[0] < t_target:
+        steps += 1
+        h, last_step = _step_size(y[0], t_target, h_max)
+
+        if not have_k1:
+            _ddt(y, k1, beta_over_gen, lambda_groups, beta, n_gen_time)
+            rhs_calls += 1
+
+        for j in range(n):
+            y_stage[j] = y[j] + h*(k1[j]/2)
+        _ddt(y_stage, k2, beta_over_gen, lambda_groups, beta, n_gen_time)
+
+        for j in range(n):
+            y_stage[j] = y[j] + h*(k2[j]/2)
+        _ddt(y_stage, k3, beta_over_gen, lambda_groups, beta, n_gen_time)
+
+        for j in range(n):
+            y_stage[j] = y[j] + h*k3[j]
+        _ddt(y_stage, k4, beta_over_gen, lambda_groups, beta, n_gen_time)
+
+        for j in range(n):
+            y_new[j] = y[j] + (h/6) * (k1[j] + 2*k2[j] + 2*k3[j] + k4[j])
+
+        if last_step:
+            y_new[0] = t_target
+
+        have_k1 = False
+
+        if i_sample < t_samples.shape[0] and t_samples[i_sample] <= y_new[0]:
+            _ddt(y_new, k1_new, beta_over_gen, lambda_groups, beta,
+                 n_gen_time)
+            have_k1 = True
+            rhs_calls += 1
+
+            while (i_sample < t_samples.shape[0] and
+                   t_samples[i_sample] <= y_new[0]):
+                theta = (t_samples[i_sample] - y[0]) / h
+                theta2 = theta*theta
+                theta3 = theta2*theta
+                for j in range(n):
+                    samples[i_sample, j] = (
+                        (2*theta3 - 3*theta2 + 1)*y[j] +
+                        (theta3 - 2*theta2 + theta)*h*k1[j] +
+                        (3*theta2 - 2*theta3)*y_new[j] +
+                        (theta3 - theta2)*h*k1_new[j])
+                samples[i_sample, 0] = t_samples[i_sample]
+                i_sample += 1
+
+        y[:] = y_new
+        if have_k1:
+            k1[:] = k1_new
+
+    for i in range(i_sample, t_samples.shape[0]):
+        samples[i, :] = y
+
+    return y, steps, rhs_calls + 3*steps
+
+
+KERNELS = {'f_euler': forward_euler,
+           'f_euler_pc': forward_euler_pc,
+           'rk4': rk4}
+
+
+class CompiledMethod:
+    """Run one of the compiled kernels with the interface of the Python
+    numerical method classes.
+
+    Args:
+        method - lower case name of the method, one of METHODS.
+        model - PointKineticsModel providing the constants.
+        fallback - instance of the equivalent Python method class, used for
+            states the kernels do not handle and holding the step h and the
+            work counters."""
+
+    def __init__(self, method, model, fallback):
+        self.kernel = KERNELS[method]
+        self.model = model
+        self.fallback = fallback
+
+    @property
+    def h(self):
+        return self.fallback.h
+
+    @property
+    def stats(self):
+        return self.fallback.stats
+
+    @h.setter
+    def h(self, h):
+        self.fallback.h = h
+
+    def _run(self, state_vect, t_target, t_samples):
+        samples = np.empty((len(t_samples), len(state_vect)))
+
+        current_vect, steps, rhs_calls = self.kernel(
+            np.array(state_vect, dtype=float),
+            float(t_target), float(self.fallback.h),
+            np.asarray(t_samples, dtype=float), samples,
+            self.model.beta_over_gen, self.model.lambda_groups,
+            float(self.model.beta), float(self.model.n_gen_time))
+
+        self.fallback.stats.add(steps, rhs_calls)
+
+        return current_vect, samples
+
+    def solve(self, state_vect, t_target):
+        """Progress a single state to t_target. See the Python classes."""
+
+        if ((isinstance(state_vect, np.ndarray) and state_vect.ndim > 1) or
+                self.model.has_schedules()):
+            return self.fallback.solve(state_vect, t_target)
+
+        current_vect = self._run(state_vect, t_target, [])[0]
+
+        if isinstance(state_vect, np.ndarray):
+            return current_vect
+
+        return current_vect.tolist()
+
+    def solve_dense(self, state_vect, t_target, t_samples):
+        """Progress a single state to t_target, sampling it at t_samples.
+        See the Python classes."""
+
+        if self.model.has_schedules():
+            return self.fallback.solve_dense(state_vect, t_target, t_samples)
+
+        current_vect, samples = self._run(state_vect, t_target, t_samples)
+
+        return current_vect.tolist(), samples
@@ -0,0 +1,45 @@
+"""Interpolants for dense output between the steps of a numerical method."""
+import numpy as np
+
+
+def last_step(t, t_target, h):
+    """Return True if a step of h from t reaches t_target.
+
+    A step falling short of t_target by a tiny fraction of h is treated as
+    reaching it, so round-off in the accumulated time never leaves a sliver
+    of a step to take."""
+
+    return t_target - t <= h*(1.0 + 1E-6)
+
+
+def linear(y0, y1, theta):
+    """Linear interpolation between y0 and y1 at fraction theta of the
+    step."""
+
+    y0 = np.asarray(y0, dtype=float)
+
+    return y0 + theta*(np.asarray(y1, dtype=float) - y0)
+
+
+def quadratic(y0, f0, y1, h, theta):
+    """Quadratic interpolant matching y0 and its gradient f0 at the start of
+    a step of length h and y1 at its end, at fraction theta of the step."""
+
+    y0 = np.asarray(y0, dtype=float)
+    hf0 = h*np.asarray(f0, dtype=float)
+
+    return y0 + theta*hf0 + theta**2*(np.asarray(y1, dtype=float) - y0 - hf0)
+
+
+def hermite(y0, f0, y1, f1, h, theta):
+    """Cubic Hermite interpolant matching the values y0, y1 and gradients
+    f0, f1 at both ends of a step of length h, at fraction theta of the
+    step."""
+
+    theta2 = theta*theta
+    theta3 = theta2*theta
+
+    return ((2*theta3 - 3*theta2 + 1)*np.asarray(y0, dtype=float) +
+            (theta3 - 2*theta2 + theta)*h*np.asarray(f0, dtype=float) +
+            (3*theta2 - 2*theta3)*np.asarray(y1, dtype=float) +
+            (theta3 - theta2)*h*np.asarray(f1, dtype=float))
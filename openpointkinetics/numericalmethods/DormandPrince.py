@@ -0,0 +1,222 @@
+"""Class containing the adaptive Dormand-Prince 5(4) Runge-Kutta ODE"""
+import numpy as np
+
+from openpointkinetics.numericalmethods.MethodStats import MethodStats
+
+
+class DormandPrince45:
+    """Perform the embedded Dormand-Prince 5(4) method with step-size control
+    to progress a solution.
+
+    Each step takes a fifth order solution and estimates its error from the
+    embedded fourth order solution. Steps whose error exceeds the tolerance
+    are rejected and retried with a smaller step; accepted steps grow the
+    step for the next attempt. The last gradient of a step is the first
+    gradient of the next (first same as last), so an accepted step costs six
+    gradient evaluations."""
+
+    C = np.array([0.0, 1/5, 3/10, 4/5, 8/9, 1.0, 1.0])
+
+    A = np.array([
+        [0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+        [1/5, 0.0, 0.0, 0.0, 0.0, 0.0],
+        [3/40, 9/40, 0.0, 0.0, 0.0, 0.0],
+        [44/45, -56/15, 32/9, 0.0, 0.0, 0.0],
+        [19372/6561, -25360/2187, 64448/6561, -212/729, 0.0, 0.0],
+        [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656, 0.0],
+        [35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84]])
+
+    B = np.array([35/384, 0.0, 500/1113, 125/192, -2187/6784, 11/84, 0.0])
+
+    D = np.array([-12715105075/11282082432, 0.0, 87487479700/32700410799,
+                  -10690763975/1880347072, 701980252875/199316789632,
+                  -1453857185/822651844, 69997945/29380423])  # dense output
+
+    E = np.array([71/57600, 0.0, -71/16695, 71/1920, -17253/339200, 22/525,
+                  -1/40])  # fifth order minus embedded fourth order weights
+
+    SAFETY = 0.9
+    MIN_FACTOR = 0.2
+    MAX_FACTOR = 5.0
+
+    def __init__(self, ddt, h=1E-3, ddt_array=None, rtol=1E-6, atol=1E-9,
+                 error_index=None):
+        """Args:
+            ddt - function returning the gradient of a list state.
+            h - initial trial step. Adapted as the solution progresses.
+            ddt_array - optional function ddt_array(vector, out) writing the
+                gradient of a numpy state into out.
+            rtol - default relative tolerance.
+            atol - default absolute tolerance.
+            error_index - optional index into a numpy state selecting the
+                part whose error controls the step, e.g. 0 for the first
+                state of a stack whose other rows follow it. Defaults to
+                the whole state."""
+        self.ddt = ddt
+        self.h = h
+        self.ddt_array = ddt_array
+        self.rtol = rtol
+        self.atol = atol
+        self.error_index = error_index
+        self.stats = MethodStats()
+
+    def _ddt_list(self, vector, out):
+        """Adapt the list gradient function to the ddt_array signature."""
+        out[...] = self.ddt(vector.tolist())
+
+    def solve(self, state_vect, t_target, rtol=None, atol=None):
+        """Progress the solution using adaptive steps, finishing exactly on
+        t_target.
+
+        Args:
+            state_vect - current state of the system as a list or numpy
+                array.
+            t_target - final time position.
+            rtol - relative tolerance for this call. Defaults to self.rtol.
+            atol - absolute tolerance for this call. Defaults to self.atol.
+
+        Returns:
+            current_vect - state of the system at t_target, of the same type
+                as state_vect.
+
+        Excepts:
+            None"""
+
+        return self.solve_dense(state_vect, t_target, [], rtol, atol)[0]
+
+    def solve_dense(self, state_vect, t_target, t_samples, rtol=None,
+                    atol=None):
+        """Progress the solution to t_target in one call, sampling it at the
+        requested times with the method's fourth order continuous extension.
+        Sample times never shorten a step.
+
+        Args:
+            state_vect - current state of the system as a list or numpy
+                array.
+            t_target - final time position.
+            t_samples - ascending times, between the current time and
+                t_target, at which to sample the solution.
+            rtol - relative tolerance for this call. Defaults to self.rtol.
+            atol - absolute tolerance for this call. Defaults to self.atol.
+
+        Returns:
+            current_vect - state of the system at t_target, of the same type
+                as state_vect.
+            samples - array with the state at each of t_samples along its
+                first axis.
+
+        Excepts:
+            None"""
+
+        if rtol is None:
+            rtol = self.rtol
+        if atol is None:
+            atol = self.atol
+
+        ddt = self.ddt_array if self.ddt_array is not None else self._ddt_list
+
+        index = (Ellipsis,)
+        if self.error_index is not None:
+            index = (self.error_index,)
+
+        current_vect = np.array(state_vect, dtype=float)
+        new_vect = np.empty_like(current_vect)
+        stage_vect = np.empty_like(current_vect)
+        k = np.empty((7,) + current_vect.shape)
+        samples = np.empty((len(t_samples),) + current_vect.shape)
+        i_sample = 0
+        steps = 0
+        rejected = 0
+        rhs_calls = 0
+
+        t = current_vect.flat[0]
+
+        if t < t_target:
+            ddt(current_vect, k[0])
+            rhs_calls = 1
+
+        while t < t_target:
+
+            h = min(self.h, t_target - t)
+            last_step = h >= t_target - t
+
+            for i in range(1, 7):
+                stage_vect[...] = np.tensordot(self.A[i, :i], k[:i], axes=1)
+                stage_vect *= h
+                stage_vect += current_vect
+                ddt(stage_vect, k[i])
+
+            """The seventh stage is evaluated at the fifth order solution, so
+            stage_vect now holds the proposed new state."""
+            np.copyto(new_vect, stage_vect)
+
+            error = h * np.tensordot(self.E, k[(slice(None),) + index],
+                                     axes=1)
+            scale = atol + rtol * np.maximum(np.abs(current_vect[index]),
+                                             np.abs(new_vect[index]))
+            err_norm = np.sqrt(np.mean((error / scale)**2))
+
+            if err_norm <= 1.0:
+                steps += 1
+
+                if last_step:
+                    t = t_target
+                    new_vect[..., 0] = t_target  # remove round-off in time
+                else:
+                    t = new_vect.flat[0]
+
+                if i_sample < len(t_samples) and t_samples[i_sample] <= t:
+                    i_sample = self._interpolate(current_vect, new_vect, k, h,
+                                                 t_samples, i_sample, t,
+                                                 samples)
+
+                current_vect, new_vect = new_vect, current_vect
+                k[0] = k[6]
+
+                if err_norm == 0.0:
+                    factor = self.MAX_FACTOR
+                else:
+                    factor = min(self.MAX_FACTOR,
+                                 self.SAFETY * err_norm**-0.2)
+
+                """A step shortened to land on t_target says nothing about
+                the step the solution can bear, so only grow from it."""
+                if not last_step or h == self.h:
+                    self.h = h * factor
+                else:
+                    self.h = max(self.h, h * factor)
+            else:
+                rejected += 1
+                self.h = h * max(self.MIN_FACTOR,
+                                 self.SAFETY * err_norm**-0.2)
+
+        samples[i_sample:] = current_vect
+
+        self.stats.add(steps, rhs_calls + 6*(steps + rejected), rejected)
+
+        if isinstance(state_vect, np.ndarray):
+            return current_vect, samples
+
+        return current_vect.tolist(), samples
+
+    def _interpolate(self, current_vect, new_vect, k, h, t_samples, i_sample,
+                     t_new, samples):
+        """Fill in the samples that fall in the step from current_vect to
+        new_vect, returning the index of the next sample."""
+
+        t = current_vect.flat[0]
+
+        difference = new_vect - current_vect
+        cont3 = h*k[0] - difference
+        cont4 = difference - h*k[6] - cont3
+        cont5 = h*np.tensordot(self.D, k, axes=1)
+
+        while i_sample < len(t_samples) and t_samples[i_sample] <= t_new:
+            theta = (t_samples[i_sample] - t) / h
+            samples[i_sample] = current_vect + theta*(
+                difference + (1-theta)*(cont3 + theta*(cont4 +
+                                                       (1-theta)*cont5)))
+            samples[i_sample][..., 0] = t_samples[i_sample]
+            i_sample += 1
+
+        return i_sample
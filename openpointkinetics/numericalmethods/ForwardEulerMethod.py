@@ -1,18 +1,31 @@
 """Class containing forward Euler ode"""
+import numpy as np
+
+from openpointkinetics.numericalmethods import DenseOutput
+from openpointkinetics.numericalmethods.MethodStats import MethodStats
 
 
 class ForwardEulerMethod:
     """Perform the forward Euler method to progress a solution."""
 
-    def __init__(self, ddt, h=1E-3):
+    def __init__(self, ddt, h=1E-3, ddt_array=None):
+        """Args:
+            ddt - function returning the gradient of a list state.
+            h - step
+            ddt_array - optional function ddt_array(vector, out) writing the
+                gradient of a numpy state into out. Used for numpy states."""
         self.ddt = ddt
         self.h = h
+        self.ddt_array = ddt_array
+        self.stats = MethodStats()
 
     def solve(self, state_vect, t_target):
-        """Progress the solution using the foward Euler method.
+        """Progress the solution using the foward Euler method. The last step
+        is shortened to finish exactly on t_target.
 
         Args:
-            state_vect - current state of the system as a list.
+            state_vect - current state of the system as a list or numpy
+                array.
             t_target - final time position.
 
         Returns:
@@ -21,13 +34,107 @@ class ForwardEulerMethod:
         Excepts:
             None"""
 
-        current_vect = list(state_vect)
+        if isinstance(state_vect, np.ndarray):
+            if self.ddt_array is not None and state_vect.ndim > 1:
+                return self.solve_array(state_vect, t_target)
+
+            """A single state steps faster as a list than through numpy
+            calls on arrays this small."""
+            return np.array(self.solve_dense(state_vect, t_target, [])[0])
+
+        return self.solve_dense(state_vect, t_target, [])[0]
+
+    def solve_dense(self, state_vect, t_target, t_samples):
+        """Progress the solution to t_target in one call, sampling it at the
+        requested times by linear interpolation between steps.
+
+        Args:
+            state_vect - current state of the system as a list or numpy
+                array.
+            t_target - final time position.
+            t_samples - ascending times, between the current time and
+                t_target, at which to sample the solution.
+
+        Returns:
+            current_vect - state of the system at t_target, as a list.
+            samples - list with the state at each of t_samples.
+
+        Excepts:
+            None"""
+
+        if isinstance(state_vect, np.ndarray):
+            current_vect = state_vect.tolist()
+        else:
+            current_vect = list(state_vect)
+        samples = []
+        i_sample = 0
+        steps = 0
+
+        while current_vect[0] < t_target:
+            steps += 1
+            h = self.h
+            last_step = DenseOutput.last_step(current_vect[0], t_target, h)
+            if last_step:
+                h = t_target - current_vect[0]
 
-        while True:
             grad_vect = self.ddt(current_vect)
 
-            current_vect = [y+self.h*grad
-                            for y, grad in zip(current_vect, grad_vect)]
+            new_vect = [y+h*grad
+                        for y, grad in zip(current_vect, grad_vect)]
+
+            if last_step:
+                new_vect[0] = t_target
+
+            while (i_sample < len(t_samples) and
+                   t_samples[i_sample] <= new_vect[0]):
+                theta = (t_samples[i_sample] - current_vect[0]) / h
+                samples.append(DenseOutput.linear(current_vect, new_vect,
+                                                  theta))
+                samples[-1][0] = t_samples[i_sample]
+                i_sample += 1
+
+            current_vect = new_vect
+
+        samples.extend([current_vect] * (len(t_samples) - i_sample))
+
+        self.stats.add(steps, steps)
+
+        return current_vect, samples
+
+    def solve_array(self, state_vect, t_target):
+        """Progress a numpy state in place using preallocated buffers.
+
+        Args:
+            state_vect - numpy array of one state, or a stack of states
+                sharing the same time, with the state on the last axis.
+            t_target - final time position.
+
+        Returns:
+            current_vect - new numpy array holding the progressed state.
+
+        Excepts:
+            None"""
+
+        current_vect = np.array(state_vect, dtype=float)
+        grad_vect = np.empty_like(current_vect)
+        steps = 0
+
+        while current_vect.flat[0] < t_target:
+            steps += 1
+            h = self.h
+            last_step = DenseOutput.last_step(current_vect.flat[0], t_target,
+                                              h)
+            if last_step:
+                h = t_target - current_vect.flat[0]
+
+            self.ddt_array(current_vect, grad_vect)
+
+            grad_vect *= h
+            current_vect += grad_vect
+
+            if last_step:
+                current_vect[..., 0] = t_target
+
+        self.stats.add(steps, steps)
 
-            if current_vect[0] > t_target:
-                return current_vect
+        return current_vect
@@ -0,0 +1,44 @@
+"""Work counters kept by the numerical methods."""
+
+
+class MethodStats:
+    """Counters of the work done by a numerical method since it was built or
+    last reset.
+
+    The methods count in local variables inside their stepping loops and add
+    the totals here once per call, so keeping the counters costs nothing per
+    step. A gradient evaluation of a stack of ensemble states counts as one
+    call.
+
+    Attributes:
+        rhs_calls - gradient evaluations.
+        jacobian_calls - Jacobian evaluations.
+        steps - accepted steps.
+        rejected - steps rejected by error control."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Set every counter to zero."""
+
+        self.rhs_calls = 0
+        self.jacobian_calls = 0
+        self.steps = 0
+        self.rejected = 0
+
+    def add(self, steps, rhs_calls, rejected=0, jacobian_calls=0):
+        """Add the work of one call of a method."""
+
+        self.steps += steps
+        self.rhs_calls += rhs_calls
+        self.rejected += rejected
+        self.jacobian_calls += jacobian_calls
+
+    def as_dict(self):
+        """Return the counters as a dictionary."""
+
+        return {'rhs_calls': self.rhs_calls,
+                'jacobian_calls': self.jacobian_calls,
+                'steps': self.steps,
+                'rejected': self.rejected}
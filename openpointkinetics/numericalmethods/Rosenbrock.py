@@ -0,0 +1,189 @@
+"""Class containing the second-order Rosenbrock (ROS2) stiff ODE method"""
+import numpy as np
+
+from openpointkinetics.numericalmethods import DenseOutput
+from openpointkinetics.numericalmethods import SparseLinear
+from openpointkinetics.numericalmethods.MethodStats import MethodStats
+
+
+class Rosenbrock2:
+    """Perform the L-stable, second-order Rosenbrock method ROS2 to progress a
+    stiff solution.
+
+    Each step solves two linear systems with the matrix W = I - gamma*h*J,
+    where J is the Jacobian of the gradient function. Because the method is
+    linearly implicit it stays stable for steps far longer than the prompt
+    neutron time constant, e.g. 0.1-1 s, where the explicit methods blow up.
+
+        W k1 = f(y)
+        W k2 = f(y + h k1) - 2 k1
+        y_new = y + 3/2 h k1 + 1/2 h k2"""
+
+    GAMMA = 1.0 + 1.0/np.sqrt(2.0)
+
+    def __init__(self, ddt, h=1E-3, ddt_array=None, jacobian=None):
+        """Args:
+            ddt - function returning the gradient of a list state.
+            h - step
+            ddt_array - optional function ddt_array(vector, out) writing the
+                gradient of a numpy state into out.
+            jacobian - optional function returning the Jacobian of the
+                gradient for a numpy state, either as an array of shape
+                state.shape + (n,) holding one n x n Jacobian per stacked
+                state, or as a SparseLinear.CooMatrix over the flattened
+                state for coupled states. If not provided the Jacobian is
+                estimated by finite differences."""
+        self.ddt = ddt
+        self.h = h
+        self.ddt_array = ddt_array
+        self.jacobian = jacobian
+        self.stats = MethodStats()
+
+    def _ddt_list(self, vector, out):
+        """Adapt the list gradient function to the ddt_array signature."""
+        out[...] = self.ddt(vector.tolist())
+
+    def _finite_difference_jacobian(self, vector):
+        """Forward difference estimate of the Jacobian of a single state."""
+
+        ddt = self.ddt_array if self.ddt_array is not None else self._ddt_list
+
+        n = vector.shape[-1]
+        jac = np.empty((n, n))
+        grad = np.empty(n)
+        grad_shifted = np.empty(n)
+        shifted = vector.copy()
+
+        ddt(vector, grad)
+
+        for j in range(n):
+            delta = 1E-7 * max(abs(vector[j]), 1.0)
+            shifted[j] = vector[j] + delta
+            ddt(shifted, grad_shifted)
+            jac[:, j] = (grad_shifted - grad) / delta
+            shifted[j] = vector[j]
+
+        self.stats.rhs_calls += n + 1
+
+        return jac
+
+    def _linear_solver(self, jacobian, vector, h):
+        """Return a function solving W k = b for a gradient b shaped like
+        vector, with W = I - gamma*h*J evaluated at vector."""
+
+        jac = jacobian(vector)
+
+        if isinstance(jac, SparseLinear.CooMatrix):
+            solve = SparseLinear.shifted_solver(jac, self.GAMMA * h)
+
+            return lambda b: solve(b.ravel()).reshape(vector.shape)
+
+        w = np.eye(vector.shape[-1]) - (self.GAMMA * h) * jac
+
+        return lambda b: np.linalg.solve(w, b[..., None])[..., 0]
+
+    def solve(self, state_vect, t_target):
+        """Progress the solution using ROS2, finishing exactly on t_target.
+
+        Args:
+            state_vect - current state of the system as a list or numpy
+                array.
+            t_target - final time position.
+
+        Returns:
+            current_vect - state of the system at t_target, of the same type
+                as state_vect.
+
+        Excepts:
+            None"""
+
+        return self.solve_dense(state_vect, t_target, [])[0]
+
+    def solve_dense(self, state_vect, t_target, t_samples):
+        """Progress the solution to t_target in one call, sampling it at the
+        requested times with a cubic Hermite interpolant between steps.
+
+        Args:
+            state_vect - current state of the system as a list or numpy
+                array.
+            t_target - final time position.
+            t_samples - ascending times, between the current time and
+                t_target, at which to sample the solution.
+
+        Returns:
+            current_vect - state of the system at t_target, of the same type
+                as state_vect.
+            samples - array with the state at each of t_samples along its
+                first axis.
+
+        Excepts:
+            None"""
+
+        ddt = self.ddt_array if self.ddt_array is not None else self._ddt_list
+        jacobian = self.jacobian
+        if jacobian is None:
+            jacobian = self._finite_difference_jacobian
+
+        current_vect = np.array(state_vect, dtype=float)
+        stage_vect = np.empty_like(current_vect)
+        grad = np.empty_like(current_vect)
+        start_grad = np.empty_like(current_vect)
+        end_grad = np.empty_like(current_vect)
+
+        samples = np.empty((len(t_samples),) + current_vect.shape)
+        i_sample = 0
+        steps = 0
+        rhs_calls = 0
+
+        t = current_vect.flat[0]
+
+        while t < t_target:
+            steps += 1
+
+            h = self.h
+            last_step = DenseOutput.last_step(t, t_target, h)
+            if last_step:
+                h = t_target - t
+
+            solve_w = self._linear_solver(jacobian, current_vect, h)
+
+            ddt(current_vect, start_grad)
+            k1 = solve_w(start_grad)
+
+            np.multiply(k1, h, out=stage_vect)
+            stage_vect += current_vect
+            ddt(stage_vect, grad)
+            grad -= 2.0 * k1
+            k2 = solve_w(grad)
+
+            new_vect = current_vect + h * (1.5 * k1 + 0.5 * k2)
+
+            if last_step:
+                new_vect[..., 0] = t_target  # remove round-off in time
+                t_new = t_target
+            else:
+                t_new = new_vect.flat[0]
+
+            if i_sample < len(t_samples) and t_samples[i_sample] <= t_new:
+                ddt(new_vect, end_grad)
+                rhs_calls += 1
+
+                while (i_sample < len(t_samples) and
+                       t_samples[i_sample] <= t_new):
+                    theta = (t_samples[i_sample] - t) / h
+                    samples[i_sample] = DenseOutput.hermite(
+                        current_vect, start_grad, new_vect, end_grad, h, theta)
+                    samples[i_sample][..., 0] = t_samples[i_sample]
+                    i_sample += 1
+
+            current_vect = new_vect
+            t = t_new
+
+        samples[i_sample:] = current_vect
+
+        self.stats.add(steps, rhs_calls + 2*steps, jacobian_calls=steps)
+
+        if isinstance(state_vect, np.ndarray):
+            return current_vect, samples
+
+        return current_vect.tolist(), samples
@@ -1,21 +1,31 @@
 """Class containing the fourth-order Runge-Kutta method (RK4) ODE"""
+import numpy as np
+
+from openpointkinetics.numericalmethods import DenseOutput
+from openpointkinetics.numericalmethods.MethodStats import MethodStats
 
 
 class RK4:
     """Perform RK4 to progress a solution."""
 
-    def __init__(self, ddt, h=1E-3):
+    def __init__(self, ddt, h=1E-3, ddt_array=None):
         """Args:
             ddt - function
-            h - step """
+            h - step
+            ddt_array - optional function ddt_array(vector, out) writing the
+                gradient of a numpy state into out. Used for numpy states."""
         self.ddt = ddt
         self.h = h
+        self.ddt_array = ddt_array
+        self.stats = MethodStats()
 
     def solve(self, state_vect, t_target):
-        """Progress the solution using RK4.
+        """Progress the solution using RK4. The last step is shortened to
+        finish exactly on t_target.
 
         Args:
-            state_vect - current state of the system as a list.
+            state_vect - current state of the system as a list or numpy
+                array.
             t_target - final time position.
 
         Returns:
@@ -24,20 +34,148 @@ class RK4:
         Excepts:
             None"""
 
-        current_vect = list(state_vect)
+        if isinstance(state_vect, np.ndarray):
+            if self.ddt_array is not None and state_vect.ndim > 1:
+                return self.solve_array(state_vect, t_target)
+
+            """A single state steps faster as a list than through numpy
+            calls on arrays this small."""
+            return np.array(self.solve_dense(state_vect, t_target, [])[0])
+
+        return self.solve_dense(state_vect, t_target, [])[0]
+
+    def solve_dense(self, state_vect, t_target, t_samples):
+        """Progress the solution to t_target in one call, sampling it at the
+        requested times with a cubic Hermite interpolant between steps. The
+        gradient at the end of a step that holds a sample is reused as the
+        first stage of the next step, so sampling costs no extra gradient
+        evaluations.
+
+        Args:
+            state_vect - current state of the system as a list or numpy
+                array.
+            t_target - final time position.
+            t_samples - ascending times, between the current time and
+                t_target, at which to sample the solution.
+
+        Returns:
+            current_vect - state of the system at t_target, as a list.
+            samples - list with the state at each of t_samples.
+
+        Excepts:
+            None"""
+
+        if isinstance(state_vect, np.ndarray):
+            current_vect = state_vect.tolist()
+        else:
+            current_vect = list(state_vect)
+        samples = []
+        i_sample = 0
+        k1 = None
+        steps = 0
+        rhs_calls = 0
 
         while current_vect[0] < t_target:
+            steps += 1
+            h = self.h
+            last_step = DenseOutput.last_step(current_vect[0], t_target, h)
+            if last_step:
+                h = t_target - current_vect[0]
 
-            k1 = self.ddt(current_vect)
-            k2 = self.ddt([current_vect[i]+self.h*(k1[i]/2)
+            if k1 is None:
+                k1 = self.ddt(current_vect)
+                rhs_calls += 1
+            k2 = self.ddt([current_vect[i]+h*(k1[i]/2)
                            for i in range(len(current_vect))])
-            k3 = self.ddt([current_vect[i]+self.h*(k2[i]/2)
+            k3 = self.ddt([current_vect[i]+h*(k2[i]/2)
                            for i in range(len(current_vect))])
-            k4 = self.ddt([current_vect[i]+self.h*k3[i]
+            k4 = self.ddt([current_vect[i]+h*k3[i]
                            for i in range(len(current_vect))])
 
-            current_vect = [current_vect[i]
-                            + ((self.h/6) * (k1[i]+2*k2[i]+2*k3[i]+k4[i]))
-                            for i in range(len(current_vect))]
+            new_vect = [current_vect[i]
+                        + ((h/6) * (k1[i]+2*k2[i]+2*k3[i]+k4[i]))
+                        for i in range(len(current_vect))]
+
+            if last_step:
+                new_vect[0] = t_target
+
+            k1_new = None
+
+            while (i_sample < len(t_samples) and
+                   t_samples[i_sample] <= new_vect[0]):
+                if k1_new is None:
+                    k1_new = self.ddt(new_vect)
+                    rhs_calls += 1
+                theta = (t_samples[i_sample] - current_vect[0]) / h
+                samples.append(DenseOutput.hermite(current_vect, k1,
+                                                   new_vect, k1_new, h,
+                                                   theta))
+                samples[-1][0] = t_samples[i_sample]
+                i_sample += 1
+
+            current_vect = new_vect
+            k1 = k1_new
+
+        samples.extend([current_vect] * (len(t_samples) - i_sample))
+
+        self.stats.add(steps, rhs_calls + 3*steps)
+
+        return current_vect, samples
+
+    def solve_array(self, state_vect, t_target):
+        """Progress a numpy state in place using preallocated buffers.
+
+        Args:
+            state_vect - numpy array of one state, or a stack of states
+                sharing the same time, with the state on the last axis.
+            t_target - final time position.
+
+        Returns:
+            current_vect - new numpy array holding the progressed state.
+
+        Excepts:
+            None"""
+
+        current_vect = np.array(state_vect, dtype=float)
+        stage_vect = np.empty_like(current_vect)
+        k1 = np.empty_like(current_vect)
+        k2 = np.empty_like(current_vect)
+        k3 = np.empty_like(current_vect)
+        k4 = np.empty_like(current_vect)
+        steps = 0
+
+        while current_vect.flat[0] < t_target:
+            steps += 1
+            h = self.h
+            last_step = DenseOutput.last_step(current_vect.flat[0], t_target,
+                                              h)
+            if last_step:
+                h = t_target - current_vect.flat[0]
+
+            self.ddt_array(current_vect, k1)
+
+            np.multiply(k1, h/2, out=stage_vect)
+            stage_vect += current_vect
+            self.ddt_array(stage_vect, k2)
+
+            np.multiply(k2, h/2, out=stage_vect)
+            stage_vect += current_vect
+            self.ddt_array(stage_vect, k3)
+
+            np.multiply(k3, h, out=stage_vect)
+            stage_vect += current_vect
+            self.ddt_array(stage_vect, k4)
+
+            k2 += k3
+            k2 *= 2.0
+            k1 += k2
+            k1 += k4
+            k1 *= h/6
+            current_vect += k1
+
+            if last_step:
+                current_vect[..., 0] = t_target
+
+        self.stats.add(steps, 4*steps)
 
         return current_vect
@@ -0,0 +1,78 @@
+"""Sparse matrices for coupled models and the implicit methods.
+
+CooMatrix holds a sparse matrix as coordinate lists, which numpy alone can
+build and multiply. When SciPy is installed, the linear systems of the
+implicit methods are factorised with its sparse LU; without it they fall
+back to a dense inverse, which is fine for a few hundred unknowns but grows
+as their cube.
+"""
+import numpy as np
+
+try:
+    import scipy.sparse
+    import scipy.sparse.linalg
+    AVAILABLE = True
+except ImportError:
+    AVAILABLE = False
+
+
+class CooMatrix:
+    """Sparse matrix in coordinate format. Repeated entries are summed.
+
+    Args:
+        rows - array of the row index of each entry.
+        cols - array of the column index of each entry.
+        values - array of the value of each entry.
+        shape - (rows, columns) of the matrix."""
+
+    def __init__(self, rows, cols, values, shape):
+        self.rows = np.asarray(rows, dtype=np.intp)
+        self.cols = np.asarray(cols, dtype=np.intp)
+        self.values = np.asarray(values, dtype=float)
+        self.shape = tuple(shape)
+
+    def matvec(self, x):
+        """Return the product of the matrix and the vector x."""
+
+        return np.bincount(self.rows, weights=self.values * x[self.cols],
+                           minlength=self.shape[0])
+
+    def to_dense(self):
+        """Return the matrix as a dense numpy array."""
+
+        dense = np.zeros(self.shape)
+        np.add.at(dense, (self.rows, self.cols), self.values)
+
+        return dense
+
+    def to_scipy(self):
+        """Return the matrix as a scipy.sparse CSC matrix."""
+
+        return scipy.sparse.csc_matrix((self.values, (self.rows, self.cols)),
+                                       shape=self.shape)
+
+
+def shifted_solver(matrix, scale):
+    """Factorise W = I - scale*matrix for repeated solves.
+
+    Args:
+        matrix - square CooMatrix.
+        scale - scalar multiplying the matrix.
+
+    Returns:
+        solve - function returning x with W x = b for a vector b.
+
+    Excepts:
+        None"""
+
+    n = matrix.shape[0]
+
+    if AVAILABLE:
+        w = (scipy.sparse.identity(n, format='csc') -
+             scale * matrix.to_scipy())
+
+        return scipy.sparse.linalg.splu(w.tocsc()).solve
+
+    inverse = np.linalg.inv(np.eye(n) - scale * matrix.to_dense())
+
+    return inverse.dot
@@ -0,0 +1,5 @@
+"""Run the tests against the package in this checkout."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
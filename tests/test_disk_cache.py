@@ -0,0 +1,55 @@
+"""Tests of the settle and result caches."""
+from openpointkinetics.DiskCache import ResultCache, SettleCache
+from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+
+
+def run(tmp_path=None):
+    """Settle the example core, step the reactivity and solve twice with
+    DOPRI45, through caches in tmp_path if given."""
+
+    solver = PointKineticsSolver(None, 'DOPRI45')
+
+    if tmp_path is not None:
+        solver.set_settle_cache(SettleCache(str(tmp_path / 'settle')))
+        solver.set_result_cache(ResultCache(str(tmp_path / 'results')))
+
+    solver.set_example_thermal_params()
+    solver.settle(t_max=20)
+    solver.add_rho(1E-4)
+    solver.solve(5.0, 1.0)
+    solver.solve(5.0, 1.0)
+
+    return solver
+
+
+def test_cached_runs_match_an_uncached_run(tmp_path):
+
+    reference = run()
+
+    for hits in [0, 2, 2]:
+        solver = run(tmp_path)
+
+        assert solver.result_cache.hits == hits
+        assert solver.result_cache.misses == 2 - hits
+        assert solver.state.power == reference.state.power
+        assert solver.method.h == reference.method.h
+        assert (solver.logger1.view() == reference.logger1.view()).all()
+
+
+def test_settle_cache_restores_the_step(tmp_path):
+
+    cache = SettleCache(str(tmp_path))
+
+    first = PointKineticsSolver(None, 'DOPRI45')
+    first.set_settle_cache(cache)
+    first.set_example_thermal_params()
+    first.settle(t_max=20)
+
+    second = PointKineticsSolver(None, 'DOPRI45')
+    second.set_settle_cache(cache)
+    second.set_example_thermal_params()
+    second.settle(t_max=20)
+
+    assert second.intervals == 0
+    assert second.method.h == first.method.h
+    assert (second.state.vectorise() == first.state.vectorise()).all()
@@ -0,0 +1,39 @@
+"""Tests of PointKineticsEnsemble."""
+import numpy as np
+import pytest
+
+from openpointkinetics.PointKineticsEnsemble import PointKineticsEnsemble
+from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+
+
+def test_solve_without_log_freq_ends_at_t_stop():
+
+    ensemble = PointKineticsEnsemble(3, 'RK4', 1E-2)
+    ensemble.set_power(1E6)
+    ensemble.solve(5.0, 0.0)
+
+    times, samples = ensemble.results()
+
+    assert ensemble.get_t() == 5.0
+    assert samples.shape == (1, 3, 13)
+
+
+def test_members_match_the_solver():
+
+    ensemble = PointKineticsEnsemble(2, 'RK4', 1E-3)
+    ensemble.set_power(1E8)
+    ensemble.set_precursors(np.zeros(6))
+    ensemble.set_rho([1E-3, -1E-3])
+    ensemble.solve(1.0, 0.1)
+
+    times, samples = ensemble.results()
+
+    for member, rho in enumerate([1E-3, -1E-3]):
+        solver = PointKineticsSolver(None, 'RK4', h=1E-3, compiled=False)
+        solver.set_power(1E8)
+        solver.set_rho(rho)
+        solver.solve(1.0, 0.1)
+
+        assert ensemble.get_t() == pytest.approx(solver.state.get_t())
+        np.testing.assert_allclose(samples[:, member],
+                                   solver.logger1.view().T, rtol=1E-12)
@@ -0,0 +1,53 @@
+"""Tests of OnlineStatistics against numpy."""
+import numpy as np
+import pytest
+
+from openpointkinetics.OnlineStatistics import OnlineStatistics
+
+
+QUANTILES = [0.01, 0.1, 0.5, 0.9, 0.99]
+
+
+def samples(name, count):
+    rng = np.random.default_rng(0)
+
+    values = {'small': rng.lognormal(np.log(1E-5), 0.1, count),
+              'large': rng.lognormal(np.log(1E9), 0.1, count),
+              'negative': rng.normal(-3E-12, 5E-13, count)}[name]
+
+    return values.reshape(count, 1, 1)
+
+
+@pytest.mark.parametrize('name', ['small', 'large', 'negative'])
+@pytest.mark.parametrize('accuracy', [0.01, 0.001])
+@pytest.mark.parametrize('chunks', [1, 8])
+def test_quantiles_within_accuracy(name, accuracy, chunks):
+
+    values = samples(name, 5000)
+
+    statistics = OnlineStatistics((1, 1), accuracy)
+    for chunk in np.array_split(values, chunks):
+        part = OnlineStatistics((1, 1), accuracy)
+        part.update(chunk)
+        statistics.merge(part)
+
+    for q in QUANTILES:
+        exact = np.quantile(values, q, axis=0, method='lower')
+        assert np.all(np.abs(statistics.quantile(q) - exact) <=
+                      accuracy * np.abs(exact))
+
+
+def test_moments_match_numpy():
+
+    values = samples('large', 1000)
+
+    statistics = OnlineStatistics((1, 1), None)
+    for chunk in np.array_split(values, 7):
+        statistics.update(chunk)
+
+    assert statistics.count == 1000
+    np.testing.assert_allclose(statistics.mean, values.mean(axis=0))
+    np.testing.assert_allclose(statistics.variance,
+                               values.var(axis=0, ddof=1))
+    assert statistics.min == values.min()
+    assert statistics.max == values.max()
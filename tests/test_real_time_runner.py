@@ -0,0 +1,29 @@
+"""Tests of RealTimeRunner."""
+import asyncio
+
+import pytest
+
+from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+from openpointkinetics.RealTimeRunner import RealTimeRunner
+
+
+def test_snapshots_are_not_ahead_of_the_wall_clock():
+
+    solver = PointKineticsSolver(None, 'RK4', h=1E-3)
+    solver.set_power(1E6)
+    solver.equilibrate()
+    solver.advance(0.02)  # compile any kernels before timing
+    solver.state.zero_t()
+
+    runner = RealTimeRunner(solver, frame=0.02, speed=4.0)
+    snapshots = runner.subscribe(100)
+
+    asyncio.run(runner.run(1.0))
+
+    published = [snapshots.get_nowait() for i in range(snapshots.qsize())]
+    start = published[0]['wall']
+
+    assert len(published) == 51
+    assert published[-1]['t'] == pytest.approx(1.0)
+    for snapshot in published:
+        assert snapshot['wall'] - start >= snapshot['t'] / 4.0 - 1E-6
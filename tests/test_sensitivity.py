@@ -0,0 +1,48 @@
+"""Tests of the forward sensitivities and of fit."""
+import numpy as np
+import pytest
+
+from openpointkinetics import Sensitivity
+from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+
+
+T = np.linspace(0.0, 10.0, 21)
+
+
+def transient(rho):
+    solver = PointKineticsSolver(None, 'DOPRI45', rtol=1E-10, atol=1E-12)
+    solver.set_power(1E6)
+    solver.equilibrate()
+    solver.add_rho(rho)
+
+    return solver
+
+
+def measured_power():
+    engine = Sensitivity.SensitivitySolver(transient(1E-4), ['rho'], True)
+
+    return engine.solve(T)[0][:, 1]
+
+
+def test_sensitivity_matches_finite_difference():
+
+    samples, sensitivities = Sensitivity.SensitivitySolver(
+        transient(1E-4), ['rho'], True).solve(T)
+
+    shifted = Sensitivity.SensitivitySolver(
+        transient(1E-4 + 1E-8), ['rho'], True).solve(T)[0]
+
+    np.testing.assert_allclose(sensitivities[:, 0, 1],
+                               (shifted[:, 1] - samples[:, 1]) / 1E-8,
+                               rtol=1E-3, atol=1E-3)
+
+
+@pytest.mark.parametrize('sigma', [1E3, np.full(len(T), 1E3)])
+def test_fit_recovers_the_reactivity(sigma):
+
+    result = Sensitivity.fit(transient(0.5E-4), ['rho'], T, measured_power(),
+                             sigma=sigma, equilibrium=True)
+
+    assert result.converged
+    assert result.values['rho'] == pytest.approx(1E-4, rel=1E-8)
+
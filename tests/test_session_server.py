@@ -0,0 +1,103 @@
+"""Tests of SessionServer through SessionClient."""
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from openpointkinetics.SessionServer import SessionClient, SessionServer
+
+
+@pytest.fixture
+def address():
+    """Address of a server run on its own event loop thread."""
+
+    loop = asyncio.new_event_loop()
+    server = SessionServer(workers=2)
+    loop.run_until_complete(server.start())
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    yield server.address
+
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def create(client, method, rho, options):
+    session = client.create(method, thermal_params='example', **options)
+    client.configure(session, ('equilibrate', 0.0), ('add_rho', rho))
+
+    return session
+
+
+def solve_together(address, sessions, t_change, log_freq):
+    """Solve sessions from concurrent clients, so they share rounds."""
+
+    def solve(session):
+        with SessionClient(address) as client:
+            client.solve(session, t_change, log_freq)
+
+    threads = [threading.Thread(target=solve, args=(session,))
+               for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.mark.parametrize('method, options', [
+    ('DOPRI45', {}),
+    ('ROS2', {'h': 0.01, 'prompt_jump': True}),
+    ('RK4', {'h': 1E-3})])
+def test_batched_sessions_match_a_session_alone(address, method, options):
+
+    with SessionClient(address) as client:
+        alone = create(client, method, 1E-4, options)
+        client.solve(alone, 5.0, 1.0)
+
+        first = create(client, method, 1E-4, options)
+        second = create(client, method, 3E-4, options)
+        solve_together(address, [first, second], 5.0, 1.0)
+
+        np.testing.assert_allclose(client.snapshot(first),
+                                   client.snapshot(alone), rtol=1E-12)
+        np.testing.assert_allclose(client.query(first),
+                                   client.query(alone), rtol=1E-12)
+        assert (client.metrics(first)['steps'] ==
+                client.metrics(alone)['steps'])
+        assert client.metrics(second)['steps'] > 0
+
+
+def test_solve_without_log_freq_ends_at_t_stop(address):
+
+    with SessionClient(address) as client:
+        session = client.create('RK4')
+        client.configure(session, ('set_power', 1E6))
+
+        assert client.solve(session, 10.0, 0.0) == (10.0, 1)
+
+
+def test_settle_does_not_hold_up_other_sessions(address):
+
+    with SessionClient(address) as client:
+        settling = client.create('RK4', thermal_params='example',
+                                 compiled=False)
+        other = client.create('RK4')
+
+        thread = threading.Thread(
+            target=lambda: SessionClient(address).configure(
+                settling, ('settle', 30.0)))
+        thread.start()
+        time.sleep(0.1)
+
+        client.snapshot(other)
+        answered = thread.is_alive()
+        thread.join()
+
+        assert answered
+        assert client.snapshot(settling)[0] == 0.0
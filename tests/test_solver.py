@@ -0,0 +1,107 @@
+"""Tests of PointKineticsSolver: logging, dense output, compiled kernels and
+settle."""
+import importlib
+
+import numpy as np
+import pytest
+
+from openpointkinetics import InhourSolution
+from openpointkinetics.PointKineticsSolver import PointKineticsSolver
+from openpointkinetics.numericalmethods import CompiledKernels
+
+# The package binds the class over its module of the same name.
+SolverModule = importlib.import_module('openpointkinetics.PointKineticsSolver')
+
+
+def step_transient(method, **options):
+    """Solver critical at 1E8 W, given a 1E-3 reactivity step."""
+
+    solver = PointKineticsSolver(None, method, **options)
+    solver.set_power(1E8)
+    solver.equilibrate()
+    solver.add_rho(1E-3)
+
+    return solver
+
+
+def test_solve_without_log_freq_ends_at_t_stop():
+
+    solver = step_transient('RK4')
+    solver.solve(10.0, 0.0)
+
+    assert solver.state.get_t() == 10.0
+    assert solver.logger1.rows == 1
+
+
+def test_solve_finishes_one_interval_after_the_last_log():
+
+    solver = step_transient('RK4')
+    solver.solve(1.0, 0.1)
+
+    assert solver.logger1.rows == 11
+    assert solver.state.get_t() == pytest.approx(1.1)
+
+
+@pytest.mark.parametrize('method, options, tolerance', [
+    ('RK4', {'h': 1E-3}, 1E-10),
+    ('F_Euler_PC', {'h': 1E-4}, 1E-7),
+    ('DOPRI45', {'rtol': 1E-8, 'atol': 1E-6}, 1E-7),
+    ('ROS2', {'h': 1E-3}, 1E-5)])
+def test_dense_output_matches_closed_form(method, options, tolerance):
+
+    solver = step_transient(method, **options)
+    start = np.array(solver.state.vectorise())
+
+    solver.solve(2.0, 0.01)
+
+    log = solver.logger1.view().T
+    exact = InhourSolution.evaluate(solver.constants, start,
+                                    log[:, 0] - start[0])
+
+    assert len(log) == 201
+    assert np.max(np.abs(log[:, 1] / exact[:, 1] - 1)) < tolerance
+
+
+def test_chunked_logging_matches_one_chunk(monkeypatch):
+
+    logs = []
+    for chunk in [10**6, 16]:
+        monkeypatch.setattr(SolverModule, 'LOG_CHUNK', chunk)
+
+        solver = step_transient('RK4', compiled=False)
+        solver.solve(1.0, 0.01)
+        logs.append(solver.logger1.view().copy())
+
+    assert logs[0].shape == logs[1].shape
+    np.testing.assert_allclose(logs[1], logs[0], rtol=1E-14)
+
+
+@pytest.mark.skipif(not CompiledKernels.AVAILABLE,
+                    reason='Numba is not installed')
+@pytest.mark.parametrize('method', ['F_Euler', 'F_Euler_PC', 'RK4'])
+def test_compiled_kernels_match_python(method):
+
+    logs = []
+    for compiled in [None, False]:
+        solver = PointKineticsSolver(None, method, h=1E-4, compiled=compiled)
+        solver.set_example_thermal_params()
+        solver.equilibrate()
+        solver.add_rho(1E-4)
+        solver.solve(1.0, 0.05)
+        logs.append(solver.logger1.view().copy())
+
+    assert isinstance(PointKineticsSolver(None, method).method,
+                      CompiledKernels.CompiledMethod)
+    np.testing.assert_allclose(logs[0], logs[1], rtol=1E-12)
+
+
+def test_settle_stops_once_converged():
+
+    solver = PointKineticsSolver()
+    solver.set_example_thermal_params()
+
+    solver.settle(t_max=300, tol=1E-3)
+
+    assert solver.intervals < 300
+    assert solver.converged(1E-3)
+    assert solver.state.get_t() == 0.0